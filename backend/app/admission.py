@@ -0,0 +1,188 @@
+from __future__ import annotations
+
+import json
+import logging
+import math
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from .metrics import Counter
+
+logger = logging.getLogger(__name__)
+
+# POST /missions/{session_id}/<action> routes charged to the session's bucket
+SESSION_ACTIONS = frozenset({"command", "commands", "hint"})
+# charged one client token per session it asks for, up to the client burst
+BULK_START = "/missions/start/bulk"
+
+
+class TokenBuckets:
+    """Token buckets keyed by string, refilling at ``rate`` per second up to ``burst``.
+
+    Each bucket is kept in its GCRA form: the single float is the time at which
+    the bucket will be full again. A request is admitted while that time is no
+    more than ``burst - 1`` intervals ahead, and pushes it one interval further.
+    A key whose time has passed holds a full bucket, exactly like a key never
+    seen, so sweeping those keys loses nothing.
+    """
+
+    def __init__(self, rate: float, burst: int, max_keys: int = 100_000) -> None:
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        self._interval = 1.0 / rate
+        # a bucket refills completely within this long, so that is how often to sweep
+        self._sweep_every = max(burst * self._interval, 1.0)
+        self._next_sweep = 0.0
+        self._full_at: Dict[str, float] = {}
+
+    def take(self, key: str, now: Optional[float] = None, cost: int = 1) -> float:
+        """Spend ``cost`` tokens for ``key``; returns 0 if admitted, else seconds until they are available.
+
+        A cost above ``burst`` is charged as ``burst``: it waits for a full bucket and
+        drains it, rather than being refused for good.
+        """
+        cost = min(cost, self.burst)
+        if now is None:
+            now = time.monotonic()
+        if now >= self._next_sweep:
+            self.sweep(now)
+        full_at = self._full_at.get(key)
+        if full_at is None or full_at < now:
+            if full_at is None and len(self._full_at) >= self.max_keys:
+                self._overflow(now)
+            full_at = now
+        # grouped so a full bucket asked for exactly ``burst`` waits 0, not a rounding error
+        wait = (full_at - now) - (self.burst - cost) * self._interval
+        if wait > 0:
+            return wait
+        self._full_at[key] = full_at + cost * self._interval
+        return 0.0
+
+    def sweep(self, now: float) -> int:
+        stale = [key for key, full_at in self._full_at.items() if full_at <= now]
+        for key in stale:
+            del self._full_at[key]
+        self._next_sweep = now + self._sweep_every
+        return len(stale)
+
+    def _overflow(self, now: float) -> None:
+        if self.sweep(now):
+            return
+        # every tracked key is mid-burst: more distinct keys than the limits can hold
+        logger.warning("Rate limiter tracking %d keys; resetting it", len(self._full_at))
+        self._full_at.clear()
+
+    def __len__(self) -> int:
+        return len(self._full_at)
+
+
+class AdmissionMiddleware:
+    """Pure ASGI middleware that answers 429 before a request reaches the app.
+
+    Requests under ``prefix`` count towards ``max_concurrent`` while in flight;
+    event streams are long-lived and exempt. Each POST also takes a token from
+    its client address's bucket, a bulk start one per session it asks for (at
+    most the whole bucket), and command and hint routes also take one from
+    their session's bucket.
+    """
+
+    def __init__(
+        self,
+        app: Any,
+        prefix: str,
+        clients: Optional[TokenBuckets] = None,
+        sessions: Optional[TokenBuckets] = None,
+        max_concurrent: int = 0,
+        rejected: Optional[Counter] = None,
+    ) -> None:
+        self.app = app
+        self.prefix = prefix.rstrip("/")
+        self.clients = clients
+        self.sessions = sessions
+        self.max_concurrent = max_concurrent
+        self.rejected = rejected
+        self.in_flight = 0
+
+    async def __call__(self, scope: Dict[str, Any], receive: Any, send: Any) -> None:
+        path = scope.get("path", "")
+        if scope["type"] != "http" or not path.startswith(self.prefix) or path.endswith("/events"):
+            await self.app(scope, receive, send)
+            return
+
+        if self.max_concurrent and self.in_flight >= self.max_concurrent:
+            await self._reject(send, "concurrency", 1.0)
+            return
+        if scope["method"] == "POST":
+            cost = 1
+            if self.clients is not None and path == self.prefix + BULK_START:
+                body, receive = await buffer_body(receive)
+                cost = bulk_count(body)
+            now = time.monotonic()
+            if self.clients is not None:
+                client = scope.get("client")
+                wait = self.clients.take(client[0] if client else "", now, cost)
+                if wait:
+                    await self._reject(send, "client", wait)
+                    return
+            if self.sessions is not None:
+                session_id = session_from_path(path[len(self.prefix) :])
+                wait = self.sessions.take(session_id, now) if session_id else 0.0
+                if wait:
+                    await self._reject(send, "session", wait)
+                    return
+
+        self.in_flight += 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.in_flight -= 1
+
+    async def _reject(self, send: Any, reason: str, wait: float) -> None:
+        if self.rejected is not None:
+            self.rejected.inc(reason)
+        body = json.dumps({"detail": "Too many requests"}).encode()
+        headers = [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            (b"retry-after", str(max(1, math.ceil(wait))).encode()),
+        ]
+        await send({"type": "http.response.start", "status": 429, "headers": headers})
+        await send({"type": "http.response.body", "body": body})
+
+
+def session_from_path(path: str) -> Optional[str]:
+    # "/missions/{session_id}/command" -> session_id
+    parts = path.split("/")
+    if len(parts) == 4 and parts[1] == "missions" and parts[3] in SESSION_ACTIONS:
+        return parts[2]
+    return None
+
+
+async def buffer_body(receive: Any) -> Tuple[bytes, Any]:
+    """Read the whole request body; returns it and a ``receive`` that replays it to the app."""
+    messages: List[Dict[str, Any]] = []
+    while True:
+        message = await receive()
+        messages.append(message)
+        if message["type"] != "http.request" or not message.get("more_body"):
+            break
+
+    async def replay() -> Dict[str, Any]:
+        if messages:
+            return messages.pop(0)
+        return await receive()
+
+    body = b"".join(message.get("body", b"") for message in messages if message["type"] == "http.request")
+    return body, replay
+
+
+def bulk_count(body: bytes) -> int:
+    # malformed bodies are refused by the route's validation; charge them one token
+    try:
+        count = json.loads(body).get("count")
+    except (ValueError, AttributeError):
+        return 1
+    if isinstance(count, int) and not isinstance(count, bool) and count > 1:
+        return count
+    return 1
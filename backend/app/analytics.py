@@ -0,0 +1,228 @@
+from __future__ import annotations
+
+import io
+import threading
+from bisect import bisect_left
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from .matching import CommandShape, parse_command
+from .schemas import (
+    MissionAnalyticsResponse,
+    RejectedCommandEntry,
+    SolveTimeBucket,
+    StepAnalyticsEntry,
+)
+
+try:  # only needed for the array export
+    import numpy as np
+except ImportError:  # pragma: no cover - depends on the environment
+    np = None
+
+# seconds from mission start to the last accepted command
+SOLVE_BUCKETS = (30.0, 60.0, 120.0, 180.0, 300.0, 450.0, 600.0, 900.0, 1800.0, 3600.0)
+
+
+def normalize_shape(shape: CommandShape) -> str:
+    """Fold the variants the matcher treats alike: case, ``sudo`` and flag order."""
+    return " ".join([*shape.argv, *sorted(shape.flags)]) if shape.flags else " ".join(shape.argv)
+
+
+def normalize_command(command: str) -> str:
+    return normalize_shape(parse_command(command))
+
+
+class TopCommands:
+    """Space-Saving heavy hitters: the most frequent items in ``capacity`` counters.
+
+    A new item that finds every counter taken replaces one with the smallest
+    count and inherits it as an overestimate, so ``count - error`` is a lower
+    bound and any item seen more than ``total / capacity`` times is kept.
+    Counters are grouped by count so updates and evictions are O(1).
+    """
+
+    def __init__(self, capacity: int) -> None:
+        self.capacity = capacity
+        self.total = 0
+        self._counts: Dict[str, int] = {}
+        self._errors: Dict[str, int] = {}
+        # count -> items holding it, with insertion order as the eviction order
+        self._buckets: Dict[int, Dict[str, None]] = {}
+        self._min = 0
+
+    def add(self, item: str) -> None:
+        self.total += 1
+        count = self._counts.get(item)
+        if count is not None:
+            self._unlink(item, count)
+            self._link(item, count + 1)
+        elif len(self._counts) < self.capacity:
+            self._errors[item] = 0
+            self._link(item, 1)
+        else:
+            floor = self._min
+            evicted = next(iter(self._buckets[floor]))
+            self._unlink(evicted, floor)
+            del self._counts[evicted], self._errors[evicted]
+            self._errors[item] = floor
+            self._link(item, floor + 1)
+
+    def _unlink(self, item: str, count: int) -> None:
+        bucket = self._buckets[count]
+        del bucket[item]
+        if not bucket:
+            del self._buckets[count]
+            if count == self._min:
+                # every counter is at least ``count``, and the caller re-links at count + 1
+                self._min = count + 1
+
+    def _link(self, item: str, count: int) -> None:
+        self._counts[item] = count
+        bucket = self._buckets.get(count)
+        if bucket is None:
+            bucket = self._buckets[count] = {}
+        bucket[item] = None
+        if count < self._min or len(self._counts) == 1:
+            self._min = count
+
+    def top(self, limit: Optional[int] = None) -> List[Tuple[str, int, int]]:
+        """(item, count, error) triples, most frequent first."""
+        ranked = sorted(self._counts.items(), key=lambda pair: (-pair[1], pair[0]))
+        return [(item, count, self._errors[item]) for item, count in ranked[:limit]]
+
+
+@dataclass
+class _StepStats:
+    rejected: TopCommands
+    hints: int = 0
+    solves: int = 0
+    solves_after_hint: int = 0
+
+
+@dataclass
+class _MissionStats:
+    steps: Dict[str, _StepStats] = field(default_factory=dict)
+    # per SOLVE_BUCKETS slot, last one is +Inf
+    solve_counts: List[int] = field(default_factory=lambda: [0] * (len(SOLVE_BUCKETS) + 1))
+    solve_seconds: float = 0.0
+
+
+class CommandAnalytics:
+    """Per mission step aggregates, updated as commands and hints are evaluated.
+
+    Reports never touch session histories, and memory stays bounded by
+    ``top_commands`` counters per step however many sessions play.
+    """
+
+    def __init__(self, top_commands: int = 500) -> None:
+        self.top_commands = top_commands
+        self._missions: Dict[str, _MissionStats] = {}
+        # a blocking session backend evaluates commands on worker threads
+        self._lock = threading.Lock()
+
+    def _step(self, mission_id: str, step_id: str) -> _StepStats:
+        mission = self._missions.get(mission_id)
+        if mission is None:
+            mission = self._missions[mission_id] = _MissionStats()
+        step = mission.steps.get(step_id)
+        if step is None:
+            step = mission.steps[step_id] = _StepStats(TopCommands(self.top_commands))
+        return step
+
+    def record_rejected(self, mission_id: str, step_id: str, shape: CommandShape) -> None:
+        normalized = normalize_shape(shape)
+        with self._lock:
+            self._step(mission_id, step_id).rejected.add(normalized)
+
+    def record_hint(self, mission_id: str, step_id: str) -> None:
+        with self._lock:
+            self._step(mission_id, step_id).hints += 1
+
+    def record_solved(self, mission_id: str, step_id: str, after_hint: bool) -> None:
+        with self._lock:
+            step = self._step(mission_id, step_id)
+            step.solves += 1
+            step.solves_after_hint += after_hint
+
+    def record_completed(self, mission_id: str, seconds: float) -> None:
+        index = bisect_left(SOLVE_BUCKETS, seconds)
+        with self._lock:
+            mission = self._missions.get(mission_id)
+            if mission is None:
+                mission = self._missions[mission_id] = _MissionStats()
+            mission.solve_counts[index] += 1
+            mission.solve_seconds += seconds
+
+    def report(self, mission_id: str, step_ids: List[str], limit: int) -> MissionAnalyticsResponse:
+        with self._lock:
+            mission = self._missions.get(mission_id) or _MissionStats()
+            completions = sum(mission.solve_counts)
+            bounds: List[Optional[float]] = [*SOLVE_BUCKETS, None]
+            steps = []
+            for step_id in step_ids:
+                stats = mission.steps.get(step_id) or _StepStats(TopCommands(0))
+                steps.append(
+                    StepAnalyticsEntry(
+                        step_id=step_id,
+                        rejections=stats.rejected.total,
+                        hints=stats.hints,
+                        solves=stats.solves,
+                        solves_after_hint=stats.solves_after_hint,
+                        top_rejected=[
+                            RejectedCommandEntry(command=command, count=count, error=error)
+                            for command, count, error in stats.rejected.top(limit)
+                        ],
+                    )
+                )
+            return MissionAnalyticsResponse(
+                mission_id=mission_id,
+                completions=completions,
+                mean_solve_seconds=mission.solve_seconds / completions if completions else None,
+                solve_time_buckets=[
+                    SolveTimeBucket(le_seconds=bound, count=count)
+                    for bound, count in zip(bounds, mission.solve_counts)
+                ],
+                steps=steps,
+            )
+
+    def arrays(self, mission_id: str, step_ids: List[str]) -> Dict[str, Any]:
+        """The full aggregates of one mission as NumPy arrays, for offline analysis.
+
+        ``rejected_step`` indexes into ``step_ids`` for each row of the
+        ``rejected_*`` arrays; the last ``solve_time_bounds`` entry is +Inf.
+        """
+        if np is None:
+            raise RuntimeError("NumPy is required to export analytics arrays")
+        with self._lock:
+            mission = self._missions.get(mission_id) or _MissionStats()
+            empty = _StepStats(TopCommands(0))
+            steps = [mission.steps.get(step_id) or empty for step_id in step_ids]
+            totals = [
+                (stats.rejected.total, stats.hints, stats.solves, stats.solves_after_hint) for stats in steps
+            ]
+            rejected = [
+                (index, command, count, error)
+                for index, stats in enumerate(steps)
+                for command, count, error in stats.rejected.top()
+            ]
+            solve_counts = list(mission.solve_counts)
+        columns = np.array(totals, dtype=np.int64).reshape(len(step_ids), 4)
+        return {
+            "step_ids": np.array(step_ids, dtype=str),
+            "rejections": columns[:, 0],
+            "hints": columns[:, 1],
+            "solves": columns[:, 2],
+            "solves_after_hint": columns[:, 3],
+            "rejected_step": np.array([row[0] for row in rejected], dtype=np.int32),
+            "rejected_command": np.array([row[1] for row in rejected], dtype=str),
+            "rejected_count": np.array([row[2] for row in rejected], dtype=np.int64),
+            "rejected_error": np.array([row[3] for row in rejected], dtype=np.int64),
+            "solve_time_bounds": np.array([*SOLVE_BUCKETS, np.inf], dtype=np.float64),
+            "solve_time_counts": np.array(solve_counts, dtype=np.int64),
+        }
+
+    def export_npz(self, mission_id: str, step_ids: List[str]) -> bytes:
+        arrays = self.arrays(mission_id, step_ids)
+        buffer = io.BytesIO()
+        np.savez_compressed(buffer, **arrays)
+        return buffer.getvalue()
@@ -0,0 +1,305 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import ipaddress
+import json
+import logging
+import os
+import pickle
+import sys
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, List, Literal, Optional, Tuple
+
+from pydantic import BaseModel, Field, ValidationError, field_validator, model_validator
+
+from .host import HostExpectation, HostImage, HostUnit
+from .missions import Mission, MissionStep, MissionStore
+
+try:  # YAML mission files are optional
+    import yaml
+except ImportError:  # pragma: no cover - depends on the environment
+    yaml = None
+
+
+logger = logging.getLogger(__name__)
+
+MISSION_SUFFIXES = (".json", ".yaml", ".yml")
+
+BUILTIN_MISSIONS_DIR = Path(__file__).parent / "data" / "missions"
+
+# modules defining what a mission file compiles to; cache entries are keyed by
+# their source so an edit to any of them ignores the old pickles
+CACHED_MODULES = ("catalog.py", "host.py", "matching.py", "missions.py")
+
+
+UnitState = Literal["active", "inactive", "failed"]
+
+
+def _check_absolute(paths: Any) -> Any:
+    for path in paths:
+        if not path.startswith("/"):
+            raise ValueError(f"paths must be absolute: {path!r}")
+    return paths
+
+
+class HostUnitDefinition(BaseModel):
+    description: str = ""
+    state: UnitState = "active"
+
+
+class HostDefinition(BaseModel):
+    hostname: str = "training-host"
+    user: str = "root"
+    home: str = "/root"
+    # defaults to home
+    cwd: Optional[str] = None
+    # path -> content; a path ending in "/" is an empty directory
+    files: Dict[str, str] = Field(default_factory=dict)
+    # interface name -> IPv4 address/prefix
+    interfaces: Dict[str, str] = Field(default_factory=dict)
+    routes: List[str] = Field(default_factory=list)
+    units: Dict[str, HostUnitDefinition] = Field(default_factory=dict)
+    # unit name -> journal lines, oldest first
+    logs: Dict[str, List[str]] = Field(default_factory=dict)
+
+    @field_validator("files")
+    @classmethod
+    def _check_files(cls, files: Dict[str, str]) -> Dict[str, str]:
+        return _check_absolute(files)
+
+    @field_validator("interfaces")
+    @classmethod
+    def _check_interfaces(cls, interfaces: Dict[str, str]) -> Dict[str, str]:
+        for address in interfaces.values():
+            ipaddress.IPv4Interface(address)
+        return interfaces
+
+    def to_image(self) -> HostImage:
+        return HostImage.build(
+            hostname=self.hostname,
+            user=self.user,
+            home=self.home,
+            cwd=self.cwd or self.home,
+            files=self.files,
+            interfaces=self.interfaces,
+            routes=self.routes,
+            units={name: HostUnit(**unit.model_dump()) for name, unit in self.units.items()},
+            logs=self.logs,
+        )
+
+
+class HostExpectationDefinition(BaseModel):
+    routes: List[str] = Field(default_factory=list)
+    units: Dict[str, UnitState] = Field(default_factory=dict)
+    files: Dict[str, str] = Field(default_factory=dict)
+    absent: List[str] = Field(default_factory=list)
+
+    @field_validator("files", "absent")
+    @classmethod
+    def _check_paths(cls, paths: Any) -> Any:
+        return _check_absolute(paths)
+
+    def to_expectation(self) -> HostExpectation:
+        return HostExpectation(
+            routes=tuple(self.routes),
+            units=dict(self.units),
+            files=dict(self.files),
+            absent=tuple(self.absent),
+        )
+
+
+class MissionStepDefinition(BaseModel):
+    id: str = Field(..., min_length=1)
+    prompt: str
+    expected_commands: List[str] = Field(..., min_length=1)
+    success_output: List[str]
+    next_prompt: Optional[str] = None
+    hint: str
+    score: int = Field(..., ge=0)
+    # host state that must hold after the command; needs the mission's host
+    expect: Optional[HostExpectationDefinition] = None
+
+
+class MissionDefinition(BaseModel):
+    id: str = Field(..., min_length=1)
+    title: str
+    difficulty: str
+    duration_seconds: int = Field(..., ge=30)
+    scenario: str
+    objectives: List[str]
+    recommended_commands: List[str] = Field(default_factory=list)
+    intro: str
+    steps: List[MissionStepDefinition] = Field(..., min_length=1)
+    # simulated host the session's commands run against
+    host: Optional[HostDefinition] = None
+
+    @model_validator(mode="after")
+    def _check_expectations(self) -> "MissionDefinition":
+        if self.host is None and any(step.expect is not None for step in self.steps):
+            raise ValueError("steps with expect need a host")
+        return self
+
+    def to_mission(self) -> Mission:
+        data = self.model_dump(exclude={"steps", "host"})
+        steps = [
+            MissionStep(
+                **step.model_dump(exclude={"expect"}),
+                expect=step.expect.to_expectation() if step.expect is not None else None,
+            )
+            for step in self.steps
+        ]
+        mission = Mission(**data, steps=steps, host=self.host.to_image() if self.host is not None else None)
+        mission.compile()
+        return mission
+
+
+class CatalogError(ValueError):
+    pass
+
+
+@dataclass(frozen=True)
+class CatalogSource:
+    directory: Path
+    # (relative path, size, mtime_ns) for every mission file, in load order
+    files: Tuple[Tuple[str, int, int], ...]
+
+
+def scan(directory: Path) -> CatalogSource:
+    files = []
+    for path in sorted(directory.rglob("*")):
+        if path.suffix.lower() not in MISSION_SUFFIXES or not path.is_file():
+            continue
+        stat = path.stat()
+        files.append((str(path.relative_to(directory)), stat.st_size, stat.st_mtime_ns))
+    return CatalogSource(directory=directory, files=tuple(files))
+
+
+def parse_missions(name: str, raw: bytes) -> List[Mission]:
+    if name.lower().endswith(".json"):
+        document: Any = json.loads(raw)
+    elif yaml is None:
+        raise CatalogError(f"{name}: install PyYAML to load YAML mission files")
+    else:
+        try:
+            document = yaml.safe_load(raw)
+        except yaml.YAMLError as exc:
+            raise CatalogError(f"{name}: {exc}") from exc
+
+    # a file holds a single mission or a list of them
+    items = document if isinstance(document, list) else [document]
+    try:
+        return [MissionDefinition.model_validate(item).to_mission() for item in items]
+    except ValidationError as exc:
+        raise CatalogError(f"{name}: {exc}") from exc
+
+
+class MissionCatalogLoader:
+    """Load mission files from a directory, caching compiled missions by content hash.
+
+    Each file's parsed, validated and compiled missions are pickled under the
+    hash of its bytes, and the whole catalog is pickled under the hash of all
+    file hashes, so an unchanged directory loads with one read per file and a
+    single unpickle. Loading a pickle runs code, so ``cache_dir`` must only be
+    writable by the server's own user.
+    """
+
+    def __init__(self, directory: Path, cache_dir: Optional[Path] = None) -> None:
+        self.directory = directory
+        self.cache_dir = cache_dir
+        self.source: Optional[CatalogSource] = None
+
+    def load(self) -> List[Mission]:
+        source = scan(self.directory)
+        # remember the scan even if loading fails so a broken file is retried
+        # only after it changes again
+        self.source = source
+        contents = [(name, (self.directory / name).read_bytes()) for name, _, _ in source.files]
+        digests = [(name, _digest(raw)) for name, raw in contents]
+        catalog_key = _digest("\n".join(f"{name}:{digest}" for name, digest in digests).encode())
+
+        missions = self._read_cache(f"catalog-{catalog_key}")
+        if missions is None:
+            missions = []
+            for (name, raw), (_, digest) in zip(contents, digests):
+                file_missions = self._read_cache(f"file-{digest}")
+                if file_missions is None:
+                    file_missions = parse_missions(name, raw)
+                    self._write_cache(f"file-{digest}", file_missions)
+                missions.extend(file_missions)
+            _check_unique(missions)
+            self._write_cache(f"catalog-{catalog_key}", missions)
+        return missions
+
+    def changed(self) -> bool:
+        return self.source is None or scan(self.directory) != self.source
+
+    def _cache_path(self, key: str) -> Optional[Path]:
+        if self.cache_dir is None:
+            return None
+        return self.cache_dir / f"{key}.{cache_version()}.pickle"
+
+    def _read_cache(self, key: str) -> Optional[List[Mission]]:
+        path = self._cache_path(key)
+        if path is None or not path.exists():
+            return None
+        try:
+            with path.open("rb") as handle:
+                return pickle.load(handle)
+        except Exception:  # corrupt or incompatible entry: rebuild it
+            logger.warning("Ignoring unreadable mission cache entry %s", path)
+            return None
+
+    def _write_cache(self, key: str, missions: List[Mission]) -> None:
+        path = self._cache_path(key)
+        if path is None:
+            return
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            partial = path.with_suffix(f".{os.getpid()}.tmp")
+            with partial.open("wb") as handle:
+                pickle.dump(missions, handle, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(partial, path)
+        except OSError:
+            logger.warning("Could not write mission cache entry %s", path, exc_info=True)
+
+
+def _digest(raw: bytes) -> str:
+    return hashlib.blake2b(raw, digest_size=16).hexdigest()
+
+
+@lru_cache(maxsize=1)
+def cache_version() -> str:
+    package = Path(__file__).parent
+    sources = [sys.version.encode()] + [(package / name).read_bytes() for name in CACHED_MODULES]
+    return _digest(b"\0".join(sources))
+
+
+def _check_unique(missions: List[Mission]) -> None:
+    seen: Dict[str, int] = {}
+    for mission in missions:
+        seen[mission.id] = seen.get(mission.id, 0) + 1
+    duplicates = sorted(mission_id for mission_id, count in seen.items() if count > 1)
+    if duplicates:
+        raise CatalogError(f"duplicate mission ids: {', '.join(duplicates)}")
+
+
+def load_into(store: MissionStore, loader: MissionCatalogLoader) -> int:
+    missions = loader.load()
+    store.replace_missions(missions)
+    return len(missions)
+
+
+async def watch_catalog(store: MissionStore, loader: MissionCatalogLoader, interval_seconds: float) -> None:
+    while True:
+        await asyncio.sleep(interval_seconds)
+        try:
+            if not await asyncio.to_thread(loader.changed):
+                continue
+            count = await asyncio.to_thread(load_into, store, loader)
+            logger.info("Reloaded %d missions from %s", count, loader.directory)
+        except Exception:
+            # keep serving the previous catalog, and watching, until the files are fixed
+            logger.exception("Mission catalog reload failed")
@@ -1,5 +1,5 @@
 from functools import lru_cache
-from typing import List
+from typing import List, Literal, Optional
 
 from pydantic import Field, field_validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
@@ -22,6 +22,43 @@ class Settings(BaseSettings):
         alias="ALLOWED_ORIGINS",
     )
     session_timeout_seconds: int = Field(default=60 * 60, alias="SESSION_TIMEOUT_SECONDS")
+    session_retention_seconds: int = Field(default=5 * 60, alias="SESSION_RETENTION_SECONDS")
+    session_reap_interval_seconds: float = Field(default=5.0, alias="SESSION_REAP_INTERVAL_SECONDS")
+    session_history_limit: int = Field(default=50, ge=0, alias="SESSION_HISTORY_LIMIT")
+    max_sessions: int = Field(default=10_000, ge=1, alias="MAX_SESSIONS")
+    host_overlay_max_bytes: int = Field(default=64 * 1024, ge=0, alias="HOST_OVERLAY_MAX_BYTES")
+    host_overlay_max_entries: int = Field(default=256, ge=0, alias="HOST_OVERLAY_MAX_ENTRIES")
+    events_heartbeat_seconds: float = Field(default=15.0, gt=0, alias="EVENTS_HEARTBEAT_SECONDS")
+    missions_dir: Optional[str] = Field(default=None, alias="MISSIONS_DIR")
+    # cache entries are pickles, so only point this at a directory no one else can write
+    mission_cache_dir: Optional[str] = Field(default=None, alias="MISSION_CACHE_DIR")
+    missions_reload_interval_seconds: float = Field(default=5.0, ge=0, alias="MISSIONS_RELOAD_INTERVAL_SECONDS")
+    session_backend: Literal["memory", "sqlite"] = Field(default="memory", alias="SESSION_BACKEND")
+    session_db_path: str = Field(default="sessions.db", alias="SESSION_DB_PATH")
+    metrics_enabled: bool = Field(default=True, alias="METRICS_ENABLED")
+    leaderboard_size: int = Field(default=1000, ge=1, alias="LEADERBOARD_SIZE")
+    analytics_top_commands: int = Field(default=500, ge=1, alias="ANALYTICS_TOP_COMMANDS")
+    rate_limit_enabled: bool = Field(default=True, alias="RATE_LIMIT_ENABLED")
+    rate_limit_session_per_second: float = Field(default=5.0, gt=0, alias="RATE_LIMIT_SESSION_PER_SECOND")
+    rate_limit_session_burst: int = Field(default=20, ge=1, alias="RATE_LIMIT_SESSION_BURST")
+    rate_limit_client_per_second: float = Field(default=20.0, gt=0, alias="RATE_LIMIT_CLIENT_PER_SECOND")
+    rate_limit_client_burst: int = Field(default=60, ge=1, alias="RATE_LIMIT_CLIENT_BURST")
+    rate_limit_max_keys: int = Field(default=100_000, ge=1, alias="RATE_LIMIT_MAX_KEYS")
+    max_concurrent_requests: int = Field(default=512, ge=0, alias="MAX_CONCURRENT_REQUESTS")
+    compression_minimum_size: int = Field(default=1024, ge=0, alias="COMPRESSION_MINIMUM_SIZE")
+    idempotency_ttl_seconds: float = Field(default=300.0, gt=0, alias="IDEMPOTENCY_TTL_SECONDS")
+    idempotency_keys_per_session: int = Field(default=4, ge=1, alias="IDEMPOTENCY_KEYS_PER_SESSION")
+    idempotency_max_sessions: int = Field(default=10_000, ge=1, alias="IDEMPOTENCY_MAX_SESSIONS")
+    journal_dir: Optional[str] = Field(default=None, alias="JOURNAL_DIR")
+    journal_sync: Literal["commit", "interval", "off"] = Field(default="commit", alias="JOURNAL_SYNC")
+    journal_fsync_interval_seconds: float = Field(default=1.0, gt=0, alias="JOURNAL_FSYNC_INTERVAL_SECONDS")
+    journal_snapshot_interval_seconds: float = Field(default=300.0, gt=0, alias="JOURNAL_SNAPSHOT_INTERVAL_SECONDS")
+    # sharded mode: session ids start with this shard's name, which the router uses to place them
+    shard_id: str = Field(default="", pattern=r"^[A-Za-z0-9_-]*$", alias="SHARD_ID")
+    # for the router: "name=http://host:port,..." with each name the shard's SHARD_ID
+    shard_backends: str = Field(default="", alias="SHARD_BACKENDS")
+    shard_pool_size: int = Field(default=64, ge=1, alias="SHARD_POOL_SIZE")
+    journal_snapshot_bytes: int = Field(default=64 * 1024 * 1024, ge=1, alias="JOURNAL_SNAPSHOT_BYTES")
 
     @field_validator("allowed_origins", mode="before")
     @classmethod
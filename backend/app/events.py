@@ -0,0 +1,115 @@
+from __future__ import annotations
+
+import asyncio
+import heapq
+import threading
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+Event = Dict[str, Any]
+
+TIMEOUT_EVENT: Event = {"type": "timeout", "detail": "Time is up! Restart the mission to try again."}
+HEARTBEAT_EVENT: Event = {"type": "heartbeat"}
+
+
+@dataclass(eq=False)
+class Subscription:
+    session_id: str
+    loop: asyncio.AbstractEventLoop
+    queue: "asyncio.Queue[Event]" = field(default_factory=lambda: asyncio.Queue(maxsize=64))
+
+    def push(self, event: Event) -> None:
+        # runs on the subscriber's loop; a consumer that fell this far behind
+        # only needs the most recent state, so drop the oldest event
+        if self.queue.full():
+            self.queue.get_nowait()
+        self.queue.put_nowait(event)
+
+
+class SessionEvents:
+    """Fan-out of per-session events to subscribers living on an event loop.
+
+    ``publish`` may be called from any thread (the event loop, or a worker
+    thread running a blocking session backend); delivery is handed to each
+    subscriber's loop.
+    Mission-clock timeouts and heartbeats come from a single clock task
+    (``run_clock``) rather than from a timer per subscriber.
+    """
+
+    def __init__(self) -> None:
+        self._subscribers: Dict[str, Set[Subscription]] = {}
+        self._deadlines: List[Tuple[datetime, str]] = []
+        self._deadline_ids: Set[str] = set()
+        self._lock = threading.Lock()
+
+    def subscribe(self, session_id: str, expires_at: Optional[datetime] = None) -> Subscription:
+        subscription = Subscription(session_id=session_id, loop=asyncio.get_running_loop())
+        with self._lock:
+            self._subscribers.setdefault(session_id, set()).add(subscription)
+            if expires_at is not None and session_id not in self._deadline_ids:
+                heapq.heappush(self._deadlines, (expires_at, session_id))
+                self._deadline_ids.add(session_id)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.session_id)
+            if subscribers is None:
+                return
+            subscribers.discard(subscription)
+            if not subscribers:
+                del self._subscribers[subscription.session_id]
+                self._deadline_ids.discard(subscription.session_id)
+
+    def cancel_deadline(self, session_id: str) -> None:
+        # the heap entry stays behind and is skipped when it comes due
+        with self._lock:
+            self._deadline_ids.discard(session_id)
+
+    def has_subscribers(self, session_id: str) -> bool:
+        return session_id in self._subscribers
+
+    def publish(self, session_id: str, event: Event) -> None:
+        if session_id not in self._subscribers:
+            return
+        with self._lock:
+            subscribers = list(self._subscribers.get(session_id, ()))
+        for subscription in subscribers:
+            if subscription.loop.is_closed():
+                continue
+            subscription.loop.call_soon_threadsafe(subscription.push, event)
+
+    def broadcast(self, event: Event) -> None:
+        with self._lock:
+            subscribers = [sub for subs in self._subscribers.values() for sub in subs]
+        for subscription in subscribers:
+            if not subscription.loop.is_closed():
+                subscription.loop.call_soon_threadsafe(subscription.push, event)
+
+    def publish_due_deadlines(self, now: Optional[datetime] = None) -> int:
+        now = now or datetime.utcnow()
+        due: List[str] = []
+        with self._lock:
+            while self._deadlines and self._deadlines[0][0] <= now:
+                _, session_id = heapq.heappop(self._deadlines)
+                if session_id in self._deadline_ids:
+                    self._deadline_ids.discard(session_id)
+                    due.append(session_id)
+        for session_id in due:
+            self.publish(session_id, TIMEOUT_EVENT)
+        return len(due)
+
+    async def run_clock(self, heartbeat_seconds: float, tick_seconds: float = 1.0) -> None:
+        loop = asyncio.get_running_loop()
+        next_heartbeat = loop.time() + heartbeat_seconds
+        while True:
+            await asyncio.sleep(tick_seconds)
+            self.publish_due_deadlines()
+            if loop.time() >= next_heartbeat:
+                self.broadcast(HEARTBEAT_EVENT)
+                next_heartbeat = loop.time() + heartbeat_seconds
+
+    def subscriber_count(self) -> int:
+        with self._lock:
+            return sum(len(subscribers) for subscribers in self._subscribers.values())
@@ -0,0 +1,194 @@
+"""Regrade recorded transcripts against the current mission catalog.
+
+Reads NDJSON transcripts, one ``{"id", "mission_id", "commands"}`` object per
+line, and writes one result line per transcript in input order::
+
+    python -m app.grade transcripts.ndjson --output grades.ndjson --workers 8
+
+Commands are replayed with the same rules as a live session, without the
+clock: each command runs on the mission's simulated host when it has one, an
+accepted command scores its step and advances, anything else is a mistake,
+and commands after the last step are ignored. Exported transcripts marked
+``truncated`` lost their oldest commands, so they are reported as errors
+instead of graded. Lines are handed to a process pool in chunks, and each
+worker loads the catalog once.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from pathlib import Path
+from typing import IO, Deque, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .catalog import BUILTIN_MISSIONS_DIR, MissionCatalogLoader
+from .config import get_settings
+from .host import HostLimits, HostOverlay, HostView
+from .matching import parse_command
+from .missions import Mission
+
+Chunk = List[Tuple[int, bytes]]
+
+# verdicts kept per worker before the memo starts over
+MAX_VERDICTS = 1_000_000
+
+# set in each worker by _load_catalog
+_missions: Dict[str, Mission] = {}
+# the server's overlay limits, so a replay fails the same writes a live session did
+_host_limits = HostLimits()
+# (mission id, step index, command) -> accepted; transcripts repeat the same few commands
+_verdicts: Dict[Tuple[str, int, str], bool] = {}
+
+
+def grade_commands(mission: Mission, commands: Iterable[str]) -> Tuple[int, int, int]:
+    """Replay ``commands`` and return (total_score, mistakes, step_index)."""
+    steps = mission.steps
+    score = mistakes = index = 0
+    overlay: Optional[HostOverlay] = None
+    for command in commands:
+        if index >= len(steps):
+            break
+        if mission.host is not None:
+            # verdicts depend on the host state, so they can't be memoized
+            host = HostView(mission.host, overlay, _host_limits)
+            host.run(command)
+            overlay = host.overlay
+            accepted = steps[index].solved_by(parse_command(command), host)
+        else:
+            key = (mission.id, index, command)
+            accepted = _verdicts.get(key)
+            if accepted is None:
+                if len(_verdicts) >= MAX_VERDICTS:
+                    _verdicts.clear()
+                accepted = _verdicts[key] = steps[index].accepts_shape(parse_command(command))
+        if accepted:
+            score += steps[index].score
+            index += 1
+        else:
+            mistakes += 1
+    return score, mistakes, index
+
+
+def grade_line(line_number: int, raw: bytes) -> str:
+    try:
+        transcript = json.loads(raw)
+        # exported transcripts carry session_id instead
+        transcript_id = str(transcript.get("id", transcript.get("session_id", line_number)))
+        mission_id = transcript["mission_id"]
+        if not isinstance(mission_id, str):
+            raise TypeError("mission_id must be a string")
+        commands = transcript["commands"]
+        if not isinstance(commands, list):
+            raise TypeError("commands must be a list")
+        mission = _missions.get(mission_id)
+    except (ValueError, KeyError, TypeError, AttributeError) as exc:
+        return json.dumps({"line": line_number, "error": f"invalid transcript: {exc}"})
+
+    if mission is None:
+        return json.dumps({"id": transcript_id, "mission_id": mission_id, "error": "unknown mission"})
+    if transcript.get("truncated"):
+        # grading the commands that are left would score a different run
+        error = "truncated transcript: older commands were dropped from the server's history"
+        return json.dumps({"id": transcript_id, "mission_id": mission_id, "error": error})
+    score, mistakes, index = grade_commands(mission, (str(command) for command in commands))
+    return json.dumps(
+        {
+            "id": transcript_id,
+            "mission_id": mission_id,
+            "total_score": score,
+            "mistakes": mistakes,
+            "step_index": index,
+            "total_steps": len(mission.steps),
+            "completed": index >= len(mission.steps),
+        }
+    )
+
+
+def grade_chunk(chunk: Chunk) -> str:
+    return "".join(grade_line(line_number, raw) + "\n" for line_number, raw in chunk)
+
+
+def _load_catalog(missions_dir: str, cache_dir: Optional[str]) -> None:
+    global _missions, _host_limits
+    settings = get_settings()
+    _host_limits = HostLimits(settings.host_overlay_max_bytes, settings.host_overlay_max_entries)
+    loader = MissionCatalogLoader(Path(missions_dir), cache_dir=Path(cache_dir) if cache_dir else None)
+    _missions = {mission.id: mission for mission in loader.load()}
+    _verdicts.clear()
+
+
+def read_chunks(source: IO[bytes], chunk_size: int) -> Iterator[Chunk]:
+    chunk: Chunk = []
+    for line_number, raw in enumerate(source, start=1):
+        if not raw.strip():
+            continue
+        chunk.append((line_number, raw))
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def grade_stream(
+    source: IO[bytes],
+    sink: IO[str],
+    missions_dir: str,
+    cache_dir: Optional[str] = None,
+    workers: int = 1,
+    chunk_size: int = 1000,
+) -> int:
+    """Grade every transcript in ``source`` into ``sink``; returns the number written."""
+    written = 0
+    chunks = read_chunks(source, chunk_size)
+    if workers <= 1:
+        _load_catalog(missions_dir, cache_dir)
+        for chunk in chunks:
+            sink.write(grade_chunk(chunk))
+            written += len(chunk)
+        return written
+
+    with ProcessPoolExecutor(workers, initializer=_load_catalog, initargs=(missions_dir, cache_dir)) as pool:
+        # a few chunks in flight per worker keeps them busy without reading the whole input
+        pending: Deque[Tuple[int, Future]] = deque()
+        for chunk in chunks:
+            pending.append((len(chunk), pool.submit(grade_chunk, chunk)))
+            if len(pending) >= workers * 4:
+                count, future = pending.popleft()
+                sink.write(future.result())
+                written += count
+        while pending:
+            count, future = pending.popleft()
+            sink.write(future.result())
+            written += count
+    return written
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    settings = get_settings()
+    parser = argparse.ArgumentParser(prog="python -m app.grade", description=__doc__.splitlines()[0])
+    parser.add_argument("input", help="NDJSON transcripts, or - for stdin")
+    parser.add_argument("--output", "-o", default="-", help="where to write grades (default: stdout)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--chunk-size", type=int, default=1000, help="transcripts per pool task")
+    parser.add_argument("--missions-dir", default=settings.missions_dir or str(BUILTIN_MISSIONS_DIR))
+    parser.add_argument("--mission-cache-dir", default=settings.mission_cache_dir)
+    args = parser.parse_args(argv)
+
+    source = sys.stdin.buffer if args.input == "-" else open(args.input, "rb")
+    sink = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+    try:
+        grade_stream(source, sink, args.missions_dir, args.mission_cache_dir, args.workers, args.chunk_size)
+    finally:
+        if source is not sys.stdin.buffer:
+            source.close()
+        if sink is not sys.stdout:
+            sink.close()
+
+
+if __name__ == "__main__":
+    main()
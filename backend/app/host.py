@@ -0,0 +1,781 @@
+from __future__ import annotations
+
+import ipaddress
+import posixpath
+import time
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Any, Callable, Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+
+from .matching import split_command
+
+_ACTIVE_TEXT = {
+    "active": "active (running)",
+    "inactive": "inactive (dead)",
+    "failed": "failed (Result: exit-code)",
+}
+
+# shell variables expanded in every argument
+_VARIABLES = ("$HOSTNAME", "$HOME", "$USER", "$PWD")
+
+# lines of the unit's journal shown under `systemctl status`
+STATUS_LOG_LINES = 10
+
+# present on every host, whatever files the mission defines
+BASE_DIRS = ("/", "/etc", "/tmp", "/var/log")
+
+# lines a session's overlay keeps appended to each unit's journal; older ones drop off
+OVERLAY_LOG_LINES = 100
+
+
+class HostFull(Exception):
+    """A write would take a session's overlay past its ``HostLimits``."""
+
+
+@dataclass(frozen=True)
+class HostUnit:
+    description: str = ""
+    state: str = "active"
+
+
+@dataclass(frozen=True)
+class HostImage:
+    """Starting state of a mission's simulated host, shared read-only by all its sessions."""
+
+    hostname: str
+    user: str
+    home: str
+    cwd: str
+    files: Dict[str, str]
+    # every directory, including the parents of every file
+    dirs: FrozenSet[str]
+    # directory -> names of the files and directories in it
+    children: Dict[str, Tuple[str, ...]]
+    # interface name -> address/prefix
+    interfaces: Dict[str, str]
+    routes: Tuple[str, ...]
+    units: Dict[str, HostUnit]
+    # unit name -> journal lines, oldest first
+    logs: Dict[str, Tuple[str, ...]]
+
+    @classmethod
+    def build(
+        cls,
+        hostname: str,
+        user: str,
+        home: str,
+        cwd: str,
+        files: Dict[str, str],
+        interfaces: Dict[str, str],
+        routes: Iterable[str],
+        units: Dict[str, HostUnit],
+        logs: Dict[str, Iterable[str]],
+    ) -> "HostImage":
+        contents: Dict[str, str] = {}
+        dirs: Set[str] = {*BASE_DIRS, home, cwd}
+        for path, content in files.items():
+            # "path/" declares an empty directory
+            if path.endswith("/"):
+                dirs.add(path.rstrip("/") or "/")
+            else:
+                contents[path] = content
+        for path in list(dirs) + list(contents):
+            while path != "/":
+                path = posixpath.dirname(path)
+                dirs.add(path)
+        children: Dict[str, List[str]] = {}
+        for path in [*dirs, *contents]:
+            if path != "/":
+                children.setdefault(posixpath.dirname(path), []).append(posixpath.basename(path))
+        return cls(
+            hostname=hostname,
+            user=user,
+            home=home,
+            cwd=cwd,
+            files=contents,
+            dirs=frozenset(dirs),
+            children={path: tuple(sorted(names)) for path, names in children.items()},
+            interfaces=dict(interfaces),
+            routes=tuple(routes),
+            units={_unit_name(name): unit for name, unit in units.items()},
+            logs={_unit_name(name): tuple(lines) for name, lines in logs.items()},
+        )
+
+
+@dataclass(slots=True)
+class HostOverlay:
+    """One session's changes on top of its mission's ``HostImage``.
+
+    Sessions keep ``None`` until their first change, and then only what they
+    changed, so thousands of sessions share one image instead of copying it.
+    """
+
+    cwd: str = ""
+    # path -> content, or None where an image file was removed
+    files: Dict[str, Optional[str]] = field(default_factory=dict)
+    # path -> True where created, False where an image directory was removed
+    dirs: Dict[str, bool] = field(default_factory=dict)
+    # the whole routing table once it has changed
+    routes: Optional[Tuple[str, ...]] = None
+    units: Dict[str, str] = field(default_factory=dict)
+    # lines appended to each unit's journal
+    logs: Dict[str, Tuple[str, ...]] = field(default_factory=dict)
+
+    @property
+    def empty(self) -> bool:
+        return not (self.cwd or self.files or self.dirs or self.routes is not None or self.units or self.logs)
+
+    def to_dict(self) -> Dict[str, Any]:
+        data: Dict[str, Any] = {}
+        if self.cwd:
+            data["cwd"] = self.cwd
+        for name in ("files", "dirs", "units"):
+            if getattr(self, name):
+                data[name] = getattr(self, name)
+        if self.routes is not None:
+            data["routes"] = list(self.routes)
+        if self.logs:
+            data["logs"] = {unit: list(lines) for unit, lines in self.logs.items()}
+        return data
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "HostOverlay":
+        routes = data.get("routes")
+        return cls(
+            cwd=data.get("cwd", ""),
+            files=dict(data.get("files", {})),
+            dirs=dict(data.get("dirs", {})),
+            routes=tuple(routes) if routes is not None else None,
+            units=dict(data.get("units", {})),
+            logs={unit: tuple(lines) for unit, lines in data.get("logs", {}).items()},
+        )
+
+
+@dataclass(frozen=True)
+class HostLimits:
+    """Bounds on one session's overlay, which is stored and persisted with the session."""
+
+    # characters of file content across the overlay
+    max_bytes: int = 64 * 1024
+    # files and directories in the overlay, and routes in the table
+    max_entries: int = 256
+
+
+@dataclass(frozen=True)
+class HostExpectation:
+    """State a step's host must be in, checked after each command of that step."""
+
+    # a route starting with each of these
+    routes: Tuple[str, ...] = ()
+    # unit name -> state
+    units: Dict[str, str] = field(default_factory=dict)
+    # path -> text the file must contain
+    files: Dict[str, str] = field(default_factory=dict)
+    # paths that must not exist
+    absent: Tuple[str, ...] = ()
+
+    def met_by(self, host: "HostView") -> bool:
+        routes = host.routes
+        if not all(any(route.startswith(prefix) for route in routes) for prefix in self.routes):
+            return False
+        if any(host.unit_state(name) != state for name, state in self.units.items()):
+            return False
+        for path, text in self.files.items():
+            content = host.read(path)
+            if content is None or text not in content:
+                return False
+        return not any(host.exists(path) for path in self.absent)
+
+
+@dataclass
+class CommandResult:
+    output: List[str]
+    # False when no handler knows the command
+    handled: bool
+    # whether the command modified the host
+    changed: bool
+
+
+class HostView:
+    """A session's host: reads fall through its overlay to the image, writes touch only the overlay."""
+
+    def __init__(
+        self, image: HostImage, overlay: Optional[HostOverlay] = None, limits: HostLimits = HostLimits()
+    ) -> None:
+        self.image = image
+        self.overlay = overlay if overlay is not None else HostOverlay()
+        self.limits = limits
+        self.changed = False
+
+    def run(self, command: str) -> CommandResult:
+        tokens = [self._expand(token) for token in split_command(command)]
+        redirect: Optional[Tuple[str, str]] = None
+        for index, token in enumerate(tokens[:-1]):
+            if token in (">", ">>"):
+                redirect = (token, tokens[index + 1])
+                tokens = tokens[:index]
+                break
+        handler = HANDLERS.get(tokens[0]) if tokens else None
+        if handler is None:
+            return CommandResult(output=[], handled=False, changed=False)
+
+        output = handler(self, tokens[1:])
+        if redirect is not None:
+            output = self._redirect(redirect, output)
+        return CommandResult(output=output, handled=True, changed=self.changed)
+
+    # -- filesystem --
+
+    @property
+    def cwd(self) -> str:
+        return self.overlay.cwd or self.image.cwd
+
+    @cwd.setter
+    def cwd(self, path: str) -> None:
+        self.overlay.cwd = "" if path == self.image.cwd else path
+
+    def resolve(self, path: str) -> str:
+        if path == "~" or path.startswith("~/"):
+            path = self.image.home + path[1:]
+        path = posixpath.normpath(posixpath.join(self.cwd, path))
+        # normpath keeps a leading "//"
+        return "/" + path.lstrip("/")
+
+    def read(self, path: str) -> Optional[str]:
+        if path in self.overlay.files:
+            return self.overlay.files[path]
+        return self.image.files.get(path)
+
+    def is_dir(self, path: str) -> bool:
+        return self.overlay.dirs.get(path, path in self.image.dirs)
+
+    def exists(self, path: str) -> bool:
+        return self.read(path) is not None or self.is_dir(path)
+
+    def listdir(self, path: str) -> List[str]:
+        names = set(self.image.children.get(path, ()))
+        for changed in (self.overlay.files, self.overlay.dirs):
+            for child in changed:
+                if child != "/" and posixpath.dirname(child) == path:
+                    names.add(posixpath.basename(child))
+        if self.overlay.files or self.overlay.dirs:
+            names = {name for name in names if self.exists(posixpath.join(path, name))}
+        return sorted(names)
+
+    def write(self, path: str, content: str) -> None:
+        files = self.overlay.files
+        if path not in files and len(files) + len(self.overlay.dirs) >= self.limits.max_entries:
+            raise HostFull("No space left on device")
+        stored = sum(len(text) for text in files.values() if text) - len(files.get(path) or "")
+        if stored + len(content) > self.limits.max_bytes:
+            raise HostFull("No space left on device")
+        files[path] = content
+        self.changed = True
+
+    def remove(self, path: str) -> None:
+        if self.is_dir(path):
+            for name in self.listdir(path):
+                self.remove(posixpath.join(path, name))
+            self._set(self.overlay.dirs, path, path in self.image.dirs, False)
+        else:
+            self._set(self.overlay.files, path, path in self.image.files, None)
+        self.changed = True
+
+    def mkdir(self, path: str) -> None:
+        dirs = self.overlay.dirs
+        if path not in dirs and path not in self.image.dirs:
+            if len(self.overlay.files) + len(dirs) >= self.limits.max_entries:
+                raise HostFull("No space left on device")
+        self._set(self.overlay.dirs, path, path in self.image.dirs, True)
+        self.changed = True
+
+    @staticmethod
+    def _set(entries: Dict[str, Any], path: str, in_image: bool, value: Any) -> None:
+        # record a removal only where the image has the entry
+        if value in (None, False) and not in_image:
+            entries.pop(path, None)
+        elif value is True and in_image:
+            entries.pop(path, None)
+        else:
+            entries[path] = value
+
+    # -- network and services --
+
+    @property
+    def routes(self) -> Tuple[str, ...]:
+        if self.overlay.routes is not None:
+            return self.overlay.routes
+        return self.image.routes
+
+    @routes.setter
+    def routes(self, routes: Tuple[str, ...]) -> None:
+        self.overlay.routes = None if routes == self.image.routes else routes
+        self.changed = True
+
+    def unit_state(self, name: str) -> Optional[str]:
+        name = _unit_name(name)
+        unit = self.image.units.get(name)
+        if unit is None:
+            return None
+        return self.overlay.units.get(name, unit.state)
+
+    def set_unit_state(self, name: str, state: str) -> None:
+        name = _unit_name(name)
+        if state == self.image.units[name].state:
+            self.overlay.units.pop(name, None)
+        else:
+            self.overlay.units[name] = state
+        self.changed = True
+
+    def journal(self, unit: Optional[str] = None) -> List[str]:
+        if unit is not None:
+            unit = _unit_name(unit)
+            return [*self.image.logs.get(unit, ()), *self.overlay.logs.get(unit, ())]
+        lines: List[str] = []
+        for name in dict.fromkeys([*self.image.logs, *self.overlay.logs]):
+            lines.extend(self.journal(name))
+        return lines
+
+    def log(self, unit: str, message: str) -> None:
+        unit = _unit_name(unit)
+        line = f"{time.strftime('%b %d %H:%M:%S')} {self.image.hostname} systemd[1]: {message}"
+        self.overlay.logs[unit] = (*self.overlay.logs.get(unit, ()), line)[-OVERLAY_LOG_LINES:]
+        self.changed = True
+
+    def _expand(self, token: str) -> str:
+        if "$" not in token:
+            return token
+        values = {
+            "$HOSTNAME": self.image.hostname,
+            "$HOME": self.image.home,
+            "$USER": self.image.user,
+            "$PWD": self.cwd,
+        }
+        for name in _VARIABLES:
+            token = token.replace(name, values[name])
+        return token
+
+    def _redirect(self, redirect: Tuple[str, str], output: List[str]) -> List[str]:
+        operator, target = redirect
+        path = self.resolve(target)
+        if self.is_dir(path):
+            return [f"bash: {target}: Is a directory"]
+        if not self.is_dir(posixpath.dirname(path)):
+            return [f"bash: {target}: No such file or directory"]
+        text = "".join(line + "\n" for line in output)
+        if operator == ">>":
+            text = (self.read(path) or "") + text
+        try:
+            self.write(path, text)
+        except HostFull as exc:
+            return [f"bash: {target}: {exc}"]
+        return []
+
+
+def _unit_name(name: str) -> str:
+    return name.removesuffix(".service")
+
+
+Handler = Callable[[HostView, List[str]], List[str]]
+
+HANDLERS: Dict[str, Handler] = {}
+
+
+def handles(*names: str) -> Callable[[Handler], Handler]:
+    def register(func: Handler) -> Handler:
+        for name in names:
+            HANDLERS[name] = func
+        return func
+
+    return register
+
+
+def _options(args: List[str], valued: Iterable[str] = ()) -> Tuple[Set[str], Dict[str, str], List[str]]:
+    """Split ``args`` into short or long switches, options taking a value, and operands."""
+    valued = set(valued)
+    switches: Set[str] = set()
+    values: Dict[str, str] = {}
+    operands: List[str] = []
+    index = 0
+    while index < len(args):
+        arg = args[index]
+        index += 1
+        if len(arg) < 2 or arg[0] != "-" or arg[1].isdigit():
+            operands.append(arg)
+        elif arg.startswith("--"):
+            name, equals, value = arg.partition("=")
+            if equals:
+                values[name] = value
+            elif name in valued and index < len(args):
+                values[name] = args[index]
+                index += 1
+            else:
+                switches.add(name)
+        elif f"-{arg[1]}" in valued:
+            # "-n5" and "-n 5"
+            if len(arg) > 2:
+                values[arg[:2]] = arg[2:]
+            elif index < len(args):
+                values[arg] = args[index]
+                index += 1
+        else:
+            switches.update(f"-{char}" for char in arg[1:])
+    return switches, values, operands
+
+
+def _count(value: Optional[str], default: int) -> int:
+    try:
+        return max(0, int(value)) if value is not None else default
+    except ValueError:
+        return default
+
+
+@handles("pwd")
+def _pwd(host: HostView, args: List[str]) -> List[str]:
+    return [host.cwd]
+
+
+@handles("cd")
+def _cd(host: HostView, args: List[str]) -> List[str]:
+    target = args[0] if args else "~"
+    path = host.resolve(target)
+    if not host.is_dir(path):
+        reason = "Not a directory" if host.exists(path) else "No such file or directory"
+        return [f"cd: {target}: {reason}"]
+    host.cwd = path
+    return []
+
+
+@handles("ls")
+def _ls(host: HostView, args: List[str]) -> List[str]:
+    switches, _, operands = _options(args)
+    show_hidden = "-a" in switches
+    long_format = "-l" in switches
+    output: List[str] = []
+    for target in operands or ["."]:
+        path = host.resolve(target)
+        if not host.exists(path):
+            output.append(f"ls: cannot access '{target}': No such file or directory")
+            continue
+        if host.is_dir(path):
+            names = [name for name in host.listdir(path) if show_hidden or not name.startswith(".")]
+            if show_hidden:
+                names = [".", "..", *names]
+            directory = path
+        else:
+            names = [target]
+            directory = posixpath.dirname(path)
+        if len(operands) > 1 and host.is_dir(path):
+            output.append(f"{target}:")
+        if long_format:
+            output.extend(_long_entry(host, posixpath.join(directory, name), name) for name in names)
+        elif names:
+            output.append("  ".join(names))
+    return output
+
+
+def _long_entry(host: HostView, path: str, name: str) -> str:
+    user = host.image.user
+    if host.is_dir(host.resolve(path)):
+        return f"drwxr-xr-x 2 {user} {user} {4096:>6} {name}"
+    content = host.read(path) or ""
+    mode = "-rwxr-xr-x" if name.endswith(".sh") else "-rw-r--r--"
+    return f"{mode} 1 {user} {user} {len(content.encode('utf-8')):>6} {name}"
+
+
+def _read_operands(host: HostView, command: str, operands: List[str]) -> Tuple[List[str], List[str]]:
+    """Lines of every readable operand, and an error line for each other one."""
+    lines: List[str] = []
+    errors: List[str] = []
+    for target in operands:
+        path = host.resolve(target)
+        content = host.read(path)
+        if content is not None:
+            lines.extend(content.splitlines())
+        elif host.is_dir(path):
+            errors.append(f"{command}: {target}: Is a directory")
+        else:
+            errors.append(f"{command}: {target}: No such file or directory")
+    return lines, errors
+
+
+@handles("cat")
+def _cat(host: HostView, args: List[str]) -> List[str]:
+    _, _, operands = _options(args)
+    lines, errors = _read_operands(host, "cat", operands)
+    return lines + errors
+
+
+@handles("tail")
+def _tail(host: HostView, args: List[str]) -> List[str]:
+    _, values, operands = _options(args, valued=("-n",))
+    count = _count(values.get("-n"), 10)
+    lines, errors = _read_operands(host, "tail", operands)
+    return errors + (lines[len(lines) - count :] if count else [])
+
+
+@handles("head")
+def _head(host: HostView, args: List[str]) -> List[str]:
+    _, values, operands = _options(args, valued=("-n",))
+    lines, errors = _read_operands(host, "head", operands)
+    return errors + lines[: _count(values.get("-n"), 10)]
+
+
+@handles("grep")
+def _grep(host: HostView, args: List[str]) -> List[str]:
+    switches, _, operands = _options(args)
+    if not operands:
+        return ["Usage: grep [OPTION]... PATTERNS [FILE]..."]
+    pattern, targets = operands[0], operands[1:]
+    ignore_case = "-i" in switches
+    if ignore_case:
+        pattern = pattern.lower()
+    output: List[str] = []
+    for target in targets:
+        lines, errors = _read_operands(host, "grep", [target])
+        output.extend(errors)
+        for line in lines:
+            if pattern in (line.lower() if ignore_case else line):
+                output.append(f"{target}:{line}" if len(targets) > 1 else line)
+    return output
+
+
+@handles("echo")
+def _echo(host: HostView, args: List[str]) -> List[str]:
+    if args and args[0] == "-n":
+        args = args[1:]
+    return [" ".join(args)]
+
+
+@handles("printf")
+def _printf(host: HostView, args: List[str]) -> List[str]:
+    # only the format string; escapes and directives are not interpreted
+    return [args[0].replace("\\n", "")] if args else []
+
+
+@handles("touch")
+def _touch(host: HostView, args: List[str]) -> List[str]:
+    _, _, operands = _options(args)
+    output: List[str] = []
+    for target in operands:
+        path = host.resolve(target)
+        if host.exists(path):
+            continue
+        if not host.is_dir(posixpath.dirname(path)):
+            output.append(f"touch: cannot touch '{target}': No such file or directory")
+            continue
+        try:
+            host.write(path, "")
+        except HostFull as exc:
+            output.append(f"touch: cannot touch '{target}': {exc}")
+    return output
+
+
+@handles("mkdir")
+def _mkdir(host: HostView, args: List[str]) -> List[str]:
+    switches, _, operands = _options(args)
+    parents = "-p" in switches
+    output: List[str] = []
+    for target in operands:
+        path = host.resolve(target)
+        if host.exists(path):
+            if not (parents and host.is_dir(path)):
+                output.append(f"mkdir: cannot create directory '{target}': File exists")
+            continue
+        missing = []
+        parent = posixpath.dirname(path)
+        while not host.exists(parent):
+            missing.append(parent)
+            parent = posixpath.dirname(parent)
+        if not host.is_dir(parent) or (missing and not parents):
+            output.append(f"mkdir: cannot create directory '{target}': No such file or directory")
+            continue
+        try:
+            for directory in [*reversed(missing), path]:
+                host.mkdir(directory)
+        except HostFull as exc:
+            output.append(f"mkdir: cannot create directory '{target}': {exc}")
+    return output
+
+
+@handles("rm")
+def _rm(host: HostView, args: List[str]) -> List[str]:
+    switches, _, operands = _options(args)
+    recursive = bool({"-r", "-R", "--recursive"} & switches)
+    force = bool({"-f", "--force"} & switches)
+    output: List[str] = []
+    for target in operands:
+        path = host.resolve(target)
+        if not host.exists(path):
+            if not force:
+                output.append(f"rm: cannot remove '{target}': No such file or directory")
+        elif host.is_dir(path) and not recursive:
+            output.append(f"rm: cannot remove '{target}': Is a directory")
+        elif path == "/":
+            output.append("rm: it is dangerous to operate recursively on '/'")
+        else:
+            host.remove(path)
+    return output
+
+
+@handles("hostname")
+def _hostname(host: HostView, args: List[str]) -> List[str]:
+    return [host.image.hostname]
+
+
+@handles("whoami")
+def _whoami(host: HostView, args: List[str]) -> List[str]:
+    return [host.image.user]
+
+
+@lru_cache(maxsize=None)
+def _parse_interface(address: str) -> ipaddress.IPv4Interface:
+    return ipaddress.IPv4Interface(address)
+
+
+def _interfaces(host: HostView) -> List[Tuple[str, ipaddress.IPv4Interface]]:
+    return [("lo", _parse_interface("127.0.0.1/8"))] + [
+        (name, _parse_interface(address)) for name, address in host.image.interfaces.items()
+    ]
+
+
+def _interface_for(host: HostView, address: str) -> Optional[str]:
+    try:
+        target = ipaddress.IPv4Address(address)
+    except ValueError:
+        return None
+    for name, interface in _interfaces(host):
+        if target in interface.network:
+            return name
+    return None
+
+
+@handles("ip")
+def _ip(host: HostView, args: List[str]) -> List[str]:
+    _, _, operands = _options(args)
+    if not operands or "address".startswith(operands[0]):
+        return _ip_addr(host)
+    if "route".startswith(operands[0]):
+        return _ip_route(host, operands[1:])
+    return [f'Object "{operands[0]}" is unknown, try "ip help".']
+
+
+def _ip_addr(host: HostView) -> List[str]:
+    output = []
+    for index, (name, interface) in enumerate(_interfaces(host), start=1):
+        if name == "lo":
+            output.append(f"{index}: lo: <LOOPBACK,UP,LOWER_UP> mtu 65536")
+            output.append(f"    inet {interface.with_prefixlen} scope host lo")
+        else:
+            output.append(f"{index}: {name}: <BROADCAST,MULTICAST,UP,LOWER_UP> mtu 1500")
+            broadcast = interface.network.broadcast_address
+            output.append(f"    inet {interface.with_prefixlen} brd {broadcast} scope global {name}")
+    return output
+
+
+def _ip_route(host: HostView, args: List[str]) -> List[str]:
+    if not args or args[0] in ("show", "list"):
+        return list(host.routes)
+    action, spec = args[0], args[1:]
+    if not spec:
+        return ["Command line is not complete. Try option \"help\""]
+    destination = spec[0]
+    if action == "add":
+        words = dict(zip(spec[1::2], spec[2::2]))
+        gateway = words.get("via")
+        device = words.get("dev") or (_interface_for(host, gateway) if gateway else None)
+        if gateway and _interface_for(host, gateway) is None:
+            return ["Error: Nexthop has invalid gateway."]
+        if device is None or device not in host.image.interfaces:
+            return [f'Cannot find device "{device}"' if device else "Error: no device for this route."]
+        if any(route.split()[0] == destination for route in host.routes):
+            return ["RTNETLINK answers: File exists"]
+        if len(host.routes) >= host.limits.max_entries:
+            return ["RTNETLINK answers: No buffer space available"]
+        route = f"{destination} via {gateway} dev {device}" if gateway else f"{destination} dev {device}"
+        # the default route is listed first, like the kernel does
+        host.routes = (route, *host.routes) if destination == "default" else (*host.routes, route)
+        return []
+    if action in ("del", "delete"):
+        kept = tuple(route for route in host.routes if route.split()[0] != destination)
+        if len(kept) == len(host.routes):
+            return ["RTNETLINK answers: No such process"]
+        host.routes = kept
+        return []
+    return [f'Command "{action}" is unknown, try "ip route help".']
+
+
+@handles("ifconfig")
+def _ifconfig(host: HostView, args: List[str]) -> List[str]:
+    output = []
+    for name, interface in _interfaces(host)[1:]:
+        output.append(f"{name}: flags=4163<UP,BROADCAST,RUNNING,MULTICAST> mtu 1500")
+        output.append(
+            f"        inet {interface.ip}  netmask {interface.netmask}  broadcast {interface.network.broadcast_address}"
+        )
+    return output
+
+
+@handles("ping")
+def _ping(host: HostView, args: List[str]) -> List[str]:
+    _, values, operands = _options(args, valued=("-c", "-i", "-W", "-w"))
+    if not operands:
+        return ["ping: usage error: Destination address required"]
+    target = operands[0]
+    routed = _interface_for(host, target) is not None or any(
+        route.split()[0] == "default" for route in host.routes
+    )
+    if not routed:
+        return ["ping: connect: Network is unreachable"]
+    count = _count(values.get("-c"), 3) or 1
+    return [
+        f"PING {target} ({target}) 56(84) bytes of data.",
+        *(f"64 bytes from {target}: icmp_seq={seq} ttl=115 time=22.0 ms" for seq in range(1, count + 1)),
+        f"--- {target} ping statistics ---",
+        f"{count} packets transmitted, {count} received, 0% packet loss",
+    ]
+
+
+@handles("systemctl")
+def _systemctl(host: HostView, args: List[str]) -> List[str]:
+    _, _, operands = _options(args)
+    if len(operands) < 2:
+        return ["Too few arguments."]
+    action, name = operands[0], _unit_name(operands[1])
+    unit = host.image.units.get(name)
+    if unit is None:
+        if action == "status":
+            return [f"Unit {name}.service could not be found."]
+        return [f"Failed to {action} {name}.service: Unit {name}.service not found."]
+    label = unit.description or name
+    if action == "status":
+        state = host.unit_state(name) or "inactive"
+        return [
+            f"● {name}.service - {label}",
+            f"     Loaded: loaded (/etc/systemd/system/{name}.service; enabled)",
+            f"     Active: {_ACTIVE_TEXT.get(state, state)}",
+            *host.journal(name)[-STATUS_LOG_LINES:],
+        ]
+    if action == "is-active":
+        return [host.unit_state(name) or "inactive"]
+    if action in ("start", "restart"):
+        host.set_unit_state(name, "active")
+        host.log(name, f"Started {label}.")
+        return []
+    if action == "stop":
+        host.set_unit_state(name, "inactive")
+        host.log(name, f"Stopped {label}.")
+        return []
+    return [f"Unknown command verb {action}."]
+
+
+@handles("journalctl")
+def _journalctl(host: HostView, args: List[str]) -> List[str]:
+    _, values, _ = _options(args, valued=("-u", "--unit", "-n", "--lines", "--since", "--until", "-p"))
+    unit = values.get("-u") or values.get("--unit")
+    lines = host.journal(unit)
+    count = values.get("-n") or values.get("--lines")
+    if count is not None:
+        wanted = _count(count, 10)
+        lines = lines[len(lines) - wanted :] if wanted else []
+    return lines or ["-- No entries --"]
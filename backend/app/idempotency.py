@@ -0,0 +1,73 @@
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional
+
+
+class IdempotencyConflict(ValueError):
+    def __init__(self) -> None:
+        super().__init__("Idempotency-Key was already used for a different command")
+
+
+@dataclass(slots=True)
+class CachedReply:
+    command: str
+    body: bytes
+    expires_ms: int
+
+
+class ReplyCache:
+    """Recent command responses per session, keyed by the client's ``Idempotency-Key``.
+
+    Each session keeps its ``per_session`` most recent replies for ``ttl_seconds``,
+    and only the ``max_sessions`` sessions that stored a reply most recently are
+    tracked, so the cache stays bounded whatever clients send. Sessions are kept
+    in the order they last stored a reply, which lets ``put`` drop expired ones
+    from the front as it goes. Commands use it from the event loop, but the
+    metrics gauge reads its length from the thread rendering ``/metrics``, so
+    every access holds a lock.
+    """
+
+    def __init__(self, per_session: int = 4, ttl_seconds: float = 300.0, max_sessions: int = 10_000) -> None:
+        self.per_session = per_session
+        self.ttl_ms = int(ttl_seconds * 1000)
+        self.max_sessions = max_sessions
+        self._sessions: "OrderedDict[str, OrderedDict[str, CachedReply]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, session_id: str, key: str, now_ms: int) -> Optional[CachedReply]:
+        with self._lock:
+            replies = self._sessions.get(session_id)
+            reply = replies.get(key) if replies is not None else None
+        if reply is None or reply.expires_ms <= now_ms:
+            return None
+        return reply
+
+    def put(self, session_id: str, key: str, command: str, body: bytes, now_ms: int) -> None:
+        with self._lock:
+            replies = self._sessions.pop(session_id, None)
+            if replies is None:
+                replies = OrderedDict()
+            replies.pop(key, None)
+            replies[key] = CachedReply(command, body, now_ms + self.ttl_ms)
+            while len(replies) > self.per_session:
+                replies.popitem(last=False)
+            self._sessions[session_id] = replies
+            self._expire(now_ms)
+
+    def _expire(self, now_ms: int) -> None:
+        sessions = self._sessions
+        while len(sessions) > self.max_sessions:
+            sessions.popitem(last=False)
+        # a session's newest reply is its last one; once that expired, all of them have
+        while sessions:
+            oldest = next(iter(sessions.values()))
+            if next(reversed(oldest.values())).expires_ms > now_ms:
+                break
+            sessions.popitem(last=False)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return sum(len(replies) for replies in self._sessions.values())
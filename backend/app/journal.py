@@ -0,0 +1,510 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+import struct
+import threading
+import zlib
+from pathlib import Path
+from typing import BinaryIO, Dict, Iterator, List, Optional, Tuple
+
+from .host import HostOverlay
+from .leaderboard import InMemoryLeaderboards, RankedRun
+from .sessions import (
+    InMemorySessionBackend,
+    MissionSession,
+    epoch_to_monotonic_ms,
+    monotonic_ms_to_epoch,
+)
+
+logger = logging.getLogger(__name__)
+
+# bump when a record layout changes; older files are skipped with a warning
+MAGIC = b"SSJ2"
+
+# frame: payload length, crc32 of kind + payload, kind
+_FRAME = struct.Struct("<IIB")
+# step, mistakes, score, time limit, hint index, started, last active and completed
+# (epoch ms, 0 when not completed), then the byte lengths of the id, mission id,
+# version and player name and the history size; the history follows, then the
+# host overlay as JSON text ("" when none), the cohort id and the number of
+# commands dropped from the history, which records written before them lack
+_SESSION = struct.Struct("<iiiiiqqqHHHHI")
+# score, mistakes, elapsed ms, completed at (epoch seconds)
+_RANKED = struct.Struct("<iiqd")
+_LENGTH = struct.Struct("<I")
+_COUNT = struct.Struct("<I")
+
+RECORD_SESSION = 1
+RECORD_REMOVED = 2
+RECORD_RANKED = 3
+
+SYNC_MODES = ("commit", "interval", "off")
+
+
+def _epoch_ms(value: int) -> int:
+    return int(monotonic_ms_to_epoch(value) * 1000)
+
+
+def _pack_text(value: str) -> bytes:
+    raw = value.encode("utf-8")
+    return _LENGTH.pack(len(raw)) + raw
+
+
+def _unpack_text(payload: bytes, offset: int) -> Tuple[str, int]:
+    (length,) = _LENGTH.unpack_from(payload, offset)
+    offset += _LENGTH.size
+    return payload[offset : offset + length].decode("utf-8"), offset + length
+
+
+def _frame(kind: int, payload: bytes) -> bytes:
+    return _FRAME.pack(len(payload), zlib.crc32(payload, kind), kind) + payload
+
+
+def encode_session(session: MissionSession) -> bytes:
+    session_id = session.session_id.encode("utf-8")
+    mission_id = session.mission_id.encode("utf-8")
+    mission_version = session.mission_version.encode("utf-8")
+    player_name = session.player_name.encode("utf-8")
+    parts = [
+        _SESSION.pack(
+            session.step_index,
+            session.mistakes,
+            session.total_score,
+            session.time_limit_seconds,
+            session.hint_index,
+            _epoch_ms(session.started_ms),
+            _epoch_ms(session.last_active_ms),
+            _epoch_ms(session.completed_ms) if session.completed_ms else 0,
+            len(session_id),
+            len(mission_id),
+            len(mission_version),
+            len(player_name),
+            len(session.recent_commands),
+        ),
+        session_id,
+        mission_id,
+        mission_version,
+        player_name,
+    ]
+    parts.extend(_pack_text(command) for command in session.recent_commands)
+    parts.append(_pack_text(json.dumps(session.host.to_dict()) if session.host is not None else ""))
+    parts.append(_pack_text(session.cohort_id))
+    parts.append(_COUNT.pack(session.commands_dropped))
+    return _frame(RECORD_SESSION, b"".join(parts))
+
+
+def decode_session(payload: bytes) -> MissionSession:
+    (
+        step_index,
+        mistakes,
+        total_score,
+        time_limit_seconds,
+        hint_index,
+        started_epoch_ms,
+        last_active_epoch_ms,
+        completed_epoch_ms,
+        session_id_length,
+        mission_id_length,
+        version_length,
+        player_name_length,
+        history_length,
+    ) = _SESSION.unpack_from(payload)
+    offset = _SESSION.size
+    session_id = payload[offset : offset + session_id_length].decode("utf-8")
+    offset += session_id_length
+    mission_id = payload[offset : offset + mission_id_length].decode("utf-8")
+    offset += mission_id_length
+    mission_version = payload[offset : offset + version_length].decode("utf-8")
+    offset += version_length
+    player_name = payload[offset : offset + player_name_length].decode("utf-8")
+    offset += player_name_length
+    history = []
+    for _ in range(history_length):
+        command, offset = _unpack_text(payload, offset)
+        history.append(command)
+    host = cohort_id = ""
+    if offset < len(payload):
+        host, offset = _unpack_text(payload, offset)
+    if offset < len(payload):
+        cohort_id, offset = _unpack_text(payload, offset)
+    commands_dropped = 0
+    if offset < len(payload):
+        (commands_dropped,) = _COUNT.unpack_from(payload, offset)
+        offset += _COUNT.size
+    return MissionSession(
+        session_id=session_id,
+        mission_id=mission_id,
+        mission_version=mission_version,
+        step_index=step_index,
+        mistakes=mistakes,
+        total_score=total_score,
+        started_ms=epoch_to_monotonic_ms(started_epoch_ms / 1000),
+        time_limit_seconds=time_limit_seconds,
+        last_active_ms=epoch_to_monotonic_ms(last_active_epoch_ms / 1000),
+        hint_index=hint_index,
+        recent_commands=tuple(history),
+        player_name=player_name,
+        completed_ms=epoch_to_monotonic_ms(completed_epoch_ms / 1000) if completed_epoch_ms else 0,
+        host=HostOverlay.from_dict(json.loads(host)) if host else None,
+        cohort_id=cohort_id,
+        commands_dropped=commands_dropped,
+    )
+
+
+def encode_removed(session_id: str, reason: str) -> bytes:
+    return _frame(RECORD_REMOVED, _pack_text(session_id) + _pack_text(reason))
+
+
+def decode_removed(payload: bytes) -> Tuple[str, str]:
+    session_id, offset = _unpack_text(payload, 0)
+    reason, _ = _unpack_text(payload, offset)
+    return session_id, reason
+
+
+def encode_ranked(run: RankedRun) -> bytes:
+    return _frame(
+        RECORD_RANKED,
+        _RANKED.pack(run.total_score, run.mistakes, run.elapsed_ms, run.completed_at)
+        + _pack_text(run.mission_id)
+        + _pack_text(run.session_id)
+        + _pack_text(run.player_name),
+    )
+
+
+def decode_ranked(payload: bytes) -> RankedRun:
+    total_score, mistakes, elapsed_ms, completed_at = _RANKED.unpack_from(payload)
+    mission_id, offset = _unpack_text(payload, _RANKED.size)
+    session_id, offset = _unpack_text(payload, offset)
+    player_name, _ = _unpack_text(payload, offset)
+    return RankedRun(
+        mission_id=mission_id,
+        session_id=session_id,
+        player_name=player_name,
+        total_score=total_score,
+        mistakes=mistakes,
+        elapsed_ms=elapsed_ms,
+        completed_at=completed_at,
+    )
+
+
+def read_records(path: Path) -> Iterator[Tuple[int, bytes]]:
+    """Yield (kind, payload) frames, stopping quietly at a torn or corrupt tail."""
+    data = path.read_bytes()
+    if not data.startswith(MAGIC):
+        logger.warning("Skipping %s: not a session journal file", path)
+        return
+    offset = len(MAGIC)
+    end = len(data)
+    while offset + _FRAME.size <= end:
+        length, checksum, kind = _FRAME.unpack_from(data, offset)
+        start = offset + _FRAME.size
+        payload = data[start : start + length]
+        if len(payload) < length or zlib.crc32(payload, kind) != checksum:
+            logger.warning("Ignoring torn journal tail in %s at byte %d", path, offset)
+            return
+        yield kind, payload
+        offset = start + length
+
+
+class SessionJournal:
+    """Append-only binary log of session changes for the in-memory backend.
+
+    Every change is framed as the session's full state (or its removal), so replay
+    is a sequence of idempotent upserts. Appends only queue bytes; a flusher
+    thread writes and fsyncs whatever accumulated since its last pass, so
+    concurrent commands share one fsync (group commit). In ``commit`` mode callers
+    await ``flushed()`` before acknowledging a change; ``interval`` fsyncs in the
+    background every ``fsync_interval_seconds`` and ``off`` writes on the same
+    schedule but leaves syncing to the OS. When a write or fsync fails, the
+    callers waiting on it get the error and the next pass retries the same bytes.
+
+    Completed runs are journaled as well, so leaderboards outlive the sessions
+    that produced them.
+
+    ``snapshot`` writes every live session to ``snapshot-N.bin`` while switching new
+    appends to ``journal-N.log``, after which older files are deleted. Recovery
+    loads the newest snapshot and replays the segments that follow it.
+    """
+
+    def __init__(
+        self,
+        directory: Path,
+        sync: str = "commit",
+        fsync_interval_seconds: float = 1.0,
+        snapshot_bytes: int = 64 * 1024 * 1024,
+    ) -> None:
+        if sync not in SYNC_MODES:
+            raise ValueError(f"journal sync mode must be one of {', '.join(SYNC_MODES)}")
+        self.directory = directory
+        self.sync = sync
+        self.fsync_interval_seconds = fsync_interval_seconds
+        self.snapshot_bytes = snapshot_bytes
+        self.generation = 0
+        self.segment_bytes = 0
+        self._handle: Optional[BinaryIO] = None
+        self._buffer: List[bytes] = []
+        self._appended = 0
+        self._durable = 0
+        self._waiters: List[Tuple[int, asyncio.AbstractEventLoop, asyncio.Future]] = []
+        self._cond = threading.Condition()
+        # held while bytes move to disk so rotation never interleaves with a flush
+        self._io_lock = threading.Lock()
+        self._flusher: Optional[threading.Thread] = None
+        self._closing = False
+
+    def record_session(self, session: MissionSession) -> None:
+        self._append(encode_session(session))
+
+    def record_ranked(self, run: RankedRun) -> None:
+        self._append(encode_ranked(run))
+
+    def record_removed(self, session_ids: List[str], reason: str) -> None:
+        if session_ids:
+            self._append(b"".join(encode_removed(session_id, reason) for session_id in session_ids))
+
+    def _append(self, frame: bytes) -> None:
+        with self._cond:
+            self._buffer.append(frame)
+            self._appended += 1
+            self.segment_bytes += len(frame)
+
+    async def flushed(self) -> None:
+        if self.sync != "commit":
+            return
+        with self._cond:
+            target = self._appended
+            if self._durable >= target:
+                return
+            loop = asyncio.get_running_loop()
+            future = loop.create_future()
+            self._waiters.append((target, loop, future))
+            self._cond.notify()
+        await future
+
+    def start(self) -> None:
+        if self._handle is None:
+            self._open_segment(self.generation)
+        self._flusher = threading.Thread(target=self._run_flusher, name="session-journal", daemon=True)
+        self._flusher.start()
+
+    def _run_flusher(self) -> None:
+        while True:
+            with self._cond:
+                # commit mode flushes as soon as someone waits; appends alone
+                # (and the other modes) are flushed on the interval
+                if not self._closing and not (self.sync == "commit" and self._waiters):
+                    self._cond.wait(self.fsync_interval_seconds)
+                closing = self._closing
+            self._flush()
+            if closing:
+                return
+
+    def _flush(self) -> None:
+        with self._io_lock:
+            self._flush_locked()
+
+    def _flush_locked(self) -> None:
+        chunk, target = self._take_buffer()
+        self._write_chunk(self._handle, chunk, target)
+
+    def _take_buffer(self) -> Tuple[bytes, int]:
+        with self._cond:
+            chunk = b"".join(self._buffer)
+            self._buffer.clear()
+            return chunk, self._appended
+
+    def _write_chunk(self, handle: Optional[BinaryIO], chunk: bytes, target: int) -> None:
+        if chunk and handle is not None:
+            offset = handle.tell()
+            try:
+                _write_all(handle, chunk)
+                if self.sync != "off":
+                    os.fsync(handle.fileno())
+            except OSError as exc:
+                self._write_failed(handle, chunk, offset, exc)
+                return
+        with self._cond:
+            self._durable = target
+            ready = [waiter for waiter in self._waiters if waiter[0] <= target]
+            self._waiters = [waiter for waiter in self._waiters if waiter[0] > target]
+        for _, loop, future in ready:
+            if not loop.is_closed():
+                loop.call_soon_threadsafe(_resolve, future)
+
+    def _write_failed(self, handle: BinaryIO, chunk: bytes, offset: int, exc: OSError) -> None:
+        # cut off any part of the chunk that landed, since replay stops at a torn frame,
+        # and keep the chunk queued so the next pass retries it
+        logger.error("Session journal write failed, retrying on the next flush: %s", exc)
+        try:
+            handle.truncate(offset)
+        except OSError:
+            logger.exception("Could not trim the failed write from %s", handle.name)
+        with self._cond:
+            self._buffer.insert(0, chunk)
+            failed, self._waiters = self._waiters, []
+        for _, loop, future in failed:
+            if not loop.is_closed():
+                loop.call_soon_threadsafe(_fail, future, exc)
+
+    def _open_segment(self, generation: int) -> None:
+        path = self._segment_path(generation)
+        # unbuffered, so a failed write leaves nothing behind to be flushed later
+        self._handle = path.open("ab", buffering=0)
+        if self._handle.tell() == 0:
+            _write_all(self._handle, MAGIC)
+        self.generation = generation
+        self.segment_bytes = 0
+
+    def close(self) -> None:
+        with self._cond:
+            self._closing = True
+            self._cond.notify()
+        if self._flusher is not None:
+            self._flusher.join()
+            self._flusher = None
+        self._flush()
+        if self._handle is not None:
+            self._handle.close()
+            self._handle = None
+
+    def needs_snapshot(self) -> bool:
+        return self.segment_bytes >= self.snapshot_bytes
+
+    def snapshot(
+        self, backend: InMemorySessionBackend, leaderboards: Optional[InMemoryLeaderboards] = None
+    ) -> int:
+        with self._io_lock:
+            # every request waits on the backend's lock, so only take references under
+            # it; everything appended so far belongs to the old segment, which the
+            # snapshot then stands in for along with every earlier file
+            with backend.frozen() as (sessions, tombstones):
+                chunk, target = self._take_buffer()
+                previous = self._handle
+                self._open_segment(self.generation + 1)
+                live = list(sessions)
+                buried = list(tombstones)
+                runs = leaderboards.runs() if leaderboards is not None else []
+            self._write_chunk(previous, chunk, target)
+            if previous is not None:
+                previous.close()
+        frames = [_encode_live(backend, session) for session in live]
+        count = len(frames)
+        frames.extend(encode_removed(session_id, reason) for session_id, reason in buried)
+        frames.extend(encode_ranked(run) for run in runs)
+        generation = self.generation
+
+        partial = self._snapshot_path(generation).with_suffix(".tmp")
+        with partial.open("wb") as handle:
+            handle.write(MAGIC)
+            handle.write(b"".join(frames))
+            handle.flush()
+            os.fsync(handle.fileno())
+        os.replace(partial, self._snapshot_path(generation))
+        self._sync_directory()
+
+        for path in self.directory.iterdir():
+            file_generation = _generation_of(path)
+            if file_generation is not None and file_generation < generation:
+                path.unlink()
+        return count
+
+    def recover(
+        self, backend: InMemorySessionBackend, leaderboards: Optional[InMemoryLeaderboards] = None
+    ) -> int:
+        """Rebuild ``backend`` from the newest snapshot and the segments after it."""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        snapshots = sorted(
+            (generation, path)
+            for path in self.directory.glob("snapshot-*.bin")
+            if (generation := _generation_of(path)) is not None
+        )
+        segments = sorted(
+            (generation, path)
+            for path in self.directory.glob("journal-*.log")
+            if (generation := _generation_of(path)) is not None
+        )
+        base = snapshots[-1][0] if snapshots else -1
+
+        sessions: Dict[str, MissionSession] = {}
+        tombstones: Dict[str, str] = {}
+        runs: Dict[str, RankedRun] = {}
+        sources = ([snapshots[-1][1]] if snapshots else []) + [
+            path for generation, path in segments if generation >= base
+        ]
+        for path in sources:
+            for kind, payload in read_records(path):
+                if kind == RECORD_SESSION:
+                    session = decode_session(payload)
+                    sessions[session.session_id] = session
+                    tombstones.pop(session.session_id, None)
+                elif kind == RECORD_REMOVED:
+                    session_id, reason = decode_removed(payload)
+                    sessions.pop(session_id, None)
+                    tombstones[session_id] = reason
+                elif kind == RECORD_RANKED:
+                    run = decode_ranked(payload)
+                    runs[run.session_id] = run
+        backend.restore(sessions.values(), tombstones.items())
+        if leaderboards is not None:
+            leaderboards.restore(runs.values())
+
+        # appends go to a fresh segment so nothing lands after a torn tail
+        self.generation = max([base, *(generation for generation, _ in segments)]) + 1
+        return len(sessions)
+
+    def _segment_path(self, generation: int) -> Path:
+        return self.directory / f"journal-{generation:08d}.log"
+
+    def _snapshot_path(self, generation: int) -> Path:
+        return self.directory / f"snapshot-{generation:08d}.bin"
+
+    def _sync_directory(self) -> None:
+        # make the rename itself durable; not every platform can fsync a directory
+        try:
+            descriptor = os.open(self.directory, os.O_RDONLY)
+        except OSError:
+            return
+        try:
+            os.fsync(descriptor)
+        except OSError:
+            pass
+        finally:
+            os.close(descriptor)
+
+
+def _generation_of(path: Path) -> Optional[int]:
+    stem = path.stem
+    prefix, _, number = stem.partition("-")
+    if prefix not in ("journal", "snapshot") or path.suffix not in (".log", ".bin") or not number.isdigit():
+        return None
+    return int(number)
+
+
+def _encode_live(backend: InMemorySessionBackend, session: MissionSession) -> bytes:
+    # sessions keep changing while a snapshot encodes them; any change after the
+    # rotation is also in the new segment, which replays over the snapshot, so the
+    # only thing to guard against is an overlay resized mid-encode
+    try:
+        return encode_session(session)
+    except RuntimeError:
+        with backend.frozen():
+            return encode_session(session)
+
+
+def _write_all(handle: BinaryIO, data: bytes) -> None:
+    view = memoryview(data)
+    while view:
+        view = view[handle.write(view) :]
+
+
+def _resolve(future: asyncio.Future) -> None:
+    if not future.done():
+        future.set_result(None)
+
+
+def _fail(future: asyncio.Future, exc: OSError) -> None:
+    if not future.done():
+        future.set_exception(exc)
@@ -0,0 +1,195 @@
+from __future__ import annotations
+
+import threading
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sortedcontainers import SortedList
+
+from .config import Settings
+from .sessions import SessionBackend, SQLiteSessionBackend
+
+RankKey = Tuple[int, int, int, float, str]
+
+
+@dataclass(frozen=True)
+class RankedRun:
+    mission_id: str
+    session_id: str
+    player_name: str
+    total_score: int
+    mistakes: int
+    elapsed_ms: int
+    completed_at: float  # epoch seconds
+
+    @property
+    def key(self) -> RankKey:
+        # best first: highest score, then fewest mistakes, fastest, earliest
+        return (-self.total_score, self.mistakes, self.elapsed_ms, self.completed_at, self.session_id)
+
+
+class Leaderboards(ABC):
+    """Completed runs ranked per mission, keeping the best ``max_entries`` of each."""
+
+    def __init__(self, max_entries: int = 1000) -> None:
+        self.max_entries = max_entries
+
+    @abstractmethod
+    def record(self, run: RankedRun) -> None:
+        """Insert or update ``run``; runs pushed below ``max_entries`` are dropped."""
+
+    @abstractmethod
+    def page(self, mission_id: str, offset: int, limit: int) -> Tuple[int, List[Tuple[int, RankedRun]]]:
+        """Return the number of ranked runs and (rank, run) pairs starting at ``offset``."""
+
+    @abstractmethod
+    def rank(self, mission_id: str, session_id: str) -> Optional[Tuple[int, RankedRun]]:
+        ...
+
+
+class InMemoryLeaderboards(Leaderboards):
+    def __init__(self, max_entries: int = 1000) -> None:
+        super().__init__(max_entries)
+        # O(log n) inserts and rank lookups, where a plain sorted list shifts on every insert
+        self._ranked: Dict[str, SortedList] = {}
+        self._runs: Dict[str, Dict[str, RankedRun]] = {}
+        # journal snapshots read the boards from a worker thread
+        self._lock = threading.Lock()
+
+    def record(self, run: RankedRun) -> None:
+        with self._lock:
+            ranked = self._ranked.get(run.mission_id)
+            if ranked is None:
+                ranked = self._ranked[run.mission_id] = SortedList()
+                self._runs[run.mission_id] = {}
+            runs = self._runs[run.mission_id]
+            previous = runs.get(run.session_id)
+            if previous is not None:
+                ranked.remove(previous.key)
+            ranked.add(run.key)
+            runs[run.session_id] = run
+            while len(ranked) > self.max_entries:
+                dropped = ranked.pop()
+                del runs[dropped[-1]]
+
+    def page(self, mission_id: str, offset: int, limit: int) -> Tuple[int, List[Tuple[int, RankedRun]]]:
+        with self._lock:
+            ranked = self._ranked.get(mission_id)
+            if ranked is None:
+                return 0, []
+            runs = self._runs[mission_id]
+            keys = ranked[offset : offset + limit]
+            return len(ranked), [(offset + index + 1, runs[key[-1]]) for index, key in enumerate(keys)]
+
+    def rank(self, mission_id: str, session_id: str) -> Optional[Tuple[int, RankedRun]]:
+        with self._lock:
+            run = self._runs.get(mission_id, {}).get(session_id)
+            if run is None:
+                return None
+            return self._ranked[mission_id].bisect_left(run.key) + 1, run
+
+    def runs(self) -> List[RankedRun]:
+        with self._lock:
+            return [run for runs in self._runs.values() for run in runs.values()]
+
+    def restore(self, runs: Iterable[RankedRun]) -> None:
+        for run in runs:
+            self.record(run)
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS leaderboard (
+    session_id TEXT PRIMARY KEY,
+    mission_id TEXT NOT NULL,
+    player_name TEXT NOT NULL,
+    total_score INTEGER NOT NULL,
+    mistakes INTEGER NOT NULL,
+    elapsed_ms INTEGER NOT NULL,
+    completed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS leaderboard_rank
+    ON leaderboard (mission_id, total_score DESC, mistakes, elapsed_ms, completed_at, session_id);
+"""
+
+_ORDER = "total_score DESC, mistakes, elapsed_ms, completed_at, session_id"
+_COLUMNS = "mission_id, session_id, player_name, total_score, mistakes, elapsed_ms, completed_at"
+# rows ranked ahead of a run: two range scans over the rank index, one for higher
+# scores and one for the same score with a smaller (mistakes, elapsed, ...) tail
+_AHEAD = (
+    "SELECT (SELECT COUNT(*) FROM leaderboard WHERE mission_id = ? AND total_score > ?)"
+    " + (SELECT COUNT(*) FROM leaderboard WHERE mission_id = ? AND total_score = ?"
+    " AND (mistakes, elapsed_ms, completed_at, session_id) < (?, ?, ?, ?))"
+)
+
+
+class SQLiteLeaderboards(Leaderboards):
+    """Leaderboards in the session database, shared by every worker process.
+
+    Uses the backend's per-thread connection, so a run recorded while a command
+    is evaluated commits in the same transaction as the session update.
+    """
+
+    def __init__(self, backend: SQLiteSessionBackend, max_entries: int = 1000) -> None:
+        super().__init__(max_entries)
+        self.backend = backend
+        backend.connection().executescript(_SCHEMA)
+
+    def record(self, run: RankedRun) -> None:
+        conn = self.backend.connection()
+        conn.execute(
+            f"INSERT OR REPLACE INTO leaderboard ({_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (
+                run.mission_id,
+                run.session_id,
+                run.player_name,
+                run.total_score,
+                run.mistakes,
+                run.elapsed_ms,
+                run.completed_at,
+            ),
+        )
+        conn.execute(
+            "DELETE FROM leaderboard WHERE session_id IN ("
+            f" SELECT session_id FROM leaderboard WHERE mission_id = ? ORDER BY {_ORDER} LIMIT -1 OFFSET ?)",
+            (run.mission_id, self.max_entries),
+        )
+
+    def page(self, mission_id: str, offset: int, limit: int) -> Tuple[int, List[Tuple[int, RankedRun]]]:
+        conn = self.backend.connection()
+        (total,) = conn.execute("SELECT COUNT(*) FROM leaderboard WHERE mission_id = ?", (mission_id,)).fetchone()
+        rows = conn.execute(
+            f"SELECT {_COLUMNS} FROM leaderboard WHERE mission_id = ? ORDER BY {_ORDER} LIMIT ? OFFSET ?",
+            (mission_id, limit, offset),
+        ).fetchall()
+        return total, [(offset + index + 1, RankedRun(*row)) for index, row in enumerate(rows)]
+
+    def rank(self, mission_id: str, session_id: str) -> Optional[Tuple[int, RankedRun]]:
+        conn = self.backend.connection()
+        row = conn.execute(
+            f"SELECT {_COLUMNS} FROM leaderboard WHERE mission_id = ? AND session_id = ?",
+            (mission_id, session_id),
+        ).fetchone()
+        if row is None:
+            return None
+        run = RankedRun(*row)
+        (ahead,) = conn.execute(
+            _AHEAD,
+            (
+                mission_id,
+                run.total_score,
+                mission_id,
+                run.total_score,
+                run.mistakes,
+                run.elapsed_ms,
+                run.completed_at,
+                run.session_id,
+            ),
+        ).fetchone()
+        return ahead + 1, run
+
+
+def build_leaderboards(settings: Settings, backend: SessionBackend) -> Leaderboards:
+    if isinstance(backend, SQLiteSessionBackend):
+        return SQLiteLeaderboards(backend, max_entries=settings.leaderboard_size)
+    return InMemoryLeaderboards(max_entries=settings.leaderboard_size)
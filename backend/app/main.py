@@ -1,34 +1,143 @@
-from contextlib import asynccontextmanager
-from typing import List
+import asyncio
+import json
+import logging
+from contextlib import asynccontextmanager, suppress
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional
 
-from fastapi import APIRouter, FastAPI, HTTPException, Request
+from fastapi import APIRouter, FastAPI, Header, HTTPException, Query, Request, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 
+from .admission import AdmissionMiddleware, TokenBuckets
+from .catalog import BUILTIN_MISSIONS_DIR, MissionCatalogLoader, load_into, watch_catalog
 from .config import get_settings
-from .missions import MissionSession, store
+from .events import Event, Subscription
+from .idempotency import IdempotencyConflict
+from .journal import SessionJournal
+from .metrics import CONTENT_TYPE, Counter, MetricsMiddleware, request_histogram
+from .missions import Mission, MissionSession, SessionGone, store
+from .responses import CompressionMiddleware, FastJSONResponse
 from .schemas import (
+    MAX_ANALYTICS_TOP,
+    MAX_LEADERBOARD_PAGE,
+    MAX_TRANSCRIPT_PAGE,
     ApiMessage,
+    CohortProgressResponse,
+    CommandBatchRequest,
+    CommandBatchResponse,
     CommandRequest,
     CommandResponse,
     HintResponse,
+    LeaderboardResponse,
+    MissionAnalyticsResponse,
+    MissionBulkStartRequest,
+    MissionBulkStartResponse,
     MissionSummary,
     MissionStartRequest,
     MissionStartResponse,
     SessionStatusResponse,
+    TranscriptPage,
 )
+from .sessions import SessionCapacityError, SessionQuery, datetime_to_monotonic_ms
 
 
+logger = logging.getLogger(__name__)
+
 settings = get_settings()
 
+unhandled_errors = store.metrics.registry.register(
+    Counter("http_unhandled_exceptions_total", "Exceptions that reached the catch-all handler.", ("exception",))
+)
+
+
+async def reap_sessions(interval_seconds: float) -> None:
+    while True:
+        await asyncio.sleep(interval_seconds)
+        await store.reap_expired()
+
+
+async def snapshot_sessions(journal: SessionJournal, interval_seconds: float, check_seconds: float) -> None:
+    loop = asyncio.get_running_loop()
+    last_snapshot = loop.time()
+    while True:
+        await asyncio.sleep(check_seconds)
+        if journal.needs_snapshot() or loop.time() - last_snapshot >= interval_seconds:
+            count = await asyncio.to_thread(store.snapshot_journal)
+            last_snapshot = loop.time()
+            logger.info("Snapshotted %d sessions", count)
+
 
 @asynccontextmanager
 async def lifespan(_: FastAPI):
-    # Could load missions from external source here
+    loader = MissionCatalogLoader(
+        Path(settings.missions_dir) if settings.missions_dir else BUILTIN_MISSIONS_DIR,
+        cache_dir=Path(settings.mission_cache_dir) if settings.mission_cache_dir else None,
+    )
+    await asyncio.to_thread(load_into, store, loader)
+    tasks = [
+        asyncio.create_task(reap_sessions(settings.session_reap_interval_seconds)),
+        asyncio.create_task(store.events.run_clock(settings.events_heartbeat_seconds)),
+    ]
+    if settings.journal_dir and settings.session_backend != "memory":
+        logger.warning("JOURNAL_DIR is ignored: the %s backend is already durable", settings.session_backend)
+    elif settings.journal_dir:
+        journal = SessionJournal(
+            Path(settings.journal_dir),
+            sync=settings.journal_sync,
+            fsync_interval_seconds=settings.journal_fsync_interval_seconds,
+            snapshot_bytes=settings.journal_snapshot_bytes,
+        )
+        recovered = await asyncio.to_thread(store.attach_journal, journal)
+        logger.info("Recovered %d sessions from %s", recovered, settings.journal_dir)
+        tasks.append(
+            asyncio.create_task(
+                snapshot_sessions(
+                    journal,
+                    settings.journal_snapshot_interval_seconds,
+                    settings.session_reap_interval_seconds,
+                )
+            )
+        )
+    if settings.missions_reload_interval_seconds > 0:
+        tasks.append(
+            asyncio.create_task(
+                watch_catalog(store, loader, settings.missions_reload_interval_seconds)
+            )
+        )
     yield
+    for task in tasks:
+        task.cancel()
+        with suppress(asyncio.CancelledError):
+            await task
+    store.close()
 
 
-app = FastAPI(title=settings.app_name, lifespan=lifespan)
+app = FastAPI(title=settings.app_name, lifespan=lifespan, default_response_class=FastJSONResponse)
+
+session_buckets: Optional[TokenBuckets] = None
+if settings.rate_limit_enabled:
+    session_buckets = TokenBuckets(
+        settings.rate_limit_session_per_second,
+        settings.rate_limit_session_burst,
+        max_keys=settings.rate_limit_max_keys,
+    )
+    # added before CORS so 429 responses still carry CORS headers
+    app.add_middleware(
+        AdmissionMiddleware,
+        prefix=settings.api_prefix,
+        clients=TokenBuckets(
+            settings.rate_limit_client_per_second,
+            settings.rate_limit_client_burst,
+            max_keys=settings.rate_limit_max_keys,
+        ),
+        sessions=session_buckets,
+        max_concurrent=settings.max_concurrent_requests,
+        rejected=store.metrics.registry.register(
+            Counter("http_requests_rejected_total", "Requests refused by admission control.", ("reason",))
+        ),
+    )
 
 app.add_middleware(
     CORSMiddleware,
@@ -38,38 +147,53 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-router = APIRouter(prefix=settings.api_prefix)
+if settings.compression_minimum_size:
+    app.add_middleware(CompressionMiddleware, minimum_size=settings.compression_minimum_size)
 
+if settings.metrics_enabled:
+    app.add_middleware(MetricsMiddleware, requests=store.metrics.registry.register(request_histogram()))
 
-def validate_session(session_id: str) -> MissionSession:
-    try:
-        return store.get_session(session_id)
-    except KeyError as exc:  # pragma: no cover - FastAPI handles custom
-        raise HTTPException(status_code=404, detail="Session not found") from exc
+router = APIRouter(prefix=settings.api_prefix)
 
 
 @app.get("/health", response_model=ApiMessage)
-def health_check() -> ApiMessage:
+async def health_check() -> ApiMessage:
     return ApiMessage(detail="ok")
 
 
-@router.get("/missions", response_model=List[MissionSummary])
-def list_missions() -> List[MissionSummary]:
-    return store.list_missions()
+if settings.metrics_enabled:
 
+    @app.get("/metrics", include_in_schema=False)
+    async def metrics() -> Response:
+        # rendering reads the session count, which queries the SQLite backend
+        body = await store.offload(store.metrics.registry.render)
+        return Response(content=body, media_type=CONTENT_TYPE)
 
-@router.post("/missions/start", response_model=MissionStartResponse)
-def start_mission(payload: MissionStartRequest) -> MissionStartResponse:
-    try:
-        mission = store.get_mission(payload.mission_id)
-    except KeyError as exc:
-        raise HTTPException(status_code=404, detail="Mission not found") from exc
 
-    session = store.create_session(payload.mission_id)
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [candidate.strip() for candidate in if_none_match.split(",")]
+    # If-None-Match uses weak comparison, so a W/ prefix still matches
+    return any(
+        candidate == "*" or candidate.removeprefix("W/") == etag for candidate in candidates
+    )
+
+
+@router.get("/missions", response_model=List[MissionSummary])
+async def list_missions(request: Request) -> Response:
+    catalog = store.catalog()
+    headers = {"ETag": catalog.etag, "Cache-Control": "no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), catalog.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=catalog.body, media_type="application/json", headers=headers)
+
+
+def build_start_response(mission: Mission, session: MissionSession) -> MissionStartResponse:
     first_step = mission.steps[0]
     return MissionStartResponse(
         session_id=session.session_id,
-        mission=mission.summary(),
+        mission=store.mission_summary(mission.id),
         intro=mission.intro,
         first_prompt=first_step.prompt,
         step_index=session.step_index,
@@ -79,47 +203,341 @@ def start_mission(payload: MissionStartRequest) -> MissionStartResponse:
     )
 
 
+@router.post("/missions/start", response_model=MissionStartResponse)
+async def start_mission(payload: MissionStartRequest) -> Response:
+    try:
+        mission = store.get_mission(payload.mission_id)
+    except KeyError as exc:
+        raise HTTPException(status_code=404, detail="Mission not found") from exc
+
+    session = await store.create_session(payload.mission_id, payload.player_name, payload.cohort_id)
+    return FastJSONResponse(build_start_response(mission, session))
+
+
+@router.post("/missions/start/bulk", response_model=MissionBulkStartResponse)
+async def start_missions(payload: MissionBulkStartRequest) -> Response:
+    try:
+        mission = store.get_mission(payload.mission_id)
+    except KeyError as exc:
+        raise HTTPException(status_code=404, detail="Mission not found") from exc
+
+    try:
+        # a bulk start never evicts live sessions to make room for itself
+        sessions = await store.create_sessions(
+            payload.mission_id, payload.count, cohort_id=payload.cohort_id, evict=False
+        )
+    except SessionCapacityError as exc:
+        raise HTTPException(status_code=503, detail=str(exc)) from exc
+    return FastJSONResponse(
+        MissionBulkStartResponse(sessions=[build_start_response(mission, session) for session in sessions])
+    )
+
+
+@router.get("/cohorts/{cohort_id}", response_model=CohortProgressResponse)
+async def cohort_progress(cohort_id: str) -> Response:
+    try:
+        return FastJSONResponse(await store.cohort_progress(cohort_id))
+    except KeyError as exc:
+        raise HTTPException(status_code=404, detail="Cohort not found") from exc
+
+
+@router.get("/missions/{mission_id}/leaderboard", response_model=LeaderboardResponse)
+async def mission_leaderboard(
+    mission_id: str,
+    offset: int = Query(default=0, ge=0),
+    limit: int = Query(default=20, ge=1, le=MAX_LEADERBOARD_PAGE),
+    session_id: Optional[str] = None,
+) -> Response:
+    try:
+        return FastJSONResponse(await store.leaderboard(mission_id, offset, limit, session_id))
+    except KeyError as exc:
+        raise HTTPException(status_code=404, detail="Mission not found") from exc
+
+
+@router.get("/missions/{mission_id}/analytics", response_model=MissionAnalyticsResponse)
+async def mission_analytics(
+    mission_id: str,
+    limit: int = Query(default=10, ge=1, le=MAX_ANALYTICS_TOP),
+) -> Response:
+    try:
+        return FastJSONResponse(store.analytics_report(mission_id, limit))
+    except KeyError as exc:
+        raise HTTPException(status_code=404, detail="Mission not found") from exc
+
+
+@router.get("/missions/{mission_id}/analytics/export")
+async def export_mission_analytics(mission_id: str) -> Response:
+    try:
+        body = await asyncio.to_thread(store.analytics_export, mission_id)
+    except KeyError as exc:
+        raise HTTPException(status_code=404, detail="Mission not found") from exc
+    except RuntimeError as exc:
+        raise HTTPException(status_code=501, detail=str(exc)) from exc
+    return Response(
+        content=body,
+        media_type="application/octet-stream",
+        headers={"Content-Disposition": f'attachment; filename="{mission_id}-analytics.npz"'},
+    )
+
+
+def transcript_query(
+    mission_id: Optional[str] = None,
+    completed: Optional[bool] = None,
+    started_after: Optional[datetime] = None,
+    started_before: Optional[datetime] = None,
+) -> SessionQuery:
+    def to_ms(value: Optional[datetime]) -> Optional[int]:
+        if value is None:
+            return None
+        if value.tzinfo is not None:
+            value = value.astimezone(timezone.utc).replace(tzinfo=None)
+        return datetime_to_monotonic_ms(value)
+
+    return SessionQuery(mission_id, completed, to_ms(started_after), to_ms(started_before))
+
+
+@router.get("/transcripts", response_model=TranscriptPage)
+async def list_transcripts(
+    cursor: Optional[str] = None,
+    limit: int = Query(default=100, ge=1, le=MAX_TRANSCRIPT_PAGE),
+    mission_id: Optional[str] = None,
+    completed: Optional[bool] = None,
+    started_after: Optional[datetime] = None,
+    started_before: Optional[datetime] = None,
+) -> Response:
+    query = transcript_query(mission_id, completed, started_after, started_before)
+    try:
+        return FastJSONResponse(await store.transcripts(query, cursor, limit))
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+
+
+@router.get("/transcripts/export")
+async def export_transcripts(
+    mission_id: Optional[str] = None,
+    completed: Optional[bool] = None,
+    started_after: Optional[datetime] = None,
+    started_before: Optional[datetime] = None,
+) -> StreamingResponse:
+    query = transcript_query(mission_id, completed, started_after, started_before)
+    return StreamingResponse(
+        store.export_transcripts(query),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": 'attachment; filename="transcripts.ndjson"'},
+    )
+
+
 @router.post("/missions/{session_id}/command", response_model=CommandResponse)
-def submit_command(session_id: str, payload: CommandRequest) -> CommandResponse:
+async def submit_command(
+    session_id: str,
+    payload: CommandRequest,
+    idempotency_key: Optional[str] = Header(default=None, min_length=1, max_length=128),
+) -> Response:
+    try:
+        if idempotency_key is None:
+            return FastJSONResponse(await store.evaluate_command(session_id, payload.command))
+        body, replayed = await store.submit_command(session_id, payload.command, idempotency_key)
+    except SessionGone as exc:
+        raise HTTPException(status_code=410, detail=str(exc)) from exc
+    except KeyError as exc:
+        raise HTTPException(status_code=404, detail=str(exc)) from exc
+    except IdempotencyConflict as exc:
+        raise HTTPException(status_code=422, detail=str(exc)) from exc
+    headers = {"Idempotent-Replayed": "true"} if replayed else None
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+@router.post("/missions/{session_id}/commands", response_model=CommandBatchResponse)
+async def submit_commands(session_id: str, payload: CommandBatchRequest) -> Response:
     try:
-        response = store.evaluate_command(session_id, payload.command)
-        return response
+        results = await store.evaluate_commands(session_id, payload.commands)
+    except SessionGone as exc:
+        raise HTTPException(status_code=410, detail=str(exc)) from exc
     except KeyError as exc:
         raise HTTPException(status_code=404, detail=str(exc)) from exc
+    return FastJSONResponse(
+        CommandBatchResponse(
+            results=results,
+            evaluated=len(results),
+            stopped_early=len(results) < len(payload.commands),
+        )
+    )
 
 
 @router.post("/missions/{session_id}/hint", response_model=HintResponse)
-def request_hint(session_id: str) -> HintResponse:
-    session = validate_session(session_id)
-    mission = store.get_mission(session.mission_id)
+async def request_hint(session_id: str) -> Response:
+    try:
+        return FastJSONResponse(await store.hint(session_id))
+    except SessionGone as exc:
+        raise HTTPException(status_code=410, detail=str(exc)) from exc
+    except KeyError as exc:
+        raise HTTPException(status_code=404, detail="Session not found") from exc
 
-    hint = store.request_hint(session_id)
-    remaining = max(0, len(mission.steps) - session.step_index - 1)
-    return HintResponse(
-        step_index=session.step_index,
-        hint=hint,
-        remaining_hints=remaining,
+
+@router.get("/missions/{session_id}", response_model=SessionStatusResponse)
+async def session_status(session_id: str) -> Response:
+    try:
+        return FastJSONResponse(await store.status(session_id))
+    except SessionGone as exc:
+        raise HTTPException(status_code=410, detail=str(exc)) from exc
+    except KeyError as exc:
+        raise HTTPException(status_code=404, detail="Session not found") from exc
+
+
+# WebSocket close codes mirroring the HTTP statuses of the REST routes
+WS_SESSION_NOT_FOUND = 4404
+WS_SESSION_GONE = 4410
+SOCKET_SKIPPED_EVENTS = frozenset({"status", "heartbeat"})
+
+
+def subscribe_session(session: MissionSession) -> Subscription:
+    mission = store.mission_for(session)
+    # finished missions can no longer time out
+    running = session.step_index < len(mission.steps)
+    return store.events.subscribe(
+        session.session_id, expires_at=session.expires_at if running else None
     )
 
 
-@router.get("/missions/{session_id}", response_model=SessionStatusResponse)
-def session_status(session_id: str) -> SessionStatusResponse:
-    session = validate_session(session_id)
-    mission = store.get_mission(session.mission_id)
-    return SessionStatusResponse(
-        session_id=session.session_id,
-        mission_id=mission.id,
-        step_index=session.step_index,
-        total_steps=len(mission.steps),
-        mistakes=session.mistakes,
-        time_remaining_seconds=session.time_remaining(),
-        completed=session.step_index >= len(mission.steps),
+def format_sse(event: Event) -> bytes:
+    if event["type"] == "heartbeat":
+        return b": heartbeat\n\n"
+    payload = json.dumps(event, separators=(",", ":"))
+    return f"event: {event['type']}\ndata: {payload}\n\n".encode("utf-8")
+
+
+@router.get("/missions/{session_id}/events")
+async def session_events(session_id: str) -> StreamingResponse:
+    try:
+        session = await store.get_session(session_id)
+        snapshot = await store.status(session_id)
+    except SessionGone as exc:
+        raise HTTPException(status_code=410, detail=str(exc)) from exc
+    except KeyError as exc:
+        raise HTTPException(status_code=404, detail="Session not found") from exc
+
+    subscription = subscribe_session(session)
+
+    async def stream():
+        try:
+            yield b"retry: 5000\n\n"
+            yield format_sse({"type": "status", "reason": "snapshot", "data": snapshot.model_dump(mode="json")})
+            while True:
+                event = await subscription.queue.get()
+                yield format_sse(event)
+                if event["type"] == "gone":
+                    return
+        finally:
+            store.events.unsubscribe(subscription)
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
     )
 
 
+async def handle_socket_message(session_id: str, message: Dict[str, Any]) -> List[Dict[str, Any]]:
+    kind = message.get("type")
+    replies: List[Dict[str, Any]] = []
+    wait = 0.0
+    if kind in ("command", "hint") and session_buckets is not None:
+        wait = session_buckets.take(session_id)
+    if wait:
+        replies.append({"type": "error", "detail": "Too many requests", "retry_after_seconds": round(wait, 3)})
+    elif kind == "command":
+        command = message.get("command")
+        if not isinstance(command, str) or not command:
+            return [{"type": "error", "detail": "command must be a non-empty string"}]
+        response = await store.evaluate_command(session_id, command)
+        replies.append({"type": "command", "data": response.model_dump(mode="json")})
+        if response.accepted and response.mission_complete:
+            replies.append({"type": "complete", "data": (await store.status(session_id)).model_dump(mode="json")})
+    elif kind == "hint":
+        replies.append({"type": "hint", "data": (await store.hint(session_id)).model_dump(mode="json")})
+    elif kind == "status":
+        replies.append({"type": "status", "data": (await store.status(session_id)).model_dump(mode="json")})
+    else:
+        replies.append({"type": "error", "detail": f"Unknown message type: {kind!r}"})
+    if "id" in message:
+        for reply in replies:
+            reply["id"] = message["id"]
+    return replies
+
+
+async def receive_socket_text(websocket: WebSocket) -> Optional[str]:
+    # like receive_text(), but a binary frame gives None instead of a KeyError
+    message = await websocket.receive()
+    if message["type"] == "websocket.disconnect":
+        raise WebSocketDisconnect(message.get("code", 1000), message.get("reason"))
+    return message.get("text")
+
+
+@router.websocket("/missions/{session_id}/ws")
+async def session_socket(websocket: WebSocket, session_id: str) -> None:
+    await websocket.accept()
+    try:
+        session = await store.get_session(session_id)
+    except SessionGone as exc:
+        await websocket.send_json({"type": "gone", "detail": str(exc)})
+        await websocket.close(code=WS_SESSION_GONE)
+        return
+    except KeyError:
+        await websocket.send_json({"type": "error", "detail": "Session not found"})
+        await websocket.close(code=WS_SESSION_NOT_FOUND)
+        return
+
+    subscription = subscribe_session(session)
+    received = asyncio.ensure_future(receive_socket_text(websocket))
+    pushed = asyncio.ensure_future(subscription.queue.get())
+    try:
+        while True:
+            done, _ = await asyncio.wait({received, pushed}, return_when=asyncio.FIRST_COMPLETED)
+            if pushed in done:
+                event = pushed.result()
+                pushed = asyncio.ensure_future(subscription.queue.get())
+                # socket clients already get state changes as replies to their messages
+                if event["type"] not in SOCKET_SKIPPED_EVENTS:
+                    await websocket.send_json(event)
+                if event["type"] == "gone":
+                    await websocket.close(code=WS_SESSION_GONE)
+                    return
+            if received in done:
+                raw = received.result()
+                received = asyncio.ensure_future(receive_socket_text(websocket))
+                if raw is None:
+                    await websocket.send_json({"type": "error", "detail": "Messages must be text frames"})
+                    continue
+                try:
+                    message = json.loads(raw)
+                except ValueError:
+                    await websocket.send_json({"type": "error", "detail": "Messages must be JSON"})
+                    continue
+                if not isinstance(message, dict):
+                    await websocket.send_json({"type": "error", "detail": "Messages must be JSON objects"})
+                    continue
+                try:
+                    replies = await handle_socket_message(session_id, message)
+                except SessionGone as exc:
+                    await websocket.send_json({"type": "gone", "detail": str(exc)})
+                    await websocket.close(code=WS_SESSION_GONE)
+                    return
+                except KeyError as exc:
+                    replies = [{"type": "error", "detail": str(exc)}]
+                for reply in replies:
+                    await websocket.send_json(reply)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        received.cancel()
+        pushed.cancel()
+        store.events.unsubscribe(subscription)
+
+
 @app.exception_handler(Exception)
-async def handle_errors(_: Request, exc: Exception):  # pragma: no cover - fallback logging
-    # In production we would log the exception here
+async def handle_errors(request: Request, exc: Exception):  # pragma: no cover - fallback logging
+    unhandled_errors.inc(type(exc).__name__)
+    logger.exception("Unhandled error on %s %s", request.method, request.url.path, exc_info=exc)
     return JSONResponse(status_code=500, content={"detail": str(exc)})
 
 
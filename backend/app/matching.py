@@ -0,0 +1,242 @@
+from __future__ import annotations
+
+import shlex
+from dataclasses import dataclass, field
+from itertools import combinations
+from typing import Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+
+
+# Commands with more distinct flags than this fall back to scanning the flag sets
+# stored on each trie node instead of enumerating every subset of the input flags.
+MAX_SUBSET_FLAGS = 8
+
+PRIVILEGE_PREFIXES = frozenset({"sudo"})
+
+_SHELL_QUOTING = frozenset("'\"\\")
+
+
+@dataclass(frozen=True)
+class CommandShape:
+    argv: Tuple[str, ...]
+    flags: FrozenSet[str]
+
+
+def _is_flag(token: str) -> bool:
+    # "-5m" or "-1" are values (journalctl --since -5m), not options
+    return len(token) > 1 and token[0] == "-" and not token[1].isdigit()
+
+
+def _split(command: str) -> List[str]:
+    if not any(char in _SHELL_QUOTING for char in command):
+        return command.split()
+    try:
+        return shlex.split(command)
+    except ValueError:
+        # unbalanced quotes: fall back to plain whitespace splitting
+        return command.split()
+
+
+def split_command(command: str) -> List[str]:
+    """Shell words of ``command`` with their case kept and a leading ``sudo`` dropped."""
+    tokens = _split(command.strip())
+    while tokens and tokens[0].lower() in PRIVILEGE_PREFIXES:
+        tokens = tokens[1:]
+    return tokens
+
+
+def parse_command(command: str) -> CommandShape:
+    tokens = _split(command.strip().lower())
+    while tokens and tokens[0] in PRIVILEGE_PREFIXES:
+        tokens = tokens[1:]
+
+    argv: List[str] = []
+    flags: Set[str] = set()
+    options_done = False
+    for token in tokens:
+        if options_done or not _is_flag(token):
+            argv.append(token)
+        elif token == "--":
+            options_done = True
+        elif token.startswith("--"):
+            flags.add(token)
+        else:
+            # bundled short options: -la == -l -a == -al
+            flags.update(f"-{char}" for char in token[1:])
+    return CommandShape(argv=tuple(argv), flags=frozenset(flags))
+
+
+@dataclass
+class _TrieNode:
+    children: Dict[str, "_TrieNode"] = field(default_factory=dict)
+    # flag sets of every accepted variant whose argv ends at this node
+    accepted_flags: Set[FrozenSet[str]] = field(default_factory=set)
+
+
+class CommandMatcher:
+    """Token-level matcher for the accepted command variants of one mission step.
+
+    A command matches a variant when the variant's positional arguments are a
+    prefix of the command's (after dropping a leading ``sudo``) and every flag
+    of the variant is present in the command, in any order.
+    """
+
+    def __init__(self, patterns: Iterable[str]) -> None:
+        self._root = _TrieNode()
+        self.variant_count = 0
+        for pattern in patterns:
+            self.add(pattern)
+
+    def add(self, pattern: str) -> None:
+        shape = parse_command(pattern)
+        node = self._root
+        for token in shape.argv:
+            node = node.children.setdefault(token, _TrieNode())
+        node.accepted_flags.add(shape.flags)
+        self.variant_count += 1
+
+    def matches(self, command: str) -> bool:
+        return self.match_shape(parse_command(command))
+
+    def match_shape(self, shape: CommandShape) -> bool:
+        if not shape.argv:
+            return False
+
+        subsets: Optional[List[FrozenSet[str]]] = None
+        if len(shape.flags) <= MAX_SUBSET_FLAGS:
+            subsets = _flag_subsets(shape.flags)
+
+        node = self._root
+        for token in shape.argv:
+            node = node.children.get(token)  # type: ignore[assignment]
+            if node is None:
+                return False
+            if node.accepted_flags and self._flags_accepted(node, shape.flags, subsets):
+                return True
+        return False
+
+    @staticmethod
+    def _flags_accepted(
+        node: _TrieNode,
+        flags: FrozenSet[str],
+        subsets: Optional[List[FrozenSet[str]]],
+    ) -> bool:
+        if subsets is None or len(node.accepted_flags) <= len(subsets):
+            return any(required <= flags for required in node.accepted_flags)
+        return any(subset in node.accepted_flags for subset in subsets)
+
+
+def _flag_subsets(flags: FrozenSet[str]) -> List[FrozenSet[str]]:
+    ordered = sorted(flags)
+    return [
+        frozenset(combo)
+        for size in range(len(ordered) + 1)
+        for combo in combinations(ordered, size)
+    ]
+
+
+def _deletions(token: str) -> Set[str]:
+    return {token[:index] + token[index + 1 :] for index in range(len(token))}
+
+
+@dataclass
+class _SuggestNode:
+    children: Dict[str, "_SuggestNode"] = field(default_factory=dict)
+    # variants whose argv ends at this node
+    ending: List[int] = field(default_factory=list)
+    # (tokens left, variant) for the variant below this node with the fewest tokens left
+    nearest: Tuple[int, int] = (0, -1)
+
+
+class CommandSuggester:
+    """Finds the variant closest to a rejected command, in time independent of the variant count.
+
+    Variants sit in a token trie like ``CommandMatcher``'s. Where a command's
+    token is not a child of the current node, it is corrected to a child one
+    edit away (insertion, deletion, substitution or adjacent swap) through a
+    symmetric-deletion map: every vocabulary token is hashed under itself and
+    each of its one-character deletions, so a correction costs a few probes
+    per character whatever the vocabulary size. The walk then settles on the
+    variant needing the fewest edits: corrected tokens, tokens still missing
+    and required flags not given.
+    """
+
+    def __init__(self, patterns: Iterable[str]) -> None:
+        self._root = _SuggestNode()
+        self._variants: List[Tuple[CommandShape, str]] = []
+        # token, or a token with one character deleted -> vocabulary tokens
+        self._corrections: Dict[str, Set[str]] = {}
+        for pattern in patterns:
+            self.add(pattern)
+
+    def add(self, pattern: str) -> None:
+        shape = parse_command(pattern)
+        if not shape.argv:
+            return
+        variant = len(self._variants)
+        self._variants.append((shape, pattern))
+        for token in (*shape.argv, *shape.flags):
+            for key in (token, *_deletions(token)):
+                self._corrections.setdefault(key, set()).add(token)
+
+        node = self._root
+        path = [node]
+        for token in shape.argv:
+            node = node.children.setdefault(token, _SuggestNode(nearest=(len(shape.argv), variant)))
+            path.append(node)
+        node.ending.append(variant)
+        for depth, ancestor in enumerate(path):
+            # earlier variants win ties
+            left = len(shape.argv) - depth
+            if ancestor.nearest[1] < 0 or left < ancestor.nearest[0]:
+                ancestor.nearest = (left, variant)
+
+    def suggest(self, shape: CommandShape) -> Optional[str]:
+        node = self._root
+        path: List[_SuggestNode] = []
+        corrected = 0
+        for token in shape.argv:
+            child = node.children.get(token) or self._correct(node, token)
+            if child is None:
+                break
+            if token not in node.children:
+                corrected += 1
+            node = child
+            path.append(node)
+        if not path:
+            return None
+
+        flags = frozenset(self._correct_flag(flag) for flag in shape.flags)
+        corrected += len(shape.flags - flags)
+        unmatched = len(shape.argv) - len(path)
+        # variants ending on the walked path only lack flags; the nearest one below it lacks tokens too
+        candidates = [variant for step in path for variant in step.ending]
+        candidates.append(node.nearest[1])
+        best: Optional[Tuple[int, int]] = None
+        for variant in candidates:
+            variant_shape, _ = self._variants[variant]
+            missing = len(variant_shape.argv) - len(path)
+            edits = corrected + (max(missing, unmatched) if missing > 0 else 0) + len(variant_shape.flags - flags)
+            size = len(variant_shape.argv) + len(variant_shape.flags)
+            # the command already is this variant, or is too far from it to be a slip
+            if edits == 0 or edits > max(1, size // 2):
+                continue
+            if best is None or (edits, variant) < best:
+                best = (edits, variant)
+        return self._variants[best[1]][1] if best is not None else None
+
+    def _candidates(self, token: str) -> Set[str]:
+        found: Set[str] = set()
+        for key in (token, *_deletions(token)):
+            found.update(self._corrections.get(key, ()))
+        return found
+
+    def _correct(self, node: _SuggestNode, token: str) -> Optional[_SuggestNode]:
+        children = [node.children[name] for name in self._candidates(token) if name in node.children]
+        return min(children, key=lambda child: child.nearest[1]) if children else None
+
+    def _correct_flag(self, flag: str) -> str:
+        # any short option is one edit from any other
+        if len(flag) <= 2 or flag in self._corrections.get(flag, ()):
+            return flag
+        candidates = sorted(name for name in self._candidates(flag) if name.startswith("-"))
+        return candidates[0] if candidates else flag
@@ -0,0 +1,218 @@
+from __future__ import annotations
+
+import threading
+import time
+from bisect import bisect_left
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, TypeVar
+
+Labels = Tuple[str, ...]
+M = TypeVar("M", bound="Metric")
+
+# seconds; request handling here is sub-millisecond unless storage is slow
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+MATCH_BUCKETS = (0.000001, 0.0000025, 0.000005, 0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.001)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _label_text(names: Labels, values: Labels, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+class Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labels: Iterable[str] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.label_names: Labels = tuple(labels)
+        # updates may come from worker threads running a blocking session backend
+        self._lock = threading.Lock()
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+    def samples(self) -> Iterator[str]:
+        raise NotImplementedError
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labels: Iterable[str] = ()) -> None:
+        super().__init__(name, documentation, labels)
+        self._values: Dict[Labels, float] = {}
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels: str) -> float:
+        return self._values.get(labels, 0)
+
+    def samples(self) -> Iterator[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        for labels, value in values:
+            yield f"{self.name}{_label_text(self.label_names, labels)} {_number(value)}"
+
+
+class Gauge(Metric):
+    """A value read from ``collect`` at scrape time instead of being tracked on every update."""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, collect: Callable[[], float]) -> None:
+        super().__init__(name, documentation)
+        self.collect = collect
+
+    def samples(self) -> Iterator[str]:
+        yield f"{self.name} {_number(self.collect())}"
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labels: Iterable[str] = (),
+        buckets: Iterable[float] = LATENCY_BUCKETS,
+    ) -> None:
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets))
+        # per label set: per-bucket counts (last slot is +Inf), then the running sum
+        self._series: Dict[Labels, Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = ([0] * (len(self.buckets) + 1), [0.0])
+            series[0][index] += 1
+            series[1][0] += value
+
+    def count(self, *labels: str) -> int:
+        series = self._series.get(labels)
+        return sum(series[0]) if series else 0
+
+    def samples(self) -> Iterator[str]:
+        with self._lock:
+            series = sorted((labels, (list(counts), total[0])) for labels, (counts, total) in self._series.items())
+        bounds = [*self.buckets, float("inf")]
+        for labels, (counts, total) in series:
+            cumulative = 0
+            for bound, count in zip(bounds, counts):
+                cumulative += count
+                le = f'le="{_number(bound)}"'
+                yield f"{self.name}_bucket{_label_text(self.label_names, labels, le)} {cumulative}"
+            label_text = _label_text(self.label_names, labels)
+            yield f"{self.name}_sum{label_text} {_number(total)}"
+            yield f"{self.name}_count{label_text} {cumulative}"
+
+
+class Registry:
+    def __init__(self) -> None:
+        self._metrics: Dict[str, Metric] = {}
+
+    def register(self, metric: M) -> M:
+        if metric.name in self._metrics:
+            raise ValueError(f"metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> bytes:
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            lines.extend(metric.header())
+            lines.extend(metric.samples())
+        return ("\n".join(lines) + "\n").encode("utf-8")
+
+
+def request_histogram() -> Histogram:
+    return Histogram(
+        "http_request_duration_seconds",
+        "HTTP request latency by route and status.",
+        ("method", "route", "status"),
+    )
+
+
+class StoreMetrics:
+    """Counters updated by ``MissionStore`` while it evaluates commands and hints."""
+
+    def __init__(self, registry: Optional[Registry] = None) -> None:
+        self.registry = registry or Registry()
+        self.commands = self.registry.register(
+            Counter("mission_commands_total", "Commands evaluated per mission step.", ("mission", "step", "result"))
+        )
+        self.match_seconds = self.registry.register(
+            Histogram(
+                "mission_command_match_seconds",
+                "Time spent matching a command against the current step.",
+                buckets=MATCH_BUCKETS,
+            )
+        )
+        self.hints = self.registry.register(
+            Counter("mission_hints_total", "Hints handed out per mission step.", ("mission", "step"))
+        )
+        self.sessions_started = self.registry.register(
+            Counter("mission_sessions_started_total", "Mission sessions started.", ("mission",))
+        )
+        self.sessions_ended = self.registry.register(
+            Counter("mission_sessions_removed_total", "Sessions dropped from the store.", ("reason",))
+        )
+        self.command_replays = self.registry.register(
+            Counter("mission_command_replays_total", "Retried commands answered from the idempotency cache.")
+        )
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware timing each HTTP request by route template and status.
+
+    The route label is the matched path template (``/api/missions/{session_id}``),
+    so session ids never become label values; unmatched paths share one label.
+    """
+
+    def __init__(self, app: Any, requests: Histogram) -> None:
+        self.app = app
+        self.requests = requests
+
+    async def __call__(self, scope: Dict[str, Any], receive: Any, send: Any) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        started = time.perf_counter()
+
+        async def send_with_status(message: Dict[str, Any]) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = scope.get("route")
+            self.requests.observe(
+                time.perf_counter() - started,
+                scope["method"],
+                getattr(route, "path", None) or "unmatched",
+                str(status),
+            )
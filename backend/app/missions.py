@@ -1,11 +1,54 @@
 from __future__ import annotations
 
-import uuid
-from dataclasses import dataclass, field
-from datetime import datetime, timedelta
-from typing import Dict, List, Optional
+import asyncio
+import hashlib
+import json
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, List, Optional, Tuple, TypeVar
+
+from pydantic_core import to_json
+
+from .analytics import CommandAnalytics
+from .config import get_settings
+from .events import SessionEvents
+from .host import HostExpectation, HostImage, HostLimits, HostView
+from .idempotency import IdempotencyConflict, ReplyCache
+from .journal import SessionJournal
+from .leaderboard import InMemoryLeaderboards, Leaderboards, RankedRun, build_leaderboards
+from .matching import CommandMatcher, CommandShape, CommandSuggester, parse_command
+from .metrics import Gauge, StoreMetrics
+from .schemas import (
+    CohortMember,
+    CohortProgressResponse,
+    CohortStepCount,
+    CommandResponse,
+    HintResponse,
+    LeaderboardEntry,
+    LeaderboardResponse,
+    MissionAnalyticsResponse,
+    MissionSummary,
+    SessionStatusResponse,
+    TranscriptEntry,
+    TranscriptPage,
+)
+from .sessions import (
+    InMemorySessionBackend,
+    MissionSession,
+    SessionBackend,
+    SessionCapacityError,
+    SessionGone,
+    SessionLocks,
+    SessionQuery,
+    build_session_backend,
+    monotonic_ms,
+    monotonic_ms_to_epoch,
+)
+from .sharding import new_session_id
 
-from .schemas import CommandResponse, MissionSummary
+T = TypeVar("T")
 
 
 @dataclass
@@ -17,6 +60,35 @@ class MissionStep:
     next_prompt: Optional[str]
     hint: str
     score: int
+    expect: Optional[HostExpectation] = None
+    matcher: Optional[CommandMatcher] = field(default=None, repr=False, compare=False)
+    suggester: Optional[CommandSuggester] = field(default=None, repr=False, compare=False)
+
+    def compile(self) -> None:
+        self.matcher = CommandMatcher(self.expected_commands)
+        # only what the matcher accepts, so a suggestion taken is never rejected
+        self.suggester = CommandSuggester(self.expected_commands)
+
+    def accepts(self, command: str) -> bool:
+        return self.accepts_shape(parse_command(command))
+
+    def accepts_shape(self, shape: CommandShape) -> bool:
+        if self.matcher is None:
+            self.compile()
+        return self.matcher.match_shape(shape)  # type: ignore[union-attr]
+
+    def solved_by(self, shape: CommandShape, host: Optional[HostView]) -> bool:
+        """Judge a command after it ran on the session's host, if the mission has one."""
+        accepted = self.accepts_shape(shape)
+        if self.expect is None or host is None:
+            return accepted
+        # any command that changed the host into the expected state counts too
+        return (accepted or host.changed) and self.expect.met_by(host)
+
+    def suggest(self, shape: CommandShape) -> Optional[str]:
+        if self.suggester is None:
+            self.compile()
+        return self.suggester.suggest(shape)  # type: ignore[union-attr]
 
 
 @dataclass
@@ -30,6 +102,26 @@ class Mission:
     recommended_commands: List[str]
     intro: str
     steps: List[MissionStep]
+    host: Optional[HostImage] = None
+    # content fingerprint; sessions pin the version they started on
+    version: str = ""
+
+    def compile(self) -> None:
+        for step in self.steps:
+            if step.matcher is None or step.suggester is None:
+                step.compile()
+        if not self.version:
+            self.version = self.fingerprint()
+
+    def fingerprint(self) -> str:
+        definition = asdict(self)
+        definition.pop("version")
+        for step in definition["steps"]:
+            step.pop("matcher")
+            step.pop("suggester")
+        # the host image keeps its directories in a frozenset
+        raw = json.dumps(definition, sort_keys=True, ensure_ascii=False, default=sorted).encode("utf-8")
+        return hashlib.blake2b(raw, digest_size=8).hexdigest()
 
     def summary(self) -> MissionSummary:
         return MissionSummary(
@@ -43,65 +135,269 @@ class Mission:
         )
 
 
-@dataclass
-class MissionSession:
-    session_id: str
-    mission_id: str
-    step_index: int = 0
-    mistakes: int = 0
-    total_score: int = 0
-    started_at: datetime = field(default_factory=datetime.utcnow)
-    time_limit_seconds: int = 900
-    history: List[str] = field(default_factory=list)
-    last_hint_index: Optional[int] = None
-
-    @property
-    def expires_at(self) -> datetime:
-        return self.started_at + timedelta(seconds=self.time_limit_seconds)
-
-    def time_remaining(self) -> int:
-        remaining = int((self.expires_at - datetime.utcnow()).total_seconds())
-        return max(0, remaining)
+@dataclass(frozen=True)
+class MissionCatalog:
+    version: int
+    summaries: Dict[str, MissionSummary]
+    # rendered exactly like FastAPI's JSONResponse renders List[MissionSummary]
+    body: bytes
+    etag: str
+
+
+def render_catalog(version: int, missions: List[Mission]) -> MissionCatalog:
+    summaries = {mission.id: mission.summary() for mission in missions}
+    body = json.dumps(
+        [summary.model_dump(mode="json") for summary in summaries.values()],
+        ensure_ascii=False,
+        allow_nan=False,
+        separators=(",", ":"),
+    ).encode("utf-8")
+    # content hash rather than the version so every worker agrees on the tag
+    etag = '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+    return MissionCatalog(version=version, summaries=summaries, body=body, etag=etag)
 
 
 class MissionStore:
-    def __init__(self) -> None:
+    def __init__(
+        self,
+        sessions: Optional[SessionBackend] = None,
+        leaderboards: Optional[Leaderboards] = None,
+        analytics: Optional[CommandAnalytics] = None,
+        shard_id: str = "",
+        replies: Optional[ReplyCache] = None,
+        host_limits: Optional[HostLimits] = None,
+    ) -> None:
+        self.shard_id = shard_id
+        self.host_limits = host_limits or HostLimits()
         self._missions: Dict[str, Mission] = {}
-        self._sessions: Dict[str, MissionSession] = {}
+        # every mission version ever registered, so running sessions survive a reload
+        self._pinned: Dict[Tuple[str, str], Mission] = {}
+        self._sessions: SessionBackend = sessions or InMemorySessionBackend()
+        self._catalog_version = 0
+        self._catalog: Optional[MissionCatalog] = None
+        self._catalog_lock = threading.Lock()
+        self._locks = SessionLocks()
+        self.events = SessionEvents()
+        self.journal: Optional[SessionJournal] = None
+        self.leaderboards = leaderboards or InMemoryLeaderboards()
+        self.analytics = analytics or CommandAnalytics()
+        self.replies = replies or ReplyCache()
+        self.metrics = StoreMetrics()
+        self.metrics.registry.register(
+            Gauge("mission_sessions_live", "Sessions currently held by the store.", self.session_count)
+        )
+        self.metrics.registry.register(
+            Gauge("mission_event_subscribers", "Open WebSocket and SSE subscriptions.", self.events.subscriber_count)
+        )
+        self.metrics.registry.register(
+            Gauge("mission_command_replies_cached", "Responses held for idempotent retries.", self.replies.__len__)
+        )
+
+    def catalog(self) -> MissionCatalog:
+        catalog = self._catalog
+        if catalog is not None and catalog.version == self._catalog_version:
+            return catalog
+        with self._catalog_lock:
+            version = self._catalog_version
+            if self._catalog is None or self._catalog.version != version:
+                self._catalog = render_catalog(version, list(self._missions.values()))
+            return self._catalog
 
     def list_missions(self) -> List[MissionSummary]:
-        return [mission.summary() for mission in self._missions.values()]
+        return list(self.catalog().summaries.values())
+
+    def mission_summary(self, mission_id: str) -> MissionSummary:
+        summary = self.catalog().summaries.get(mission_id)
+        if summary is None:
+            raise KeyError("Mission not found")
+        return summary
 
     def get_mission(self, mission_id: str) -> Mission:
         if mission_id not in self._missions:
             raise KeyError("Mission not found")
         return self._missions[mission_id]
 
-    def register_mission(self, mission: Mission) -> None:
-        self._missions[mission.id] = mission
+    def mission_for(self, session: MissionSession) -> Mission:
+        pinned = self._pinned.get((session.mission_id, session.mission_version))
+        return pinned if pinned is not None else self.get_mission(session.mission_id)
 
-    def create_session(self, mission_id: str) -> MissionSession:
-        mission = self.get_mission(mission_id)
-        session = MissionSession(
-            session_id=str(uuid.uuid4()),
-            mission_id=mission_id,
-            time_limit_seconds=mission.duration_seconds,
+    def register_mission(self, mission: Mission) -> None:
+        mission.compile()
+        with self._catalog_lock:
+            self._pinned[(mission.id, mission.version)] = mission
+            self._missions = {**self._missions, mission.id: mission}
+            self._catalog_version += 1
+
+    def replace_missions(self, missions: Iterable[Mission]) -> None:
+        catalog: Dict[str, Mission] = {}
+        for mission in missions:
+            mission.compile()
+            catalog[mission.id] = mission
+        with self._catalog_lock:
+            for mission in catalog.values():
+                self._pinned.setdefault((mission.id, mission.version), mission)
+            # a single reference swap: readers see the old or the new catalog, never a mix
+            self._missions = catalog
+            self._catalog_version += 1
+
+    async def offload(self, func: Callable[..., T], *args: Any) -> T:
+        # the in-memory backend never blocks, so skip the thread hop for it
+        if self._sessions.blocking:
+            return await asyncio.to_thread(func, *args)
+        return func(*args)
+
+    def attach_journal(self, journal: SessionJournal) -> int:
+        """Restore sessions from ``journal`` and record every later change to it."""
+        if not isinstance(self._sessions, InMemorySessionBackend):
+            raise ValueError("the session journal only applies to the in-memory backend")
+        leaderboards = self.leaderboards if isinstance(self.leaderboards, InMemoryLeaderboards) else None
+        recovered = journal.recover(self._sessions, leaderboards)
+        # fold the replayed history into one snapshot so the next start is fast
+        journal.snapshot(self._sessions, leaderboards)
+        journal.start()
+        self.journal = journal
+        return recovered
+
+    def snapshot_journal(self) -> int:
+        if self.journal is None or not isinstance(self._sessions, InMemorySessionBackend):
+            return 0
+        leaderboards = self.leaderboards if isinstance(self.leaderboards, InMemoryLeaderboards) else None
+        return self.journal.snapshot(self._sessions, leaderboards)
+
+    async def _journal_flushed(self) -> None:
+        if self.journal is not None:
+            await self.journal.flushed()
+
+    async def create_session(
+        self, mission_id: str, player_name: Optional[str] = None, cohort_id: Optional[str] = None
+    ) -> MissionSession:
+        return (await self.create_sessions(mission_id, 1, player_name, cohort_id))[0]
+
+    async def create_sessions(
+        self,
+        mission_id: str,
+        count: int,
+        player_name: Optional[str] = None,
+        cohort_id: Optional[str] = None,
+        evict: bool = True,
+    ) -> List[MissionSession]:
+        """Start ``count`` sessions; with ``evict=False``, raise SessionCapacityError rather than
+        evicting live sessions to make room for them."""
+        sessions = await self.offload(
+            self._create_sessions, mission_id, count, player_name or "", cohort_id or "", evict
         )
-        self._sessions[session.session_id] = session
-        return session
-
-    def get_session(self, session_id: str) -> MissionSession:
-        if session_id not in self._sessions:
-            raise KeyError("Session not found")
-        return self._sessions[session_id]
+        await self._journal_flushed()
+        return sessions
 
-    def evaluate_command(
+    def _create_sessions(
+        self, mission_id: str, count: int, player_name: str, cohort_id: str, evict: bool
+    ) -> List[MissionSession]:
+        mission = self.get_mission(mission_id)
+        if not evict:
+            free = max(0, self._sessions.max_sessions - self._sessions.count())
+            if count > free:
+                raise SessionCapacityError(count, free)
+        sessions = [
+            MissionSession(
+                session_id=new_session_id(self.shard_id),
+                mission_id=mission_id,
+                mission_version=mission.version,
+                time_limit_seconds=mission.duration_seconds,
+                player_name=player_name,
+                cohort_id=cohort_id,
+            )
+            for _ in range(count)
+        ]
+        evicted = self._sessions.add_many(sessions)
+        if self.journal is not None:
+            for session in sessions:
+                self.journal.record_session(session)
+            self.journal.record_removed(evicted, "evicted")
+        for evicted_id in evicted:
+            self.events.publish(evicted_id, {"type": "gone", "detail": "Session evicted"})
+        self.metrics.sessions_started.inc(mission_id, amount=count)
+        if evicted:
+            self.metrics.sessions_ended.inc("evicted", amount=len(evicted))
+        return sessions
+
+    async def get_session(self, session_id: str) -> MissionSession:
+        return await self.offload(self._sessions.get, session_id)
+
+    def session_count(self) -> int:
+        return self._sessions.count()
+
+    async def reap_expired(self, now: Optional[datetime] = None) -> int:
+        reaped = await self.offload(self._sessions.reap_expired, now)
+        for session_id in reaped:
+            self.events.publish(session_id, {"type": "gone", "detail": "Session expired"})
+        if reaped:
+            self.metrics.sessions_ended.inc("expired", amount=len(reaped))
+            if self.journal is not None:
+                self.journal.record_removed(reaped, "expired")
+        return len(reaped)
+
+    def close(self) -> None:
+        if self.journal is not None:
+            self.journal.close()
+        self._sessions.close()
+
+    async def evaluate_command(
         self,
         session_id: str,
         command: str,
     ) -> CommandResponse:
-        session = self.get_session(session_id)
-        mission = self.get_mission(session.mission_id)
+        async with self._locks.hold(session_id):
+            response = await self.offload(self._evaluate_command, session_id, command)
+            await self._journal_flushed()
+            return response
+
+    async def submit_command(self, session_id: str, command: str, idempotency_key: str) -> Tuple[bytes, bool]:
+        """Evaluate ``command`` once per key; return the JSON body and whether it is a replay.
+
+        A retry waits for the session lock behind the attempt it repeats, then
+        gets that attempt's body as it was first written.
+        """
+        async with self._locks.hold(session_id):
+            reply = self.replies.get(session_id, idempotency_key, monotonic_ms())
+            if reply is not None:
+                if reply.command != command:
+                    raise IdempotencyConflict()
+                self.metrics.command_replays.inc()
+                return reply.body, True
+            response = await self.offload(self._evaluate_command, session_id, command)
+            await self._journal_flushed()
+            body = response.__pydantic_serializer__.to_json(response)
+            self.replies.put(session_id, idempotency_key, command, body, monotonic_ms())
+            return body, False
+
+    def _evaluate_command(self, session_id: str, command: str) -> CommandResponse:
+        with self._sessions.transaction(session_id) as session:
+            response = self._evaluate(session, command)
+            if self.journal is not None:
+                self.journal.record_session(session)
+            return response
+
+    async def evaluate_commands(self, session_id: str, commands: List[str]) -> List[CommandResponse]:
+        async with self._locks.hold(session_id):
+            results = await self.offload(self._evaluate_commands, session_id, commands)
+            await self._journal_flushed()
+            return results
+
+    def _evaluate_commands(self, session_id: str, commands: List[str]) -> List[CommandResponse]:
+        results: List[CommandResponse] = []
+        with self._sessions.transaction(session_id) as session:
+            mission = self.mission_for(session)
+            for command in commands:
+                results.append(self._evaluate(session, command))
+                # later commands could only be rejected against a finished session
+                if session.step_index >= len(mission.steps) or session.time_remaining() <= 0:
+                    break
+            if self.journal is not None:
+                self.journal.record_session(session)
+        return results
+
+    def _evaluate(self, session: MissionSession, command: str) -> CommandResponse:
+        mission = self.mission_for(session)
 
         if session.step_index >= len(mission.steps):
             return CommandResponse(
@@ -120,6 +416,7 @@ class MissionStore:
 
         if session.time_remaining() <= 0:
             session.mistakes += 1
+            self._notify(session, mission, "mistake")
             return CommandResponse(
                 accepted=False,
                 terminal_output=["Session expired"],
@@ -134,17 +431,34 @@ class MissionStore:
             )
 
         current_step = mission.steps[session.step_index]
-        normalized = command.strip().lower()
-        session.history.append(command)
-
-        # allow slight variations by checking startswith for expected patterns
-        matched = any(
-            normalized.startswith(expected) for expected in current_step.expected_commands
-        )
-
-        if matched:
+        session.record_command(command, self._sessions.history_limit)
+
+        host: Optional[HostView] = None
+        output: Optional[List[str]] = None
+        if mission.host is not None:
+            host = HostView(mission.host, session.host, self.host_limits)
+            result = host.run(command)
+            session.host = None if host.overlay.empty else host.overlay
+            if result.handled:
+                output = result.output
+
+        started = time.perf_counter()
+        shape = parse_command(command)
+        accepted = current_step.solved_by(shape, host)
+        self.metrics.match_seconds.observe(time.perf_counter() - started)
+        self.metrics.commands.inc(mission.id, current_step.id, "accepted" if accepted else "rejected")
+
+        if accepted:
+            after_hint = session.last_hint_index == session.step_index
+            self.analytics.record_solved(mission.id, current_step.id, after_hint)
             session.total_score += current_step.score
             session.step_index += 1
+            if session.step_index >= len(mission.steps):
+                self._record_completion(session, mission)
+                self.events.cancel_deadline(session.session_id)
+                self._notify(session, mission, "complete")
+            else:
+                self._notify(session, mission, "step")
             next_prompt = (
                 mission.steps[session.step_index].prompt
                 if session.step_index < len(mission.steps)
@@ -152,7 +466,7 @@ class MissionStore:
             )
             success = CommandResponse(
                 accepted=True,
-                terminal_output=current_step.success_output,
+                terminal_output=current_step.success_output if output is None else output,
                 feedback="Great job!",
                 step_index=session.step_index,
                 total_steps=len(mission.steps),
@@ -165,11 +479,18 @@ class MissionStore:
             )
             return success
 
+        self.analytics.record_rejected(mission.id, current_step.id, shape)
         session.mistakes += 1
+        self._notify(session, mission, "mistake")
+        suggestion = current_step.suggest(shape)
         return CommandResponse(
             accepted=False,
-            terminal_output=["command not recognized"],
-            feedback="That didn't solve it. Check the mission objectives and try another command.",
+            terminal_output=["command not recognized"] if output is None else output,
+            feedback=(
+                f"That didn't solve it. Did you mean '{suggestion}'?"
+                if suggestion
+                else "That didn't solve it. Check the mission objectives and try another command."
+            ),
             step_index=session.step_index,
             total_steps=len(mission.steps),
             mission_complete=False,
@@ -178,185 +499,251 @@ class MissionStore:
             score_awarded=0,
             total_score=session.total_score,
             time_remaining_seconds=session.time_remaining(),
+            suggestion=suggestion,
         )
 
-    def request_hint(self, session_id: str) -> str:
-        session = self.get_session(session_id)
-        mission = self.get_mission(session.mission_id)
+    async def request_hint(self, session_id: str) -> str:
+        return (await self.hint(session_id)).hint
+
+    def _take_hint(self, session: MissionSession, mission: Mission) -> str:
         if session.step_index >= len(mission.steps):
             return "Mission complete! No hints needed."
 
         current_step = mission.steps[session.step_index]
         session.last_hint_index = session.step_index
+        self.metrics.hints.inc(mission.id, current_step.id)
+        self.analytics.record_hint(mission.id, current_step.id)
+        self._notify(session, mission, "hint")
         return current_step.hint
 
-    def session_status(self, session_id: str) -> MissionSession:
-        return self.get_session(session_id)
-
-
-store = MissionStore()
-
-
-store.register_mission(
-    Mission(
-        id="missing-route",
-        title="Restore Network Connectivity",
-        difficulty="Intermediate",
-        duration_seconds=900,
-        scenario="A remote employee lost connectivity after a VPN disconnect.",
-        objectives=[
-            "Inspect network interface configuration",
-            "Restore missing default route",
-            "Verify connectivity",
-        ],
-        recommended_commands=["ip addr", "ip route", "ping"],
-        intro=(
-            "You're on call and Aymane Qouraiche trusts you with restoring service."
-            " The user reports they can't reach any websites after their VPN session dropped."
-        ),
-        steps=[
-            MissionStep(
-                id="inspect",
-                prompt="Check the active network interfaces and identify any missing routes.",
-                expected_commands=["ip addr", "sudo ip addr", "ifconfig"],
-                success_output=[
-                    "eth0: flags=4163<UP,BROADCAST,RUNNING,MULTICAST> mtu 1500",
-                    "    inet 10.0.0.42/24 brd 10.0.0.255 scope global eth0",
-                ],
-                next_prompt="Nice. The default gateway is missing. Add a route via 10.0.0.1.",
-                hint="Use ip route add to define the default route.",
-                score=100,
-            ),
-            MissionStep(
-                id="route",
-                prompt="Add the missing default route using the correct gateway.",
-                expected_commands=[
-                    "ip route add default via 10.0.0.1",
-                    "sudo ip route add default via 10.0.0.1",
-                ],
-                success_output=["Route added: default via 10.0.0.1 dev eth0"],
-                next_prompt="Great! Confirm the fix by pinging 8.8.8.8.",
-                hint="Use ping with ctrl+c to stop after a few replies.",
-                score=150,
-            ),
-            MissionStep(
-                id="ping",
-                prompt="Validate connectivity by pinging a well-known IP.",
-                expected_commands=["ping 8.8.8.8", "ping -c 4 8.8.8.8"],
-                success_output=[
-                    "PING 8.8.8.8 (8.8.8.8) 56(84) bytes of data.",
-                    "64 bytes from 8.8.8.8: icmp_seq=1 ttl=115 time=22.0 ms",
-                    "--- 8.8.8.8 ping statistics ---",
-                    "3 packets transmitted, 3 received, 0% packet loss",
-                ],
-                next_prompt="All set! The user confirms internet access is back.",
-                hint="A simple ping test should do.",
-                score=200,
-            ),
-        ],
-    )
-)
+    async def hint(self, session_id: str) -> HintResponse:
+        async with self._locks.hold(session_id):
+            response = await self.offload(self._hint, session_id)
+            await self._journal_flushed()
+            return response
+
+    def _hint(self, session_id: str) -> HintResponse:
+        with self._sessions.transaction(session_id) as session:
+            mission = self.mission_for(session)
+            hint = self._take_hint(session, mission)
+            if self.journal is not None:
+                self.journal.record_session(session)
+            return HintResponse(
+                step_index=session.step_index,
+                hint=hint,
+                remaining_hints=max(0, len(mission.steps) - session.step_index - 1),
+            )
 
-store.register_mission(
-    Mission(
-        id="log-chaos",
-        title="Calm a Crashing Service",
-        difficulty="Advanced",
-        duration_seconds=1200,
-        scenario="A containerized web service keeps restarting on production and users see 503 errors.",
-        objectives=[
-            "Inspect recent service logs",
-            "Identify the failing dependency",
-            "Restart the service after applying the fix",
-        ],
-        recommended_commands=["journalctl", "systemctl status", "systemctl restart"],
-        intro=(
-            "Traffic is spiking and leadership paged you directly, Aymane Qouraiche."
-            " The API is flapping and customers are complaining."
-        ),
-        steps=[
-            MissionStep(
-                id="logs",
-                prompt="Check the service logs for the last five minutes and spot the crash loop.",
-                expected_commands=[
-                    "journalctl -u web-api --since -5m",
-                    "sudo journalctl -u web-api --since -5m",
-                ],
-                success_output=[
-                    "Oct 10 11:02:01 api-host web-api[4242]: ImportError: cannot import name 'connect_db'",
-                    "Oct 10 11:02:01 api-host systemd[1]: web-api.service: Main process exited, code=exited",
-                ],
-                next_prompt="Looks like a missing dependency. Inspect the service status for clues.",
-                hint="Use journalctl with --since to narrow down logs.",
-                score=120,
-            ),
-            MissionStep(
-                id="status",
-                prompt="Check the service status to confirm the failing unit and environment.",
-                expected_commands=["systemctl status web-api", "sudo systemctl status web-api"],
-                success_output=[
-                    "web-api.service - Web API",
-                    "   Loaded: loaded (/etc/systemd/system/web-api.service; enabled)",
-                    "   Active: failed (Result: exit-code)",
-                    "   Process: 4242 ExecStart=/opt/web-api/start.sh (code=exited, status=1/FAILURE)",
-                ],
-                next_prompt="Add the missing dependency and restart the service to confirm.",
-                hint="systemctl status provides the recent log tail too.",
-                score=160,
-            ),
-            MissionStep(
-                id="restart",
-                prompt="Restart the service now that the dependency is fixed in the container image.",
-                expected_commands=[
-                    "systemctl restart web-api",
-                    "sudo systemctl restart web-api",
-                ],
-                success_output=[
-                    "web-api.service - Web API",
-                    "   Active: active (running)",
-                ],
-                next_prompt="Service is running steady. Update status page and breathe.",
-                hint="Use systemctl restart followed by status to double-check.",
-                score=220,
-            ),
-        ],
-    )
-)
+    def _record_completion(self, session: MissionSession, mission: Mission) -> None:
+        session.completed_ms = monotonic_ms()
+        run = RankedRun(
+            mission_id=mission.id,
+            session_id=session.session_id,
+            player_name=session.player_name,
+            total_score=session.total_score,
+            mistakes=session.mistakes,
+            elapsed_ms=session.completed_ms - session.started_ms,
+            completed_at=monotonic_ms_to_epoch(session.completed_ms),
+        )
+        self.leaderboards.record(run)
+        self.analytics.record_completed(mission.id, run.elapsed_ms / 1000)
+        if self.journal is not None:
+            self.journal.record_ranked(run)
 
-store.register_mission(
-    Mission(
-        id="sandbox-check",
-        title="Warm Up Diagnostics",
-        difficulty="Beginner",
-        duration_seconds=300,
-        scenario="A practice host needs a basic health check before training begins.",
-        objectives=[
-            "Print the working directory",
-            "List the files in the directory",
-        ],
-        recommended_commands=["pwd", "ls"],
-        intro="Use this quick mission to verify the terminal and scoring flow before tackling tougher incidents.",
-        steps=[
-            MissionStep(
-                id="pwd",
-                prompt="Confirm where you're located in the filesystem.",
-                expected_commands=["pwd", "printf $PWD", "echo $PWD"],
-                success_output=["/home/sysadmin"],
-                next_prompt="Great. Now enumerate the files so you know what tools are available.",
-                hint="Run pwd or an equivalent command to print the current directory.",
-                score=25,
-            ),
-            MissionStep(
-                id="ls",
-                prompt="List the files to ensure your toolkit is present.",
-                expected_commands=["ls", "ls -la"],
-                success_output=[
-                    "tools.sh  runbook.md  diagnostics.log",
-                ],
-                next_prompt="Sandbox checks out. You're ready for the real missions!",
-                hint="Use ls to display directory contents.",
-                score=50,
-            ),
-        ],
-    )
+    async def leaderboard(
+        self,
+        mission_id: str,
+        offset: int,
+        limit: int,
+        session_id: Optional[str] = None,
+    ) -> LeaderboardResponse:
+        self.get_mission(mission_id)
+        return await self.offload(self._leaderboard, mission_id, offset, limit, session_id)
+
+    def _leaderboard(
+        self, mission_id: str, offset: int, limit: int, session_id: Optional[str]
+    ) -> LeaderboardResponse:
+        total, ranked = self.leaderboards.page(mission_id, offset, limit)
+        player = self.leaderboards.rank(mission_id, session_id) if session_id else None
+        return LeaderboardResponse(
+            mission_id=mission_id,
+            total=total,
+            offset=offset,
+            limit=limit,
+            entries=[self._leaderboard_entry(rank, run) for rank, run in ranked],
+            player=self._leaderboard_entry(*player) if player else None,
+        )
+
+    @staticmethod
+    def _leaderboard_entry(rank: int, run: RankedRun) -> LeaderboardEntry:
+        return LeaderboardEntry(
+            rank=rank,
+            player_name=run.player_name or None,
+            total_score=run.total_score,
+            mistakes=run.mistakes,
+            completion_seconds=run.elapsed_ms / 1000,
+            completed_at=datetime.utcfromtimestamp(run.completed_at),
+        )
+
+    def analytics_report(self, mission_id: str, limit: int) -> MissionAnalyticsResponse:
+        mission = self.get_mission(mission_id)
+        return self.analytics.report(mission_id, [step.id for step in mission.steps], limit)
+
+    def analytics_export(self, mission_id: str) -> bytes:
+        mission = self.get_mission(mission_id)
+        return self.analytics.export_npz(mission_id, [step.id for step in mission.steps])
+
+    async def cohort_progress(self, cohort_id: str) -> CohortProgressResponse:
+        return await self.offload(self._cohort_progress, cohort_id)
+
+    def _cohort_progress(self, cohort_id: str) -> CohortProgressResponse:
+        sessions = self._sessions.cohort_sessions(cohort_id)
+        if not sessions:
+            raise KeyError("Cohort not found")
+        members = []
+        playing: List[int] = []
+        for session in sessions:
+            total_steps = len(self.mission_for(session).steps)
+            completed = session.step_index >= total_steps
+            remaining = session.time_remaining()
+            if not completed and remaining > 0:
+                playing.append(remaining)
+            members.append(
+                CohortMember(
+                    session_id=session.session_id,
+                    player_name=session.player_name or None,
+                    mission_id=session.mission_id,
+                    step_index=session.step_index,
+                    total_steps=total_steps,
+                    mistakes=session.mistakes,
+                    total_score=session.total_score,
+                    time_remaining_seconds=remaining,
+                    completed=completed,
+                )
+            )
+        # each session's step is named from the mission version it was started on
+        counts: Dict[Tuple[str, int, Optional[str]], int] = {}
+        for (mission_id, version, step_index), count in self._sessions.cohort_steps(cohort_id).items():
+            mission = self._pinned.get((mission_id, version)) or self._missions.get(mission_id)
+            step_id = mission.steps[step_index].id if mission and step_index < len(mission.steps) else None
+            key = (mission_id, step_index, step_id)
+            counts[key] = counts.get(key, 0) + count
+        steps = [
+            CohortStepCount(mission_id=mission_id, step_index=step_index, step_id=step_id, sessions=count)
+            for (mission_id, step_index, step_id), count in sorted(counts.items(), key=lambda item: item[0][:2])
+        ]
+        mistakes = sum(member.mistakes for member in members)
+        return CohortProgressResponse(
+            cohort_id=cohort_id,
+            sessions=len(members),
+            completions=sum(member.completed for member in members),
+            mistakes=mistakes,
+            mean_mistakes=mistakes / len(members),
+            min_time_remaining_seconds=min(playing) if playing else None,
+            max_time_remaining_seconds=max(playing) if playing else None,
+            steps=steps,
+            members=members,
+        )
+
+    async def transcripts(self, query: SessionQuery, cursor: Optional[str], limit: int) -> TranscriptPage:
+        return await self.offload(self._transcripts, query, cursor, limit)
+
+    def _transcripts(self, query: SessionQuery, cursor: Optional[str], limit: int) -> TranscriptPage:
+        sessions, next_cursor = self._sessions.scan(query, cursor, limit)
+        return TranscriptPage(
+            transcripts=[TranscriptEntry(**self._transcript(session)) for session in sessions],
+            next_cursor=next_cursor,
+        )
+
+    async def export_transcripts(self, query: SessionQuery, chunk_size: int = 100) -> AsyncIterator[bytes]:
+        """Yield every matching transcript as NDJSON, ``chunk_size`` lines at a time.
+
+        Walks the sessions page by page with a cursor, so memory stays flat however
+        many there are, and gives the event loop back between pages so live
+        commands are not held up behind a large export.
+        """
+        cursor: Optional[str] = None
+        while True:
+            chunk, cursor = await self.offload(self._export_chunk, query, cursor, chunk_size)
+            if chunk:
+                yield chunk
+            if cursor is None:
+                return
+            await asyncio.sleep(0)
+
+    def _export_chunk(
+        self, query: SessionQuery, cursor: Optional[str], limit: int
+    ) -> Tuple[bytes, Optional[str]]:
+        sessions, next_cursor = self._sessions.scan(query, cursor, limit)
+        lines = []
+        for session in sessions:
+            # the same bytes as a TranscriptEntry, at a third of the cost of validating one
+            lines.append(to_json(self._transcript(session)))
+            lines.append(b"\n")
+        return b"".join(lines), next_cursor
+
+    @staticmethod
+    def _transcript(session: MissionSession) -> Dict[str, Any]:
+        # TranscriptEntry's fields, in its order
+        return {
+            "session_id": session.session_id,
+            "mission_id": session.mission_id,
+            "mission_version": session.mission_version,
+            "player_name": session.player_name or None,
+            "cohort_id": session.cohort_id or None,
+            "started_at": session.started_at,
+            "completed_at": session.completed_at,
+            "step_index": session.step_index,
+            "mistakes": session.mistakes,
+            "total_score": session.total_score,
+            "commands": list(session.recent_commands),
+            "truncated": session.commands_dropped > 0,
+        }
+
+    async def session_status(self, session_id: str) -> MissionSession:
+        return await self.get_session(session_id)
+
+    async def status(self, session_id: str) -> SessionStatusResponse:
+        session = await self.get_session(session_id)
+        return self._status(session, self.mission_for(session))
+
+    def _notify(self, session: MissionSession, mission: Mission, reason: str) -> None:
+        # building the payload is the expensive part; skip it for unwatched sessions
+        if not self.events.has_subscribers(session.session_id):
+            return
+        self.events.publish(
+            session.session_id,
+            {
+                "type": "status",
+                "reason": reason,
+                "data": self._status(session, mission).model_dump(mode="json"),
+            },
+        )
+
+    @staticmethod
+    def _status(session: MissionSession, mission: Mission) -> SessionStatusResponse:
+        return SessionStatusResponse(
+            session_id=session.session_id,
+            mission_id=mission.id,
+            step_index=session.step_index,
+            total_steps=len(mission.steps),
+            mistakes=session.mistakes,
+            time_remaining_seconds=session.time_remaining(),
+            completed=session.step_index >= len(mission.steps),
+        )
+
+
+settings = get_settings()
+_sessions = build_session_backend(settings)
+store = MissionStore(
+    _sessions,
+    build_leaderboards(settings, _sessions),
+    CommandAnalytics(top_commands=settings.analytics_top_commands),
+    shard_id=settings.shard_id,
+    replies=ReplyCache(
+        settings.idempotency_keys_per_session,
+        settings.idempotency_ttl_seconds,
+        settings.idempotency_max_sessions,
+    ),
+    host_limits=HostLimits(settings.host_overlay_max_bytes, settings.host_overlay_max_entries),
 )
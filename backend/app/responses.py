@@ -0,0 +1,165 @@
+from __future__ import annotations
+
+import gzip
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from pydantic import BaseModel
+from pydantic_core import to_json
+from starlette.responses import JSONResponse
+
+try:  # br is offered only when this is installed
+    import brotli
+except ImportError:  # pragma: no cover - depends on the environment
+    brotli = None
+
+# cheap settings: these run on the event loop for every large response
+GZIP_LEVEL = 5
+BROTLI_QUALITY = 4
+# compressed bodies kept per (path, strong ETag, encoding), e.g. the catalog's
+COMPRESSED_CACHE_SIZE = 64
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse that skips FastAPI's validate-then-encode pass.
+
+    Routes return ``FastJSONResponse(model)`` for models they built themselves;
+    pydantic-core writes the model straight to JSON bytes, and encodes other
+    content too. Both emit the same bytes as the standard response (compact
+    separators, raw UTF-8) for the values this API returns, which
+    ``tests/test_json_compat.py`` verifies.
+    """
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, BaseModel):
+            return content.__pydantic_serializer__.to_json(content)
+        return to_json(content)
+
+
+def _accepted_encodings(headers: List[Tuple[bytes, bytes]]) -> List[str]:
+    accepted = []
+    for name, value in headers:
+        if name != b"accept-encoding":
+            continue
+        for part in value.decode("latin-1").split(","):
+            coding, _, params = part.partition(";")
+            quality = params.strip().removeprefix("q=")
+            try:
+                refused = bool(quality) and float(quality) == 0
+            except ValueError:
+                refused = False
+            if not refused:
+                accepted.append(coding.strip().lower())
+    return accepted
+
+
+class CompressionMiddleware:
+    """Pure ASGI middleware compressing complete responses of ``minimum_size`` bytes or more.
+
+    Uses brotli when it is installed and the client accepts it, gzip otherwise.
+    Streamed responses (server-sent events) pass through untouched, and strong
+    ETags become weak, since the compressed bytes differ from the identity ones.
+    A strong ETag names exactly one body, so the compressed form of a response
+    carrying one is kept and reused until the ETag changes.
+    """
+
+    def __init__(self, app: Any, minimum_size: int = 1024) -> None:
+        self.app = app
+        self.minimum_size = minimum_size
+        self._compressed: "OrderedDict[Tuple[str, bytes, str], bytes]" = OrderedDict()
+
+    async def __call__(self, scope: Dict[str, Any], receive: Any, send: Any) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        accepted = _accepted_encodings(scope["headers"])
+        if brotli is not None and "br" in accepted:
+            encoding = "br"
+        elif "gzip" in accepted:
+            encoding = "gzip"
+        else:
+            await self.app(scope, receive, send)
+            return
+
+        start: Optional[Dict[str, Any]] = None
+        streaming = False
+
+        async def compressing_send(message: Dict[str, Any]) -> None:
+            nonlocal start, streaming
+            if message["type"] == "http.response.start":
+                if message["status"] == 304:
+                    # the same validators a compressed 200 would carry
+                    message["headers"] = _compressed_headers(message["headers"], None, None)
+                    await send(message)
+                    return
+                start = message
+                return
+            if start is None or streaming or message["type"] != "http.response.body":
+                await send(message)
+                return
+            body = message.get("body", b"")
+            streaming = True
+            if (
+                message.get("more_body", False)
+                or len(body) < self.minimum_size
+                or _has(start["headers"], b"content-encoding")
+            ):
+                await send(start)
+                await send(message)
+                return
+            body = self._compress(scope["path"], _header(start["headers"], b"etag"), encoding, body)
+            start["headers"] = _compressed_headers(start["headers"], encoding, len(body))
+            await send(start)
+            await send({"type": "http.response.body", "body": body})
+
+        await self.app(scope, receive, compressing_send)
+
+    def _compress(self, path: str, etag: Optional[bytes], encoding: str, body: bytes) -> bytes:
+        key = (path, etag, encoding) if etag is not None and not etag.startswith(b"W/") else None
+        if key is not None:
+            cached = self._compressed.get(key)
+            if cached is not None:
+                self._compressed.move_to_end(key)
+                return cached
+        if encoding == "br":
+            compressed = brotli.compress(body, quality=BROTLI_QUALITY)
+        else:
+            compressed = gzip.compress(body, compresslevel=GZIP_LEVEL)
+        if key is not None:
+            self._compressed[key] = compressed
+            if len(self._compressed) > COMPRESSED_CACHE_SIZE:
+                self._compressed.popitem(last=False)
+        return compressed
+
+
+def _has(headers: List[Tuple[bytes, bytes]], name: bytes) -> bool:
+    return any(key.lower() == name for key, _ in headers)
+
+
+def _header(headers: List[Tuple[bytes, bytes]], name: bytes) -> Optional[bytes]:
+    return next((value for key, value in headers if key.lower() == name), None)
+
+
+def _compressed_headers(
+    headers: List[Tuple[bytes, bytes]], encoding: Optional[str], length: Optional[int]
+) -> List[Tuple[bytes, bytes]]:
+    result = []
+    vary = False
+    for key, value in headers:
+        lower = key.lower()
+        if lower == b"content-length" and length is not None:
+            continue
+        if lower == b"etag" and not value.startswith(b"W/"):
+            value = b"W/" + value
+        if lower == b"vary":
+            vary = True
+            if b"accept-encoding" not in value.lower():
+                value = value + b", Accept-Encoding"
+        result.append((key, value))
+    if encoding is not None:
+        result.append((b"content-encoding", encoding.encode()))
+    if length is not None:
+        result.append((b"content-length", str(length).encode()))
+    if not vary:
+        result.append((b"vary", b"Accept-Encoding"))
+    return result
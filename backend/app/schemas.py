@@ -1,8 +1,16 @@
 from datetime import datetime
-from typing import List, Optional
+from typing import Annotated, List, Optional
 
 from pydantic import BaseModel, Field
 
+MAX_BATCH_COMMANDS = 500
+MAX_BULK_SESSIONS = 500
+MAX_LEADERBOARD_PAGE = 100
+MAX_ANALYTICS_TOP = 100
+MAX_TRANSCRIPT_PAGE = 1000
+
+CohortId = Annotated[str, Field(min_length=1, max_length=64, pattern=r"^[A-Za-z0-9._-]+$")]
+
 
 class MissionStepSchema(BaseModel):
     id: str
@@ -23,6 +31,7 @@ class MissionSummary(BaseModel):
 class MissionStartRequest(BaseModel):
     mission_id: str
     player_name: Optional[str] = Field(default=None, max_length=64)
+    cohort_id: Optional[CohortId] = None
 
 
 class MissionStartResponse(BaseModel):
@@ -36,10 +45,26 @@ class MissionStartResponse(BaseModel):
     started_at: datetime
 
 
+class MissionBulkStartRequest(BaseModel):
+    mission_id: str
+    count: int = Field(..., ge=1, le=MAX_BULK_SESSIONS)
+    cohort_id: Optional[CohortId] = None
+
+
+class MissionBulkStartResponse(BaseModel):
+    sessions: List[MissionStartResponse]
+
+
 class CommandRequest(BaseModel):
     command: str = Field(..., min_length=1)
 
 
+class CommandBatchRequest(BaseModel):
+    commands: List[Annotated[str, Field(min_length=1)]] = Field(
+        ..., min_length=1, max_length=MAX_BATCH_COMMANDS
+    )
+
+
 class CommandResponse(BaseModel):
     accepted: bool
     terminal_output: List[str]
@@ -52,6 +77,14 @@ class CommandResponse(BaseModel):
     score_awarded: int
     total_score: int
     time_remaining_seconds: int
+    # closest accepted command to a rejected one, when it looks like a slip
+    suggestion: Optional[str] = None
+
+
+class CommandBatchResponse(BaseModel):
+    results: List[CommandResponse]
+    evaluated: int
+    stopped_early: bool
 
 
 class HintResponse(BaseModel):
@@ -70,5 +103,110 @@ class SessionStatusResponse(BaseModel):
     completed: bool
 
 
+class LeaderboardEntry(BaseModel):
+    rank: int
+    player_name: Optional[str] = None
+    total_score: int
+    mistakes: int
+    completion_seconds: float
+    completed_at: datetime
+
+
+class LeaderboardResponse(BaseModel):
+    mission_id: str
+    total: int
+    offset: int
+    limit: int
+    entries: List[LeaderboardEntry]
+    # the requesting session's own placement, when it asked with session_id
+    player: Optional[LeaderboardEntry] = None
+
+
+class RejectedCommandEntry(BaseModel):
+    command: str
+    count: int
+    # count may overstate the true number by up to this much
+    error: int
+
+
+class StepAnalyticsEntry(BaseModel):
+    step_id: str
+    rejections: int
+    hints: int
+    solves: int
+    solves_after_hint: int
+    top_rejected: List[RejectedCommandEntry]
+
+
+class SolveTimeBucket(BaseModel):
+    # upper bound of the bucket; None for the overflow bucket
+    le_seconds: Optional[float] = None
+    count: int
+
+
+class MissionAnalyticsResponse(BaseModel):
+    mission_id: str
+    completions: int
+    mean_solve_seconds: Optional[float] = None
+    solve_time_buckets: List[SolveTimeBucket]
+    steps: List[StepAnalyticsEntry]
+
+
+class CohortStepCount(BaseModel):
+    mission_id: str
+    step_index: int
+    # None for sessions past the last step
+    step_id: Optional[str] = None
+    sessions: int
+
+
+class CohortMember(BaseModel):
+    session_id: str
+    player_name: Optional[str] = None
+    mission_id: str
+    step_index: int
+    total_steps: int
+    mistakes: int
+    total_score: int
+    time_remaining_seconds: int
+    completed: bool
+
+
+class CohortProgressResponse(BaseModel):
+    cohort_id: str
+    sessions: int
+    completions: int
+    mistakes: int
+    mean_mistakes: float
+    # over sessions still playing; None once every one has finished or run out of time
+    min_time_remaining_seconds: Optional[int] = None
+    max_time_remaining_seconds: Optional[int] = None
+    steps: List[CohortStepCount]
+    members: List[CohortMember]
+
+
+class TranscriptEntry(BaseModel):
+    session_id: str
+    mission_id: str
+    mission_version: str
+    player_name: Optional[str] = None
+    cohort_id: Optional[str] = None
+    started_at: datetime
+    completed_at: Optional[datetime] = None
+    step_index: int
+    mistakes: int
+    total_score: int
+    # the most recent commands, oldest first, up to the server's history limit
+    commands: List[str]
+    # true once older commands fell out of the history; such a transcript cannot be regraded
+    truncated: bool = False
+
+
+class TranscriptPage(BaseModel):
+    transcripts: List[TranscriptEntry]
+    # pass back as cursor for the next page; None after the last one
+    next_cursor: Optional[str] = None
+
+
 class ApiMessage(BaseModel):
     detail: str
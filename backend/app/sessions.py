@@ -0,0 +1,804 @@
+from __future__ import annotations
+
+import asyncio
+import heapq
+import json
+import sqlite3
+import sys
+import threading
+import time
+from abc import ABC, abstractmethod
+from bisect import bisect_left, bisect_right, insort
+from collections import OrderedDict
+from contextlib import asynccontextmanager, contextmanager
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Any, AsyncIterator, ContextManager, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .config import Settings
+from .host import HostOverlay
+
+
+def monotonic_ms() -> int:
+    return time.monotonic_ns() // 1_000_000
+
+
+# wall-clock epoch seconds at which the monotonic clock read zero; converts the
+# integer timestamps sessions keep into datetimes for the API and SQLite rows
+_WALL_AT_MONOTONIC_ZERO = time.time() - time.monotonic()
+_EPOCH = datetime(1970, 1, 1)
+
+
+def monotonic_ms_to_epoch(value: int) -> float:
+    return _WALL_AT_MONOTONIC_ZERO + value / 1000
+
+
+def epoch_to_monotonic_ms(value: float) -> int:
+    return int((value - _WALL_AT_MONOTONIC_ZERO) * 1000)
+
+
+def monotonic_ms_to_datetime(value: int) -> datetime:
+    return _EPOCH + timedelta(seconds=monotonic_ms_to_epoch(value))
+
+
+def datetime_to_monotonic_ms(value: datetime) -> int:
+    return epoch_to_monotonic_ms((value - _EPOCH).total_seconds())
+
+
+@dataclass(slots=True)
+class MissionSession:
+    session_id: str
+    mission_id: str
+    mission_version: str = ""
+    step_index: int = 0
+    mistakes: int = 0
+    total_score: int = 0
+    started_ms: int = field(default_factory=monotonic_ms)
+    time_limit_seconds: int = 900
+    last_active_ms: int = field(default_factory=monotonic_ms)
+    # -1 until a hint is taken; see last_hint_index
+    hint_index: int = -1
+    # most recent commands, oldest first, bounded by the backend's history limit.
+    # A tuple rebuilt on append is far smaller than a deque for short windows,
+    # and the shared empty tuple costs nothing when history is disabled.
+    recent_commands: Tuple[str, ...] = ()
+    player_name: str = ""
+    # 0 until the last step is solved
+    completed_ms: int = 0
+    # changes to the mission's simulated host; None until the first one
+    host: Optional[HostOverlay] = None
+    # classroom the session was started in; "" for none
+    cohort_id: str = ""
+    # commands that fell out of recent_commands, so transcripts can say they are partial
+    commands_dropped: int = 0
+
+    def __post_init__(self) -> None:
+        # thousands of sessions share a handful of missions, and hundreds a cohort
+        self.mission_id = sys.intern(self.mission_id)
+        self.mission_version = sys.intern(self.mission_version)
+        self.cohort_id = sys.intern(self.cohort_id)
+
+    @property
+    def started_at(self) -> datetime:
+        return monotonic_ms_to_datetime(self.started_ms)
+
+    @property
+    def last_active_at(self) -> datetime:
+        return monotonic_ms_to_datetime(self.last_active_ms)
+
+    @property
+    def expires_ms(self) -> int:
+        return self.started_ms + self.time_limit_seconds * 1000
+
+    @property
+    def expires_at(self) -> datetime:
+        return monotonic_ms_to_datetime(self.expires_ms)
+
+    @property
+    def completed_at(self) -> Optional[datetime]:
+        return monotonic_ms_to_datetime(self.completed_ms) if self.completed_ms else None
+
+    @property
+    def last_hint_index(self) -> Optional[int]:
+        return None if self.hint_index < 0 else self.hint_index
+
+    @last_hint_index.setter
+    def last_hint_index(self, value: Optional[int]) -> None:
+        self.hint_index = -1 if value is None else value
+
+    @property
+    def history(self) -> List[str]:
+        return list(self.recent_commands)
+
+    def record_command(self, command: str, limit: int) -> None:
+        if limit <= 0:
+            self.commands_dropped += 1
+            return
+        recent = self.recent_commands
+        if len(recent) >= limit:
+            self.commands_dropped += len(recent) - limit + 1
+            recent = recent[len(recent) - limit + 1 :]
+        self.recent_commands = (*recent, command)
+
+    def time_remaining(self) -> int:
+        return max(0, (self.expires_ms - monotonic_ms()) // 1000)
+
+    def reap_at_ms(self, idle_timeout_ms: int, retention_ms: int) -> int:
+        # a session is dropped once it has been idle too long, or once its mission
+        # clock ran out and the retention window for reading results has passed
+        return min(self.last_active_ms + idle_timeout_ms, self.expires_ms + retention_ms)
+
+
+@dataclass(frozen=True)
+class SessionQuery:
+    """Filters for scanning sessions; None matches everything."""
+
+    mission_id: Optional[str] = None
+    completed: Optional[bool] = None
+    # window on the start time, since inclusive and until exclusive
+    since_ms: Optional[int] = None
+    until_ms: Optional[int] = None
+
+    def matches(self, session: MissionSession) -> bool:
+        return (
+            (self.mission_id is None or session.mission_id == self.mission_id)
+            and (self.completed is None or bool(session.completed_ms) == self.completed)
+            and (self.since_ms is None or session.started_ms >= self.since_ms)
+            and (self.until_ms is None or session.started_ms < self.until_ms)
+        )
+
+
+def _split_cursor(cursor: str) -> Tuple[str, str]:
+    started, separator, session_id = cursor.partition(":")
+    if not separator or not session_id:
+        raise ValueError("Invalid cursor")
+    return started, session_id
+
+
+class SessionGone(KeyError):
+    def __init__(self, session_id: str, reason: str) -> None:
+        super().__init__(session_id)
+        self.session_id = session_id
+        self.reason = reason
+
+    def __str__(self) -> str:
+        return f"Session {self.reason}"
+
+
+class SessionCapacityError(Exception):
+    def __init__(self, requested: int, free: int) -> None:
+        super().__init__(f"Only {free} of the {requested} sessions requested fit under the session limit")
+        self.requested = requested
+        self.free = free
+
+
+class SessionLocks:
+    """Per-session asyncio locks, created on demand and dropped once released.
+
+    Operations on one session run in arrival order while different sessions
+    proceed concurrently; the table only holds sessions with work in flight.
+    """
+
+    def __init__(self) -> None:
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._holders: Dict[str, int] = {}
+
+    @asynccontextmanager
+    async def hold(self, session_id: str) -> AsyncIterator[None]:
+        lock = self._locks.get(session_id)
+        if lock is None:
+            lock = self._locks[session_id] = asyncio.Lock()
+        self._holders[session_id] = self._holders.get(session_id, 0) + 1
+        try:
+            async with lock:
+                yield
+        finally:
+            remaining = self._holders[session_id] - 1
+            if remaining:
+                self._holders[session_id] = remaining
+            else:
+                del self._holders[session_id]
+                del self._locks[session_id]
+
+    def __len__(self) -> int:
+        return len(self._locks)
+
+
+class SessionBackend(ABC):
+    # backends doing I/O are called from a worker thread instead of the event loop
+    blocking = False
+
+    def __init__(
+        self,
+        idle_timeout_seconds: int = 60 * 60,
+        retention_seconds: int = 5 * 60,
+        max_sessions: int = 10_000,
+        history_limit: int = 50,
+    ) -> None:
+        # commands kept per session for transcripts; 0 keeps none
+        self.history_limit = history_limit
+        self.idle_timeout_ms = idle_timeout_seconds * 1000
+        self.retention_ms = retention_seconds * 1000
+        self.max_sessions = max_sessions
+
+    def reap_at_ms(self, session: MissionSession) -> int:
+        return session.reap_at_ms(self.idle_timeout_ms, self.retention_ms)
+
+    def add(self, session: MissionSession) -> List[str]:
+        return self.add_many([session])
+
+    @abstractmethod
+    def add_many(self, sessions: List[MissionSession]) -> List[str]:
+        """Store new sessions in one step; return the ids evicted to stay under max_sessions."""
+
+    @abstractmethod
+    def get(self, session_id: str) -> MissionSession:
+        """Return the session and mark it as used; raise KeyError or SessionGone."""
+
+    @abstractmethod
+    def transaction(self, session_id: str) -> ContextManager[MissionSession]:
+        """Yield the session for an atomic read-modify-write; changes persist on exit."""
+
+    @abstractmethod
+    def reap_expired(self, now: Optional[datetime] = None) -> List[str]:
+        ...
+
+    @abstractmethod
+    def count(self) -> int:
+        ...
+
+    @abstractmethod
+    def scan(
+        self, query: SessionQuery, cursor: Optional[str], limit: int
+    ) -> Tuple[List[MissionSession], Optional[str]]:
+        """Return up to ``limit`` matching sessions in start order after ``cursor``, without
+        marking them as used, and the cursor to continue from; None once nothing is left.
+
+        Cursors are opaque strings from an earlier call; raise ValueError for others.
+        """
+
+    @abstractmethod
+    def cohort_sessions(self, cohort_id: str) -> List[MissionSession]:
+        """Return the cohort's sessions without marking them as used."""
+
+    @abstractmethod
+    def cohort_steps(self, cohort_id: str) -> Dict[Tuple[str, str, int], int]:
+        """Return the number of the cohort's sessions at each (mission id, mission version, step index)."""
+
+    def close(self) -> None:
+        pass
+
+
+class InMemorySessionBackend(SessionBackend):
+    def __init__(self, **kwargs: Any) -> None:
+        super().__init__(**kwargs)
+        # ordered oldest-used first so the LRU victim is always at the front
+        self._sessions: "OrderedDict[str, MissionSession]" = OrderedDict()
+        self._expiry_heap: List[Tuple[int, str]] = []
+        self._tombstones: "OrderedDict[str, str]" = OrderedDict()
+        # secondary indexes so cohort queries cost the cohort's size, not the store's
+        self._cohorts: Dict[str, Dict[str, MissionSession]] = {}
+        self._cohort_steps: Dict[str, Dict[Tuple[str, str, int], int]] = {}
+        # (started_ms, session_id) of every session in start order, for scans; like
+        # the expiry heap it keeps entries of removed sessions until compacted
+        self._start_order: List[Tuple[int, str]] = []
+        self._lock = threading.RLock()
+
+    def add_many(self, sessions: List[MissionSession]) -> List[str]:
+        evicted: List[str] = []
+        with self._lock:
+            for session in sessions:
+                self._sessions[session.session_id] = session
+                self._index(session)
+                # new sessions start last, so this is an append in practice
+                insort(self._start_order, (session.started_ms, session.session_id))
+                heapq.heappush(
+                    self._expiry_heap,
+                    (self.reap_at_ms(session), session.session_id),
+                )
+            while len(self._sessions) > self.max_sessions:
+                victim_id, victim = self._sessions.popitem(last=False)
+                self._unindex(victim)
+                self._bury(victim_id, "evicted")
+                evicted.append(victim_id)
+            self._compact_expiry_heap()
+            self._compact_start_order()
+        return evicted
+
+    def get(self, session_id: str) -> MissionSession:
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                reason = self._tombstones.get(session_id)
+                if reason is not None:
+                    raise SessionGone(session_id, reason)
+                raise KeyError("Session not found")
+
+            now = monotonic_ms()
+            if self.reap_at_ms(session) <= now:
+                del self._sessions[session_id]
+                self._unindex(session)
+                self._bury(session_id, "expired")
+                raise SessionGone(session_id, "expired")
+
+            session.last_active_ms = now
+            self._sessions.move_to_end(session_id)
+            return session
+
+    @contextmanager
+    def transaction(self, session_id: str) -> Iterator[MissionSession]:
+        with self._lock:
+            session = self.get(session_id)
+            step_index = session.step_index
+            try:
+                yield session
+            finally:
+                if session.step_index != step_index and session.cohort_id:
+                    self._move_step(session, step_index)
+
+    def reap_expired(self, now: Optional[datetime] = None) -> List[str]:
+        now_ms = datetime_to_monotonic_ms(now) if now else monotonic_ms()
+        reaped: List[str] = []
+        with self._lock:
+            heap = self._expiry_heap
+            while heap and heap[0][0] <= now_ms:
+                _, session_id = heapq.heappop(heap)
+                session = self._sessions.get(session_id)
+                if session is None:
+                    continue  # already evicted or reaped through get
+                deadline = self.reap_at_ms(session)
+                if deadline > now_ms:
+                    # touched since this entry was pushed; requeue at the new deadline
+                    heapq.heappush(heap, (deadline, session_id))
+                    continue
+                del self._sessions[session_id]
+                self._unindex(session)
+                self._bury(session_id, "expired")
+                reaped.append(session_id)
+        return reaped
+
+    def count(self) -> int:
+        return len(self._sessions)
+
+    def scan(
+        self, query: SessionQuery, cursor: Optional[str], limit: int
+    ) -> Tuple[List[MissionSession], Optional[str]]:
+        after: Optional[Tuple[int, str]] = None
+        if cursor is not None:
+            started, session_id = _split_cursor(cursor)
+            try:
+                after = (int(started), session_id)
+            except ValueError:
+                raise ValueError("Invalid cursor") from None
+        found: List[MissionSession] = []
+        with self._lock:
+            order = self._start_order
+            index = bisect_right(order, after) if after is not None else 0
+            if query.since_ms is not None:
+                index = max(index, bisect_left(order, (query.since_ms, "")))
+            end = len(order)
+            if query.until_ms is not None:
+                end = bisect_left(order, (query.until_ms, ""), index)
+            # bounded work per call under the lock, even when few sessions match
+            budget = max(limit * 16, 4096)
+            stop = min(end, index + budget)
+            while index < stop and len(found) < limit:
+                started_ms, session_id = order[index]
+                index += 1
+                session = self._sessions.get(session_id)
+                if session is not None and session.started_ms == started_ms and query.matches(session):
+                    found.append(session)
+            if index >= end:
+                return found, None
+            last_started, last_id = order[index - 1]
+            return found, f"{last_started}:{last_id}"
+
+    def cohort_sessions(self, cohort_id: str) -> List[MissionSession]:
+        with self._lock:
+            return list(self._cohorts.get(cohort_id, {}).values())
+
+    def cohort_steps(self, cohort_id: str) -> Dict[Tuple[str, str, int], int]:
+        with self._lock:
+            return dict(self._cohort_steps.get(cohort_id, {}))
+
+    @contextmanager
+    def frozen(self) -> Iterator[Tuple[Iterable[MissionSession], Iterable[Tuple[str, str]]]]:
+        # live views of every session (least recently used first) and tombstone;
+        # nothing changes until the block exits
+        with self._lock:
+            yield self._sessions.values(), self._tombstones.items()
+
+    def restore(self, sessions: Iterable[MissionSession], tombstones: Iterable[Tuple[str, str]]) -> None:
+        with self._lock:
+            for session_id, reason in tombstones:
+                self._bury(session_id, reason)
+            for session in sorted(sessions, key=lambda session: session.last_active_ms):
+                self._tombstones.pop(session.session_id, None)
+                previous = self._sessions.get(session.session_id)
+                if previous is not None:
+                    self._unindex(previous)
+                self._sessions[session.session_id] = session
+                self._index(session)
+            while len(self._sessions) > self.max_sessions:
+                victim_id, victim = self._sessions.popitem(last=False)
+                self._unindex(victim)
+                self._bury(victim_id, "evicted")
+            self._expiry_heap = [
+                (self.reap_at_ms(session), session_id)
+                for session_id, session in self._sessions.items()
+            ]
+            heapq.heapify(self._expiry_heap)
+            self._start_order = sorted(
+                (session.started_ms, session_id) for session_id, session in self._sessions.items()
+            )
+
+    def _index(self, session: MissionSession) -> None:
+        if not session.cohort_id:
+            return
+        self._cohorts.setdefault(session.cohort_id, {})[session.session_id] = session
+        steps = self._cohort_steps.setdefault(session.cohort_id, {})
+        key = (session.mission_id, session.mission_version, session.step_index)
+        steps[key] = steps.get(key, 0) + 1
+
+    def _unindex(self, session: MissionSession) -> None:
+        if not session.cohort_id:
+            return
+        members = self._cohorts[session.cohort_id]
+        del members[session.session_id]
+        if not members:
+            del self._cohorts[session.cohort_id]
+            del self._cohort_steps[session.cohort_id]
+            return
+        self._count_step(session.cohort_id, (session.mission_id, session.mission_version, session.step_index), -1)
+
+    def _move_step(self, session: MissionSession, previous_step: int) -> None:
+        self._count_step(session.cohort_id, (session.mission_id, session.mission_version, previous_step), -1)
+        self._count_step(session.cohort_id, (session.mission_id, session.mission_version, session.step_index), 1)
+
+    def _count_step(self, cohort_id: str, key: Tuple[str, str, int], delta: int) -> None:
+        steps = self._cohort_steps[cohort_id]
+        count = steps.get(key, 0) + delta
+        if count:
+            steps[key] = count
+        else:
+            del steps[key]
+
+    def _bury(self, session_id: str, reason: str) -> None:
+        self._tombstones[session_id] = reason
+        while len(self._tombstones) > self.max_sessions:
+            self._tombstones.popitem(last=False)
+
+    def _compact_expiry_heap(self) -> None:
+        # evictions leave stale heap entries behind; rebuild once they dominate
+        if len(self._expiry_heap) <= 2 * len(self._sessions) + 64:
+            return
+        self._expiry_heap = [
+            (self.reap_at_ms(session), session_id)
+            for session_id, session in self._sessions.items()
+        ]
+        heapq.heapify(self._expiry_heap)
+
+    def _compact_start_order(self) -> None:
+        if len(self._start_order) <= 2 * len(self._sessions) + 64:
+            return
+        self._start_order = sorted(
+            (session.started_ms, session_id) for session_id, session in self._sessions.items()
+        )
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    session_id TEXT PRIMARY KEY,
+    mission_id TEXT NOT NULL,
+    mission_version TEXT NOT NULL DEFAULT '',
+    step_index INTEGER NOT NULL,
+    mistakes INTEGER NOT NULL,
+    total_score INTEGER NOT NULL,
+    started_at REAL NOT NULL,
+    time_limit_seconds INTEGER NOT NULL,
+    history TEXT NOT NULL,
+    last_hint_index INTEGER,
+    last_active_at REAL NOT NULL,
+    reap_at REAL NOT NULL,
+    player_name TEXT NOT NULL DEFAULT '',
+    completed_at REAL,
+    host TEXT,
+    cohort_id TEXT NOT NULL DEFAULT '',
+    commands_dropped INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS sessions_reap_at ON sessions (reap_at);
+CREATE INDEX IF NOT EXISTS sessions_last_active_at ON sessions (last_active_at);
+CREATE TABLE IF NOT EXISTS session_tombstones (
+    session_id TEXT PRIMARY KEY,
+    reason TEXT NOT NULL,
+    buried_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS session_tombstones_buried_at ON session_tombstones (buried_at);
+"""
+
+_COLUMNS = (
+    "session_id, mission_id, mission_version, step_index, mistakes, total_score, started_at,"
+    " time_limit_seconds, history, last_hint_index, last_active_at, reap_at, player_name, completed_at, host,"
+    " cohort_id, commands_dropped"
+)
+
+# columns added after the first release, applied to existing databases on open
+_MIGRATIONS = (
+    "ALTER TABLE sessions ADD COLUMN mission_version TEXT NOT NULL DEFAULT ''",
+    "ALTER TABLE sessions ADD COLUMN player_name TEXT NOT NULL DEFAULT ''",
+    "ALTER TABLE sessions ADD COLUMN completed_at REAL",
+    "ALTER TABLE sessions ADD COLUMN host TEXT",
+    "ALTER TABLE sessions ADD COLUMN cohort_id TEXT NOT NULL DEFAULT ''",
+    "ALTER TABLE sessions ADD COLUMN commands_dropped INTEGER NOT NULL DEFAULT 0",
+)
+
+# indexes on migrated columns, created once the migrations ran; cohort queries
+# read the members of one cohort and count steps from the index alone
+_INDEXES = """
+CREATE INDEX IF NOT EXISTS sessions_cohort ON sessions (cohort_id, mission_id, step_index);
+CREATE INDEX IF NOT EXISTS sessions_started ON sessions (started_at, session_id);
+"""
+
+
+def _to_epoch(value: datetime) -> float:
+    return (value - _EPOCH).total_seconds()
+
+
+class SQLiteSessionBackend(SessionBackend):
+    """Sessions shared by every worker process on one host through a WAL-mode database.
+
+    Each thread gets its own connection. Writes run inside ``BEGIN IMMEDIATE`` so
+    concurrent read-modify-write cycles on a session are serialized by SQLite's
+    writer lock instead of an in-process lock.
+    """
+
+    blocking = True
+
+    def __init__(self, path: str, busy_timeout_ms: int = 5000, **kwargs: Any) -> None:
+        super().__init__(**kwargs)
+        self.path = path
+        self.busy_timeout_ms = busy_timeout_ms
+        self._local = threading.local()
+        conn = self.connection()
+        conn.executescript(_SCHEMA)
+        for statement in _MIGRATIONS:
+            try:
+                conn.execute(statement)
+            except sqlite3.OperationalError:
+                pass  # already applied
+        conn.executescript(_INDEXES)
+
+    def connection(self) -> sqlite3.Connection:
+        # one connection per thread; sqlite3 connections must not be shared
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, isolation_level=None, timeout=self.busy_timeout_ms / 1000)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(f"PRAGMA busy_timeout={int(self.busy_timeout_ms)}")
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def _write(self) -> Iterator[sqlite3.Connection]:
+        conn = self.connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException as exc:
+            if isinstance(exc, SessionGone):
+                # the session was buried while loading it; keep that decision
+                conn.execute("COMMIT")
+            else:
+                conn.execute("ROLLBACK")
+            raise
+        else:
+            conn.execute("COMMIT")
+
+    def add_many(self, sessions: List[MissionSession]) -> List[str]:
+        evicted: List[str] = []
+        with self._write() as conn:
+            conn.executemany(
+                f"INSERT INTO sessions ({_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [self._to_row(session) for session in sessions],
+            )
+            (total,) = conn.execute("SELECT COUNT(*) FROM sessions").fetchone()
+            overflow = total - self.max_sessions
+            if overflow > 0:
+                victims = conn.execute(
+                    "SELECT session_id FROM sessions ORDER BY last_active_at LIMIT ?",
+                    (overflow,),
+                ).fetchall()
+                evicted = [victim for (victim,) in victims]
+                self._bury(conn, evicted, "evicted")
+        return evicted
+
+    def get(self, session_id: str) -> MissionSession:
+        with self.transaction(session_id) as session:
+            return session
+
+    @contextmanager
+    def transaction(self, session_id: str) -> Iterator[MissionSession]:
+        with self._write() as conn:
+            row = conn.execute(
+                f"SELECT {_COLUMNS} FROM sessions WHERE session_id = ?", (session_id,)
+            ).fetchone()
+            if row is None:
+                tombstone = conn.execute(
+                    "SELECT reason FROM session_tombstones WHERE session_id = ?", (session_id,)
+                ).fetchone()
+                if tombstone is not None:
+                    raise SessionGone(session_id, tombstone[0])
+                raise KeyError("Session not found")
+
+            session = self._from_row(row)
+            now = monotonic_ms()
+            if self.reap_at_ms(session) <= now:
+                self._bury(conn, [session_id], "expired")
+                raise SessionGone(session_id, "expired")
+
+            session.last_active_ms = now
+            yield session
+            conn.execute(
+                "UPDATE sessions SET step_index = ?, mistakes = ?, total_score = ?, history = ?,"
+                " last_hint_index = ?, last_active_at = ?, reap_at = ?, completed_at = ?, host = ?,"
+                " commands_dropped = ? WHERE session_id = ?",
+                (
+                    session.step_index,
+                    session.mistakes,
+                    session.total_score,
+                    json.dumps(session.history),
+                    session.last_hint_index,
+                    monotonic_ms_to_epoch(session.last_active_ms),
+                    monotonic_ms_to_epoch(self.reap_at_ms(session)),
+                    monotonic_ms_to_epoch(session.completed_ms) if session.completed_ms else None,
+                    _host_to_text(session.host),
+                    session.commands_dropped,
+                    session_id,
+                ),
+            )
+
+    def reap_expired(self, now: Optional[datetime] = None) -> List[str]:
+        now = now or datetime.utcnow()
+        with self._write() as conn:
+            rows = conn.execute(
+                "SELECT session_id FROM sessions WHERE reap_at <= ?", (_to_epoch(now),)
+            ).fetchall()
+            expired = [session_id for (session_id,) in rows]
+            self._bury(conn, expired, "expired")
+        return expired
+
+    def count(self) -> int:
+        (total,) = self.connection().execute("SELECT COUNT(*) FROM sessions").fetchone()
+        return total
+
+    def scan(
+        self, query: SessionQuery, cursor: Optional[str], limit: int
+    ) -> Tuple[List[MissionSession], Optional[str]]:
+        clauses: List[str] = []
+        params: List[Any] = []
+        if cursor is not None:
+            started, session_id = _split_cursor(cursor)
+            try:
+                params.extend((float(started), session_id))
+            except ValueError:
+                raise ValueError("Invalid cursor") from None
+            clauses.append("(started_at, session_id) > (?, ?)")
+        if query.mission_id is not None:
+            clauses.append("mission_id = ?")
+            params.append(query.mission_id)
+        if query.completed is not None:
+            clauses.append("completed_at IS NOT NULL" if query.completed else "completed_at IS NULL")
+        if query.since_ms is not None:
+            clauses.append("started_at >= ?")
+            params.append(monotonic_ms_to_epoch(query.since_ms))
+        if query.until_ms is not None:
+            clauses.append("started_at < ?")
+            params.append(monotonic_ms_to_epoch(query.until_ms))
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        rows = self.connection().execute(
+            f"SELECT {_COLUMNS} FROM sessions {where} ORDER BY started_at, session_id LIMIT ?",
+            (*params, limit + 1),
+        ).fetchall()
+        if len(rows) <= limit:
+            return [self._from_row(row) for row in rows], None
+        rows = rows[:limit]
+        # the stored start time itself, so the next page resumes exactly after this row
+        return [self._from_row(row) for row in rows], f"{rows[-1][6]!r}:{rows[-1][0]}"
+
+    def cohort_sessions(self, cohort_id: str) -> List[MissionSession]:
+        rows = self.connection().execute(
+            f"SELECT {_COLUMNS} FROM sessions WHERE cohort_id = ?", (cohort_id,)
+        ).fetchall()
+        return [self._from_row(row) for row in rows]
+
+    def cohort_steps(self, cohort_id: str) -> Dict[Tuple[str, str, int], int]:
+        rows = self.connection().execute(
+            "SELECT mission_id, mission_version, step_index, COUNT(*) FROM sessions WHERE cohort_id = ?"
+            " GROUP BY mission_id, mission_version, step_index",
+            (cohort_id,),
+        ).fetchall()
+        return {(mission_id, version, step_index): count for mission_id, version, step_index, count in rows}
+
+    def close(self) -> None:
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    def _bury(self, conn: sqlite3.Connection, session_ids: List[str], reason: str) -> None:
+        if not session_ids:
+            return
+        buried_at = _to_epoch(datetime.utcnow())
+        conn.executemany("DELETE FROM sessions WHERE session_id = ?", [(sid,) for sid in session_ids])
+        conn.executemany(
+            "INSERT OR REPLACE INTO session_tombstones (session_id, reason, buried_at) VALUES (?, ?, ?)",
+            [(sid, reason, buried_at) for sid in session_ids],
+        )
+        conn.execute(
+            "DELETE FROM session_tombstones WHERE session_id IN ("
+            " SELECT session_id FROM session_tombstones ORDER BY buried_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_sessions,),
+        )
+
+    def _to_row(self, session: MissionSession) -> Tuple[Any, ...]:
+        return (
+            session.session_id,
+            session.mission_id,
+            session.mission_version,
+            session.step_index,
+            session.mistakes,
+            session.total_score,
+            monotonic_ms_to_epoch(session.started_ms),
+            session.time_limit_seconds,
+            json.dumps(session.history),
+            session.last_hint_index,
+            monotonic_ms_to_epoch(session.last_active_ms),
+            monotonic_ms_to_epoch(self.reap_at_ms(session)),
+            session.player_name,
+            monotonic_ms_to_epoch(session.completed_ms) if session.completed_ms else None,
+            _host_to_text(session.host),
+            session.cohort_id,
+            session.commands_dropped,
+        )
+
+    def _from_row(self, row: Tuple[Any, ...]) -> MissionSession:
+        session = MissionSession(
+            session_id=row[0],
+            mission_id=row[1],
+            mission_version=row[2],
+            step_index=row[3],
+            mistakes=row[4],
+            total_score=row[5],
+            started_ms=epoch_to_monotonic_ms(row[6]),
+            time_limit_seconds=row[7],
+            last_active_ms=epoch_to_monotonic_ms(row[10]),
+            player_name=row[12],
+            completed_ms=epoch_to_monotonic_ms(row[13]) if row[13] is not None else 0,
+            host=HostOverlay.from_dict(json.loads(row[14])) if row[14] else None,
+            cohort_id=row[15],
+            commands_dropped=row[16],
+        )
+        session.last_hint_index = row[9]
+        history = json.loads(row[8])
+        # a history limit lowered since the row was written drops the oldest commands
+        kept = history[-self.history_limit :] if self.history_limit else []
+        session.recent_commands = tuple(kept)
+        session.commands_dropped += len(history) - len(kept)
+        return session
+
+
+def _host_to_text(host: Optional[HostOverlay]) -> Optional[str]:
+    return json.dumps(host.to_dict()) if host is not None else None
+
+
+def build_session_backend(settings: Settings) -> SessionBackend:
+    options = dict(
+        idle_timeout_seconds=settings.session_timeout_seconds,
+        retention_seconds=settings.session_retention_seconds,
+        max_sessions=settings.max_sessions,
+        history_limit=settings.session_history_limit,
+    )
+    if settings.session_backend == "sqlite":
+        return SQLiteSessionBackend(settings.session_db_path, **options)
+    return InMemorySessionBackend(**options)
@@ -0,0 +1,589 @@
+from __future__ import annotations
+
+import asyncio
+import base64
+import bisect
+import hashlib
+import itertools
+import json
+import logging
+import uuid
+from collections import deque
+from datetime import datetime
+from typing import Any, AsyncIterator, Deque, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+from .config import Settings, get_settings
+from .schemas import MAX_TRANSCRIPT_PAGE
+
+try:  # WebSocket sessions are proxied only when this is installed (uvicorn[standard] brings it)
+    from websockets.asyncio.client import connect as websocket_connect
+    from websockets.exceptions import ConnectionClosed, WebSocketException
+except ImportError:  # pragma: no cover - depends on the environment
+    websocket_connect = None
+
+logger = logging.getLogger(__name__)
+
+# "<shard>.<uuid4>"; uuids never contain a dot, so the first one ends the tag
+SHARD_SEPARATOR = "."
+
+# methods a shard may safely see twice, so a request on a stale pooled connection can be resent
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+
+# /missions/{mission_id}/<report> routes built from one process's sessions; a
+# single shard's answer would silently leave out every other shard
+PER_SHARD_REPORTS = frozenset({"leaderboard", "analytics"})
+
+# connection-level headers that must not be forwarded across a proxy
+HOP_BY_HOP = frozenset(
+    {
+        b"connection",
+        b"keep-alive",
+        b"proxy-authenticate",
+        b"proxy-authorization",
+        b"te",
+        b"trailer",
+        b"transfer-encoding",
+        b"upgrade",
+    }
+)
+
+
+def new_session_id(shard_id: str = "") -> str:
+    session_id = str(uuid.uuid4())
+    return f"{shard_id}{SHARD_SEPARATOR}{session_id}" if shard_id else session_id
+
+
+def shard_of(session_id: str) -> Optional[str]:
+    tag, separator, _ = session_id.partition(SHARD_SEPARATOR)
+    return tag if separator else None
+
+
+def parse_backends(value: str) -> Dict[str, str]:
+    """``"s0=http://127.0.0.1:8001,s1=http://127.0.0.1:8002"`` -> shard name to base URL."""
+    backends: Dict[str, str] = {}
+    for part in filter(None, (part.strip() for part in value.split(","))):
+        name, separator, url = part.partition("=")
+        if not separator or not name or SHARD_SEPARATOR in name or not url.startswith("http://"):
+            raise ValueError(f"expected name=http://host:port, got {part!r}")
+        backends[name] = url.rstrip("/")
+    return backends
+
+
+class HashRing:
+    """Consistent hashing of keys onto named nodes.
+
+    Each node owns ``replicas`` points on the ring, so adding or removing one
+    moves only the keys between its points and their predecessors.
+    """
+
+    def __init__(self, nodes: Iterable[str], replicas: int = 128) -> None:
+        points = sorted(
+            (self._hash(f"{node}#{replica}"), node) for node in nodes for replica in range(replicas)
+        )
+        if not points:
+            raise ValueError("a hash ring needs at least one node")
+        self._hashes = [point for point, _ in points]
+        self._nodes = [node for _, node in points]
+
+    @staticmethod
+    def _hash(key: str) -> int:
+        return int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "big")
+
+    def node_for(self, key: str) -> str:
+        index = bisect.bisect(self._hashes, self._hash(key))
+        return self._nodes[index % len(self._nodes)]
+
+
+class BackendUnavailable(Exception):
+    pass
+
+
+class _Connection:
+    __slots__ = ("reader", "writer", "reused")
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.reader = reader
+        self.writer = writer
+        self.reused = False
+
+    def close(self) -> None:
+        self.writer.close()
+
+
+class BackendPool:
+    """Keep-alive HTTP/1.1 connections to one shard, reused across requests."""
+
+    def __init__(self, name: str, url: str, max_idle: int = 64) -> None:
+        parts = urlsplit(url)
+        self.name = name
+        self.url = url
+        self.host = parts.hostname or "127.0.0.1"
+        self.port = parts.port or 80
+        self.max_idle = max_idle
+        self._idle: Deque[_Connection] = deque()
+        self.opened = 0
+
+    async def _acquire(self) -> _Connection:
+        while self._idle:
+            connection = self._idle.pop()
+            if not connection.reader.at_eof():
+                connection.reused = True
+                return connection
+            connection.close()
+        try:
+            reader, writer = await asyncio.open_connection(self.host, self.port)
+        except OSError as exc:
+            raise BackendUnavailable(self.name) from exc
+        self.opened += 1
+        return _Connection(reader, writer)
+
+    def _release(self, connection: _Connection) -> None:
+        if len(self._idle) < self.max_idle:
+            self._idle.append(connection)
+        else:
+            connection.close()
+
+    async def request(
+        self, method: str, target: str, headers: List[Tuple[bytes, bytes]], body: bytes
+    ) -> Tuple[int, List[Tuple[bytes, bytes]], AsyncIterator[bytes]]:
+        """Send one request; return the status, headers and an iterator over the body.
+
+        The connection goes back to the pool once the body has been read to the
+        end. A pooled connection the shard closed while idle is retried once on a
+        fresh one, but only for requests that are safe to apply twice: the shard
+        may have received and evaluated the first attempt before the connection
+        failed. Other requests are retried only if they carry an ``Idempotency-Key``.
+        """
+        head = [f"{method} {target} HTTP/1.1\r\nhost: {self.host}:{self.port}\r\n".encode("latin-1")]
+        for name, value in headers:
+            head.append(name + b": " + value + b"\r\n")
+        head.append(b"content-length: " + str(len(body)).encode() + b"\r\n\r\n")
+        payload = b"".join(head) + body
+        retry = method in IDEMPOTENT_METHODS or any(name == b"idempotency-key" for name, _ in headers)
+        for _ in range(2):
+            connection = await self._acquire()
+            try:
+                connection.writer.write(payload)
+                await connection.writer.drain()
+                status, response_headers = await _read_head(connection.reader)
+            except (OSError, asyncio.IncompleteReadError) as exc:
+                connection.close()
+                if connection.reused and retry:
+                    continue
+                raise BackendUnavailable(self.name) from exc
+            return status, response_headers, self._body(connection, method, status, response_headers)
+        raise BackendUnavailable(self.name)
+
+    async def _body(
+        self, connection: _Connection, method: str, status: int, headers: List[Tuple[bytes, bytes]]
+    ) -> AsyncIterator[bytes]:
+        reader = connection.reader
+        length: Optional[int] = None
+        chunked = False
+        keep_alive = True
+        for name, value in headers:
+            if name == b"content-length":
+                length = int(value)
+            elif name == b"transfer-encoding":
+                chunked = b"chunked" in value.lower()
+            elif name == b"connection":
+                keep_alive = b"close" not in value.lower()
+        done = False
+        try:
+            if method == "HEAD" or status in (204, 304) or 100 <= status < 200:
+                pass
+            elif chunked:
+                while True:
+                    size = int((await reader.readuntil(b"\r\n")).split(b";", 1)[0], 16)
+                    if size == 0:
+                        # trailers, if any, end with an empty line
+                        while await reader.readuntil(b"\r\n") != b"\r\n":
+                            pass
+                        break
+                    chunk = await reader.readexactly(size + 2)
+                    yield chunk[:-2]
+            elif length is not None:
+                if length:
+                    yield await reader.readexactly(length)
+            else:
+                keep_alive = False
+                while chunk := await reader.read(65536):
+                    yield chunk
+            done = True
+        finally:
+            # a body abandoned halfway leaves the connection unusable
+            if done and keep_alive:
+                self._release(connection)
+            else:
+                connection.close()
+
+    def close(self) -> None:
+        while self._idle:
+            self._idle.pop().close()
+
+
+async def _read_head(reader: asyncio.StreamReader) -> Tuple[int, List[Tuple[bytes, bytes]]]:
+    raw = await reader.readuntil(b"\r\n\r\n")
+    lines = raw[:-4].split(b"\r\n")
+    status = int(lines[0].split(b" ", 2)[1])
+    headers = []
+    for line in lines[1:]:
+        name, _, value = line.partition(b":")
+        headers.append((name.strip().lower(), value.strip()))
+    return status, headers
+
+
+class ShardRouter:
+    """ASGI front end forwarding API requests to the shard that owns them.
+
+    Session ids minted by a shard start with its name, so requests for a
+    session go straight to that shard. Cohorts and mission-level routes are
+    placed by consistent hashing of the cohort or mission id, and a start
+    request carrying a ``cohort_id`` lands on the cohort's shard so its report
+    sees every member. Other starts and catalog reads rotate across shards.
+    Leaderboards and analytics only cover one process's sessions, so with more
+    than one shard the router refuses them rather than answer for a single shard.
+    Transcripts are read from every shard: pages are merged in start order
+    under a cursor holding each shard's position, and the export streams the
+    shards one after another.
+    """
+
+    def __init__(self, backends: Dict[str, str], prefix: str = "/api", max_idle: int = 64) -> None:
+        if not backends:
+            raise ValueError("the shard router needs at least one backend")
+        self.prefix = prefix.rstrip("/")
+        self.pools = {name: BackendPool(name, url, max_idle) for name, url in backends.items()}
+        self.ring = HashRing(self.pools)
+        self._rotation = itertools.cycle(list(self.pools))
+
+    def _parts(self, path: str) -> List[str]:
+        return path[len(self.prefix) :].split("/") if path.startswith(self.prefix) else []
+
+    def per_shard_report(self, path: str) -> bool:
+        parts = self._parts(path)
+        return len(self.pools) > 1 and len(parts) >= 4 and parts[1] == "missions" and parts[3] in PER_SHARD_REPORTS
+
+    def shard_for(self, path: str, body: bytes = b"") -> str:
+        parts = self._parts(path)
+        if len(parts) >= 3 and parts[1] == "missions":
+            key = parts[2]
+            if key == "start":
+                cohort_id = _cohort_of(body)
+                return self.ring.node_for(f"cohort:{cohort_id}") if cohort_id else next(self._rotation)
+            shard = shard_of(key)
+            if shard in self.pools:
+                return shard
+            # untagged session ids (minted before sharding) and mission ids
+            return self.ring.node_for(key)
+        if len(parts) >= 3 and parts[1] == "cohorts":
+            return self.ring.node_for(f"cohort:{parts[2]}")
+        return next(self._rotation)
+
+    async def __call__(self, scope: Dict[str, Any], receive: Any, send: Any) -> None:
+        if scope["type"] == "http":
+            await self._http(scope, receive, send)
+        elif scope["type"] == "websocket":
+            await self._websocket(scope, receive, send)
+        elif scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+
+    async def _http(self, scope: Dict[str, Any], receive: Any, send: Any) -> None:
+        chunks = []
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                return
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body", False):
+                break
+        body = b"".join(chunks)
+        if self.per_shard_report(scope["path"]):
+            detail = "Leaderboards and analytics are kept per shard; query a shard directly"
+            await _send_json(send, 501, {"detail": detail})
+            return
+        parts = self._parts(scope["path"])
+        if len(self.pools) > 1 and scope["method"] == "GET" and parts[1:2] == ["transcripts"]:
+            if parts[2:] == []:
+                await self._transcripts(scope, send)
+                return
+            if parts[2:] == ["export"]:
+                await self._watch(self._export(scope, send), receive)
+                return
+        pool = self.pools[self.shard_for(scope["path"], body)]
+        try:
+            status, headers, content = await pool.request(
+                scope["method"], _target(scope), _forwarded_headers(scope), body
+            )
+        except BackendUnavailable:
+            logger.warning("Shard %s unavailable for %s %s", pool.name, scope["method"], scope["path"])
+            await _send_json(send, 502, {"detail": "Shard unavailable"})
+            return
+        relay = _relay(send, status, headers, content)
+        if any(name == b"content-length" for name, _ in headers):
+            await relay
+            return
+        # event streams only end when the client leaves
+        await self._watch(relay, receive)
+
+    async def _watch(self, relay: Any, receive: Any) -> None:
+        """Run a streamed response until it ends or the client disconnects."""
+        relaying = asyncio.ensure_future(relay)
+        disconnected = asyncio.ensure_future(_disconnected(receive))
+        await asyncio.wait({relaying, disconnected}, return_when=asyncio.FIRST_COMPLETED)
+        disconnected.cancel()
+        relaying.cancel()
+        await asyncio.gather(relaying, disconnected, return_exceptions=True)
+
+    async def _transcripts(self, scope: Dict[str, Any], send: Any) -> None:
+        params = parse_qsl(scope.get("query_string", b"").decode("latin-1"), keep_blank_values=True)
+        given = dict(params)
+        try:
+            limit = int(given.get("limit", "100"))
+            walk = _decode_walk(given.get("cursor"), self.pools)
+        except ValueError:
+            await _send_json(send, 400, {"detail": "Invalid cursor"})
+            return
+        if not 1 <= limit <= MAX_TRANSCRIPT_PAGE:
+            await _send_json(send, 422, {"detail": f"limit must be between 1 and {MAX_TRANSCRIPT_PAGE}"})
+            return
+        filters = [(name, value) for name, value in params if name not in ("cursor", "limit")]
+        headers = [(name, value) for name, value in _forwarded_headers(scope) if name != b"accept-encoding"]
+
+        async def fetch(name: str, cursor: Optional[str], skip: int) -> Tuple[int, Any]:
+            # ask for what was already consumed of the page again, plus a full page after it
+            query = filters + [("limit", str(min(MAX_TRANSCRIPT_PAGE, skip + limit)))]
+            if cursor is not None:
+                query.append(("cursor", cursor))
+            status, _, content = await self.pools[name].request(
+                "GET", scope["path"] + "?" + urlencode(query), headers, b""
+            )
+            body = b"".join([chunk async for chunk in content])
+            return status, json.loads(body)
+
+        names = list(walk)
+        try:
+            replies = await asyncio.gather(*(fetch(name, *walk[name]) for name in names))
+        except (BackendUnavailable, ValueError):
+            await _send_json(send, 502, {"detail": "Shard unavailable"})
+            return
+        for status, payload in replies:
+            if status != 200:
+                await _send_json(send, status, payload)
+                return
+
+        pages = {
+            name: (walk[name][1], payload["transcripts"], payload["next_cursor"])
+            for name, (_, payload) in zip(names, replies)
+        }
+        positions = {name: skip for name, (skip, _, _) in pages.items()}
+        merged: List[Any] = []
+        while len(merged) < limit:
+            best: Optional[Tuple[Tuple[datetime, str], str]] = None
+            for name, (_, entries, next_cursor) in pages.items():
+                position = positions[name]
+                if position == len(entries):
+                    if next_cursor is not None:
+                        # this shard may hold earlier transcripts than the others' next ones
+                        best = None
+                        break
+                    continue
+                entry = entries[position]
+                key = (datetime.fromisoformat(entry["started_at"]), entry["session_id"])
+                if best is None or key < best[0]:
+                    best = (key, name)
+            if best is None:
+                break
+            merged.append(pages[best[1]][1][positions[best[1]]])
+            positions[best[1]] += 1
+
+        next_walk: Dict[str, Tuple[Optional[str], int]] = {}
+        for name, (_, entries, next_cursor) in pages.items():
+            if positions[name] < len(entries):
+                next_walk[name] = (walk[name][0], positions[name])
+            elif next_cursor is not None:
+                next_walk[name] = (next_cursor, 0)
+        await _send_json(
+            send, 200, {"transcripts": merged, "next_cursor": _encode_walk(next_walk) if next_walk else None}
+        )
+
+    async def _export(self, scope: Dict[str, Any], send: Any) -> None:
+        headers = [(name, value) for name, value in _forwarded_headers(scope) if name != b"accept-encoding"]
+        started = False
+        for pool in self.pools.values():
+            try:
+                status, response_headers, content = await pool.request("GET", _target(scope), headers, b"")
+            except BackendUnavailable:
+                status, response_headers, content = 502, [], None
+            if status != 200 and started:
+                # the 200 is already sent; ending without the final chunk marks the export incomplete
+                logger.warning("Shard %s failed during a transcript export", pool.name)
+                if content is not None:
+                    await content.aclose()
+                return
+            if content is None:
+                await _send_json(send, 502, {"detail": "Shard unavailable"})
+                return
+            if status != 200:
+                await _relay(send, status, response_headers, content)
+                return
+            try:
+                if not started:
+                    kept = [(name, value) for name, value in response_headers if name not in HOP_BY_HOP]
+                    await send({"type": "http.response.start", "status": 200, "headers": kept})
+                    started = True
+                async for chunk in content:
+                    await send({"type": "http.response.body", "body": chunk, "more_body": True})
+            finally:
+                await content.aclose()
+        await send({"type": "http.response.body", "body": b""})
+
+    async def _websocket(self, scope: Dict[str, Any], receive: Any, send: Any) -> None:
+        await receive()  # websocket.connect
+        pool = self.pools[self.shard_for(scope["path"])]
+        if websocket_connect is None:
+            await send({"type": "websocket.close", "code": 1011})
+            return
+        try:
+            upstream = await websocket_connect("ws" + pool.url[len("http") :] + _target(scope))
+        except (OSError, WebSocketException):
+            await send({"type": "websocket.close", "code": 1011})
+            return
+        await send({"type": "websocket.accept"})
+
+        async def downstream() -> None:
+            try:
+                async for message in upstream:
+                    key = "text" if isinstance(message, str) else "bytes"
+                    await send({"type": "websocket.send", key: message})
+            except ConnectionClosed:
+                pass
+            await send({"type": "websocket.close", "code": upstream.close_code or 1000})
+
+        relay = asyncio.ensure_future(downstream())
+        try:
+            while True:
+                message = await receive()
+                if message["type"] == "websocket.disconnect":
+                    break
+                await upstream.send(message["text"] if message.get("text") is not None else message["bytes"])
+        except ConnectionClosed:
+            pass
+        finally:
+            await upstream.close()
+            await asyncio.gather(relay, return_exceptions=True)
+
+    async def _lifespan(self, receive: Any, send: Any) -> None:
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                for pool in self.pools.values():
+                    pool.close()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+
+async def _relay(
+    send: Any, status: int, headers: List[Tuple[bytes, bytes]], content: AsyncIterator[bytes]
+) -> None:
+    try:
+        await send(
+            {
+                "type": "http.response.start",
+                "status": status,
+                "headers": [(name, value) for name, value in headers if name not in HOP_BY_HOP],
+            }
+        )
+        async for chunk in content:
+            await send({"type": "http.response.body", "body": chunk, "more_body": True})
+        await send({"type": "http.response.body", "body": b""})
+    finally:
+        # a body left unread closes its shard connection instead of returning it to the pool
+        await content.aclose()
+
+
+async def _disconnected(receive: Any) -> None:
+    while (await receive())["type"] != "http.disconnect":
+        pass
+
+
+def _encode_walk(walk: Dict[str, Tuple[Optional[str], int]]) -> str:
+    raw = json.dumps({name: list(position) for name, position in walk.items()}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def _decode_walk(cursor: Optional[str], shards: Iterable[str]) -> Dict[str, Tuple[Optional[str], int]]:
+    """Each shard still to read -> (its own cursor, transcripts already sent from that page)."""
+    if cursor is None:
+        return {name: (None, 0) for name in shards}
+    walk = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    if not isinstance(walk, dict) or not walk or not set(walk) <= set(shards):
+        raise ValueError("Invalid cursor")
+    decoded: Dict[str, Tuple[Optional[str], int]] = {}
+    for name, position in walk.items():
+        if not isinstance(position, list) or len(position) != 2:
+            raise ValueError("Invalid cursor")
+        shard_cursor, skip = position
+        if not (shard_cursor is None or isinstance(shard_cursor, str)) or not isinstance(skip, int):
+            raise ValueError("Invalid cursor")
+        if not 0 <= skip < MAX_TRANSCRIPT_PAGE:
+            raise ValueError("Invalid cursor")
+        decoded[name] = (shard_cursor, skip)
+    return decoded
+
+
+def _cohort_of(body: bytes) -> Optional[str]:
+    try:
+        payload = json.loads(body)
+    except ValueError:
+        return None
+    cohort_id = payload.get("cohort_id") if isinstance(payload, dict) else None
+    return cohort_id if isinstance(cohort_id, str) and cohort_id else None
+
+
+def _target(scope: Dict[str, Any]) -> str:
+    path = scope.get("raw_path") or scope["path"].encode("utf-8")
+    query = scope.get("query_string", b"")
+    return (path + b"?" + query if query else path).decode("latin-1")
+
+
+def _forwarded_headers(scope: Dict[str, Any]) -> List[Tuple[bytes, bytes]]:
+    headers = []
+    forwarded_for = b""
+    for name, value in scope["headers"]:
+        if name in HOP_BY_HOP or name in (b"host", b"content-length"):
+            continue
+        if name == b"x-forwarded-for":
+            forwarded_for = value + b", "
+            continue
+        headers.append((name, value))
+    # shards see the real client, so per-client rate limits keep working
+    client = scope.get("client")
+    if client:
+        headers.append((b"x-forwarded-for", forwarded_for + client[0].encode("latin-1")))
+    headers.append((b"x-forwarded-proto", scope.get("scheme", "http").encode("latin-1")))
+    return headers
+
+
+async def _send_json(send: Any, status: int, content: Dict[str, Any]) -> None:
+    body = json.dumps(content).encode()
+    await send(
+        {
+            "type": "http.response.start",
+            "status": status,
+            "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+        }
+    )
+    await send({"type": "http.response.body", "body": body})
+
+
+def create_router(settings: Optional[Settings] = None) -> ShardRouter:
+    """App factory: ``uvicorn app.sharding:create_router --factory``."""
+    settings = settings or get_settings()
+    return ShardRouter(
+        parse_backends(settings.shard_backends),
+        prefix=settings.api_prefix,
+        max_idle=settings.shard_pool_size,
+    )
@@ -0,0 +1,109 @@
+"""Minimal in-process ASGI client for benchmarks.
+
+Calls the application directly on the running event loop, so many requests can
+be in flight at once without sockets, threads or an HTTP client library.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+
+@dataclass
+class ASGIResponse:
+    status: int
+    headers: Dict[str, str] = field(default_factory=dict)
+    body: bytes = b""
+
+    def json(self) -> Any:
+        return json.loads(self.body)
+
+
+class ASGIClient:
+    def __init__(self, app: Any) -> None:
+        self.app = app
+        self._lifespan: Optional[asyncio.Task] = None
+        self._lifespan_events: "asyncio.Queue[Dict[str, Any]]" = asyncio.Queue()
+        self._lifespan_replies: "asyncio.Queue[Dict[str, Any]]" = asyncio.Queue()
+
+    async def __aenter__(self) -> "ASGIClient":
+        scope = {"type": "lifespan", "asgi": {"version": "3.0"}, "state": {}}
+        self._lifespan = asyncio.create_task(
+            self.app(scope, self._lifespan_events.get, self._lifespan_replies.put)
+        )
+        await self._lifespan_step("lifespan.startup")
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        await self._lifespan_step("lifespan.shutdown")
+        await self._lifespan
+
+    async def _lifespan_step(self, kind: str) -> None:
+        await self._lifespan_events.put({"type": kind})
+        reply = await self._lifespan_replies.get()
+        if reply["type"] != f"{kind}.complete":
+            raise RuntimeError(f"{kind} failed: {reply.get('message')}")
+
+    async def request(
+        self,
+        method: str,
+        path: str,
+        json_body: Any = None,
+        headers: Optional[Dict[str, str]] = None,
+    ) -> ASGIResponse:
+        body = b"" if json_body is None else json.dumps(json_body).encode()
+        raw_headers: List[Tuple[bytes, bytes]] = [(b"host", b"testserver")]
+        if json_body is not None:
+            raw_headers.append((b"content-type", b"application/json"))
+            raw_headers.append((b"content-length", str(len(body)).encode()))
+        for name, value in (headers or {}).items():
+            raw_headers.append((name.lower().encode(), value.encode()))
+        path, _, query = path.partition("?")
+        scope = {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": method,
+            "scheme": "http",
+            "path": path,
+            "raw_path": path.encode(),
+            "query_string": query.encode(),
+            "root_path": "",
+            "headers": raw_headers,
+            "client": ("127.0.0.1", 50000),
+            "server": ("testserver", 80),
+        }
+        sent = False
+
+        async def receive() -> Dict[str, Any]:
+            nonlocal sent
+            if sent:
+                # only reached by streaming responses waiting for a disconnect
+                await asyncio.Event().wait()
+            sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+
+        response = ASGIResponse(status=0)
+        chunks: List[bytes] = []
+
+        async def send(message: Dict[str, Any]) -> None:
+            if message["type"] == "http.response.start":
+                response.status = message["status"]
+                response.headers = {
+                    name.decode().lower(): value.decode() for name, value in message.get("headers", [])
+                }
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+
+        await self.app(scope, receive, send)
+        response.body = b"".join(chunks)
+        return response
+
+    async def get(self, path: str, **kwargs: Any) -> ASGIResponse:
+        return await self.request("GET", path, **kwargs)
+
+    async def post(self, path: str, json_body: Any = None, **kwargs: Any) -> ASGIResponse:
+        return await self.request("POST", path, json_body=json_body, **kwargs)
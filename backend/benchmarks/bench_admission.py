@@ -0,0 +1,112 @@
+"""Per-request cost and memory of the admission control layer.
+
+Times ``TokenBuckets.take`` on its own, then a trivial ASGI app with and
+without ``AdmissionMiddleware`` for a GET (concurrency accounting only) and
+for a command POST (client and session buckets too), spread over
+``--sessions`` session ids. Also reports memory per tracked key and the cost
+of sweeping idle keys. Run from ``backend/``::
+
+    python -m benchmarks.bench_admission --requests 200000 --sessions 10000
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List
+
+from app.admission import AdmissionMiddleware, TokenBuckets
+
+
+async def endpoint(scope: Dict[str, Any], receive: Any, send: Any) -> None:
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"{}"})
+
+
+async def per_request_us(app: Callable[..., Any], scopes: List[Dict[str, Any]], requests: int) -> float:
+    async def send(message: Dict[str, Any]) -> None:
+        return None
+
+    started = time.perf_counter()
+    for index in range(requests):
+        await app(dict(scopes[index % len(scopes)]), None, send)
+    return (time.perf_counter() - started) / requests * 1e6
+
+
+def per_call_us(func: Callable[[int], object], calls: int) -> float:
+    started = time.perf_counter()
+    for index in range(calls):
+        func(index)
+    return (time.perf_counter() - started) / calls * 1e6
+
+
+def build(sessions: int) -> AdmissionMiddleware:
+    # limits high enough that nothing is refused: this measures the bookkeeping
+    return AdmissionMiddleware(
+        endpoint,
+        "/api",
+        clients=TokenBuckets(rate=1e9, burst=1_000_000),
+        sessions=TokenBuckets(rate=1e9, burst=1_000_000, max_keys=sessions * 2),
+        max_concurrent=512,
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200_000)
+    parser.add_argument("--sessions", type=int, default=10_000)
+    parser.add_argument("--keys", type=int, default=100_000, help="keys tracked for the memory figure")
+    parser.add_argument("--repeat", type=int, default=5, help="best of this many runs")
+    args = parser.parse_args()
+
+    get_scopes = [{"type": "http", "method": "GET", "path": "/api/missions", "client": ("10.0.0.1", 1)}]
+    post_scopes = [
+        {
+            "type": "http",
+            "method": "POST",
+            "path": f"/api/missions/s{index:032d}/command",
+            "client": (f"10.0.{index // 256 % 256}.{index % 256}", 1),
+        }
+        for index in range(args.sessions)
+    ]
+
+    buckets = TokenBuckets(rate=1e9, burst=1_000_000, max_keys=args.sessions * 2)
+    keys = [scope["path"] for scope in post_scopes]
+    take_us = min(
+        per_call_us(lambda index: buckets.take(keys[index % len(keys)]), args.requests)
+        for _ in range(args.repeat)
+    )
+
+    rows = []
+    for name, scopes in (("GET", get_scopes), ("POST command", post_scopes)):
+        bare = min(asyncio.run(per_request_us(endpoint, scopes, args.requests)) for _ in range(args.repeat))
+        guarded = min(
+            asyncio.run(per_request_us(build(args.sessions), scopes, args.requests)) for _ in range(args.repeat)
+        )
+        rows.append((name, bare, guarded))
+
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    tracked = TokenBuckets(rate=5, burst=20, max_keys=args.keys)
+    names = [f"{index:032x}" for index in range(args.keys)]
+    names_size = tracemalloc.get_traced_memory()[0] - before
+    for name in names:
+        tracked.take(name, 0.0)
+    per_key = (tracemalloc.get_traced_memory()[0] - before - names_size) / args.keys
+    tracemalloc.stop()
+    started = time.perf_counter()
+    swept = tracked.sweep(3600.0)
+    sweep_ms = (time.perf_counter() - started) * 1e3
+
+    print(f"{'TokenBuckets.take':<30}{take_us:>8.3f} us")
+    for name, bare, guarded in rows:
+        print(f"{name + ', bare app':<30}{bare:>8.3f} us")
+        print(f"{name + ', with admission':<30}{guarded:>8.3f} us   (+{guarded - bare:.3f} us)")
+    print(f"{'memory per tracked key':<30}{per_key:>8.0f} B    (key strings excluded)")
+    print(f"{'sweep of idle keys':<30}{sweep_ms:>8.1f} ms   ({swept} keys)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""Cost and accuracy of the streaming wrong-command analytics.
+
+Feeds ``--commands`` rejected commands drawn from a Zipf-like distribution
+over ``--distinct`` variants into ``CommandAnalytics``. Reports the cost per
+recorded rejection and how many of the exact top ``--top`` commands the
+bounded counters kept, with their largest count error. Run from ``backend/``::
+
+    python -m benchmarks.bench_analytics --commands 1000000 --distinct 50000
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import time
+from collections import Counter
+from typing import List
+
+from app.analytics import CommandAnalytics, normalize_command
+from app.matching import parse_command
+
+VERBS = ["ls", "cat", "grep", "systemctl", "journalctl", "ip", "ss", "df", "du", "tail"]
+FLAGS = ["-l", "-a", "-h", "-n", "-f", "--no-pager", "-u", "-t"]
+
+
+def make_commands(count: int, distinct: int, seed: int) -> List[str]:
+    rng = random.Random(seed)
+    variants = [
+        " ".join([rng.choice(VERBS), *rng.sample(FLAGS, rng.randrange(3)), f"/srv/app{index}"])
+        for index in range(distinct)
+    ]
+    weights = [1 / (rank + 1) for rank in range(distinct)]
+    return rng.choices(variants, weights=weights, k=count)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--commands", type=int, default=1_000_000)
+    parser.add_argument("--distinct", type=int, default=50_000)
+    parser.add_argument("--capacity", type=int, default=500, help="ANALYTICS_TOP_COMMANDS")
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    commands = make_commands(args.commands, args.distinct, args.seed)
+    analytics = CommandAnalytics(top_commands=args.capacity)
+
+    # the store parses each command once for matching and hands the shape over
+    shapes = [parse_command(command) for command in commands]
+    started = time.perf_counter()
+    for shape in shapes:
+        analytics.record_rejected("missing-route", "inspect", shape)
+    elapsed = time.perf_counter() - started
+
+    exact = Counter(normalize_command(command) for command in commands)
+    report = analytics.report("missing-route", ["inspect"], args.top)
+    kept = {entry.command: entry for entry in report.steps[0].top_rejected}
+    expected = exact.most_common(args.top)
+    found = sum(command in kept for command, _ in expected)
+    worst = max((kept[command].count - count for command, count in expected if command in kept), default=0)
+
+    print(f"recorded {args.commands} rejections in {elapsed:.2f}s ({elapsed / args.commands * 1e6:.2f} us each)")
+    print(f"exact top {args.top} present in the {args.capacity} counters: {found}/{args.top}")
+    print(f"largest overcount among them: {worst} of {expected[0][1] if expected else 0}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,215 @@
+"""In-process load test of the mission API.
+
+Drives ``app.main:app`` through the ASGI interface, without sockets, using
+scripted players. Every player fetches the catalog and takes one registered
+mission from start to finish. Along the way it sends wrong commands, asks for
+hints and polls its status. The script reports throughput and p50/p95/p99
+latency per route, plus the peak RSS of the process. Use ``--output`` to save the results as JSON and
+``--baseline`` to compare against an earlier file. Run from ``backend/``::
+
+    python -m benchmarks.bench_api --players 2000 --concurrency 64 --output api.json
+    python -m benchmarks.bench_api --baseline api.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import time
+from typing import Any, Dict, List, Optional
+
+from .asgi import ASGIClient
+
+WRONG_COMMANDS = ["ls /nonexistent", "rm -rf /tmp/cache", "cat /etc/hostname", "whoami", "top"]
+
+
+class RouteStats:
+    def __init__(self) -> None:
+        self.latencies: Dict[str, List[float]] = {}
+        self.errors: Dict[str, int] = {}
+
+    def record(self, route: str, seconds: float, status: int) -> None:
+        self.latencies.setdefault(route, []).append(seconds)
+        if status >= 400:
+            self.errors[route] = self.errors.get(route, 0) + 1
+
+    def summary(self, elapsed: float) -> Dict[str, Dict[str, float]]:
+        report = {}
+        for route, samples in sorted(self.latencies.items()):
+            ordered = sorted(samples)
+            report[route] = {
+                "requests": len(ordered),
+                "errors": self.errors.get(route, 0),
+                "throughput_rps": len(ordered) / elapsed,
+                "mean_ms": sum(ordered) / len(ordered) * 1000,
+                "p50_ms": percentile(ordered, 0.50) * 1000,
+                "p95_ms": percentile(ordered, 0.95) * 1000,
+                "p99_ms": percentile(ordered, 0.99) * 1000,
+                "max_ms": ordered[-1] * 1000,
+            }
+        return report
+
+
+def percentile(ordered: List[float], fraction: float) -> float:
+    # nearest-rank percentile over an already sorted sample
+    index = max(0, min(len(ordered) - 1, int(round(fraction * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+def peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Player:
+    def __init__(self, client: ASGIClient, stats: RouteStats, rng: random.Random, args: argparse.Namespace) -> None:
+        self.client = client
+        self.stats = stats
+        self.rng = rng
+        self.args = args
+
+    async def call(self, route: str, method: str, path: str, body: Any = None) -> Any:
+        started = time.perf_counter()
+        response = await self.client.request(method, path, json_body=body)
+        self.stats.record(route, time.perf_counter() - started, response.status)
+        return response.json() if response.body else None
+
+    async def play(self, mission: Dict[str, Any]) -> None:
+        await self.call("GET /missions", "GET", "/api/missions")
+        start = await self.call("POST /missions/start", "POST", "/api/missions/start", {"mission_id": mission["id"]})
+        session_id = start["session_id"]
+        base = f"/api/missions/{session_id}"
+        for commands in mission["commands"]:
+            if self.rng.random() < self.args.wrong_rate:
+                await self.call("POST /missions/{id}/command", "POST", f"{base}/command", {"command": self.rng.choice(WRONG_COMMANDS)})
+            if self.rng.random() < self.args.hint_rate:
+                await self.call("POST /missions/{id}/hint", "POST", f"{base}/hint")
+            for _ in range(self.args.status_polls):
+                await self.call("GET /missions/{id}", "GET", base)
+            await self.call("POST /missions/{id}/command", "POST", f"{base}/command", {"command": self.rng.choice(commands)})
+        await self.call("GET /missions/{id}", "GET", base)
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    from app.main import app
+    from app.missions import store
+
+    stats = RouteStats()
+    async with ASGIClient(app) as client:
+        catalog = await client.get("/api/missions")
+        missions = [
+            {
+                "id": summary["id"],
+                "commands": [step.expected_commands for step in store.get_mission(summary["id"]).steps],
+            }
+            for summary in catalog.json()
+        ]
+        queue: "asyncio.Queue[int]" = asyncio.Queue()
+        for number in range(args.players):
+            queue.put_nowait(number)
+
+        async def worker(worker_id: int) -> None:
+            player = Player(client, stats, random.Random(args.seed * 100003 + worker_id), args)
+            while not queue.empty():
+                number = queue.get_nowait()
+                await player.play(missions[number % len(missions)])
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(worker_id) for worker_id in range(args.concurrency)))
+        elapsed = time.perf_counter() - started
+
+    routes = stats.summary(elapsed)
+    total = sum(route["requests"] for route in routes.values())
+    return {
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "session_backend": os.environ.get("SESSION_BACKEND", "memory"),
+        "config": {
+            "players": args.players,
+            "concurrency": args.concurrency,
+            "wrong_rate": args.wrong_rate,
+            "hint_rate": args.hint_rate,
+            "status_polls": args.status_polls,
+            "seed": args.seed,
+            "missions": len(missions),
+        },
+        "elapsed_seconds": elapsed,
+        "total_requests": total,
+        "throughput_rps": total / elapsed,
+        "peak_rss_mb": peak_rss_mb(),
+        "routes": routes,
+    }
+
+
+def print_report(result: Dict[str, Any], baseline: Optional[Dict[str, Any]]) -> None:
+    print(
+        f"{result['total_requests']} requests in {result['elapsed_seconds']:.2f}s "
+        f"({result['throughput_rps']:.0f} req/s), peak RSS {result['peak_rss_mb']:.1f} MB"
+    )
+    header = f"{'route':<30}{'requests':>9}{'errors':>7}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}"
+    if baseline:
+        header += f"{'p50 vs base':>13}"
+    print(header)
+    for route, stats in result["routes"].items():
+        line = (
+            f"{route:<30}{stats['requests']:>9}{stats['errors']:>7}{stats['throughput_rps']:>9.0f}"
+            f"{stats['p50_ms']:>9.3f}{stats['p95_ms']:>9.3f}{stats['p99_ms']:>9.3f}"
+        )
+        previous = (baseline or {}).get("routes", {}).get(route)
+        if previous:
+            line += f"{stats['p50_ms'] / previous['p50_ms'] - 1:>+12.1%}"
+        print(line)
+    if baseline:
+        change = result["throughput_rps"] / baseline["throughput_rps"] - 1
+        print(f"throughput vs baseline {baseline.get('revision') or '?'}: {change:+.1%}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--players", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--wrong-rate", type=float, default=0.5, help="chance of a wrong command before each step")
+    parser.add_argument("--hint-rate", type=float, default=0.3, help="chance of asking for a hint before each step")
+    parser.add_argument("--status-polls", type=int, default=1, help="status polls before each step")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    parser.add_argument("--baseline", help="compare against results saved with --output")
+    args = parser.parse_args()
+
+    # keep sessions from being evicted mid-run and the catalog watcher quiet
+    os.environ.setdefault("MAX_SESSIONS", str(max(10000, args.players * 2)))
+    os.environ.setdefault("MISSIONS_RELOAD_INTERVAL_SECONDS", "0")
+    # every simulated player shares one client address
+    os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as handle:
+            baseline = json.load(handle)
+
+    result = asyncio.run(run(args))
+    print_report(result, baseline)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as handle:
+            json.dump(result, handle, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""Cost of a cohort progress report as the store fills up with other sessions.
+
+Starts ``--sessions`` sessions spread over cohorts of ``--cohort-size`` each,
+moves them to random steps through the store, then times the progress report
+of one cohort on each backend. The report should cost the same at every size.
+For comparison, counting the cohort's steps by scanning every in-memory
+session, which is what any cohort view would take without the indexes, is
+timed alongside. Run from ``backend/``::
+
+    python -m benchmarks.bench_cohort --sessions 1000 10000 100000
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import random
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Tuple
+
+from app.missions import MissionStore
+from app.sessions import InMemorySessionBackend, SessionBackend, SQLiteSessionBackend
+
+from .stores import builtin_store
+
+
+def per_call_us(func: Callable[[], object], calls: int) -> float:
+    started = time.perf_counter()
+    for _ in range(calls):
+        func()
+    return (time.perf_counter() - started) / calls * 1e6
+
+
+async def fill(store: MissionStore, sessions: int, cohort_size: int, rng: random.Random) -> None:
+    mission = store.get_mission(store.list_missions()[0].id)
+    for start in range(0, sessions, cohort_size):
+        started = await store.create_sessions(
+            mission.id, min(cohort_size, sessions - start), cohort_id=f"class-{start // cohort_size}"
+        )
+        for session in started:
+            steps = rng.randrange(len(mission.steps) + 1)
+            commands = [step.expected_commands[0] for step in mission.steps[:steps]]
+            if commands:
+                await store.evaluate_commands(session.session_id, commands)
+
+
+def scan_steps(backend: InMemorySessionBackend, cohort_id: str) -> Dict[Tuple[str, int], int]:
+    counts: Dict[Tuple[str, int], int] = {}
+    with backend.frozen() as (sessions, _):
+        for session in sessions:
+            if session.cohort_id == cohort_id:
+                key = (session.mission_id, session.step_index)
+                counts[key] = counts.get(key, 0) + 1
+    return counts
+
+
+def build(kind: str, sessions: int, directory: Path) -> SessionBackend:
+    if kind == "sqlite":
+        return SQLiteSessionBackend(str(directory / f"sessions-{sessions}.db"), max_sessions=sessions)
+    return InMemorySessionBackend(max_sessions=sessions)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1000, 10_000, 100_000])
+    parser.add_argument("--cohort-size", type=int, default=200)
+    parser.add_argument("--backends", nargs="+", choices=["memory", "sqlite"], default=["memory", "sqlite"])
+    parser.add_argument("--calls", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    print(f"{'backend':>8}{'sessions':>10}{'report us':>12}{'scan steps us':>15}")
+    with tempfile.TemporaryDirectory() as directory:
+        for kind in args.backends:
+            for sessions in args.sessions:
+                backend = build(kind, sessions, Path(directory))
+                store = builtin_store(backend)
+                asyncio.run(fill(store, sessions, args.cohort_size, random.Random(args.seed)))
+                report_us = per_call_us(lambda: store._cohort_progress("class-0"), args.calls)
+                scan_us = float("nan")
+                if isinstance(backend, InMemorySessionBackend):
+                    scan_us = per_call_us(lambda: scan_steps(backend, "class-0"), max(1, args.calls // 10))
+                print(f"{kind:>8}{sessions:>10}{report_us:>12.1f}{scan_us:>15.1f}")
+                store.close()
+
+
+if __name__ == "__main__":
+    main()
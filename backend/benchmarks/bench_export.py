@@ -0,0 +1,124 @@
+"""Transcript export throughput, its memory, and what it does to live command latency.
+
+Fills an in-memory store with ``--sessions`` sessions holding a few commands
+each, then exports them all three ways while a probe submits a command every
+couple of milliseconds on the same event loop:
+
+* idle: no export, the probe alone;
+* stream: ``MissionStore.export_transcripts``, paging with a cursor and yielding
+  to the loop between chunks, as ``GET /api/transcripts/export`` does;
+* one body: every transcript built and serialized into a single response body,
+  as a plain dump endpoint would.
+
+Reports sessions exported per second, the peak memory the export allocated,
+and the probe's p50/p99/max latency during the untraced run. Run from ``backend/``::
+
+    python -m benchmarks.bench_export --sessions 1000000
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import statistics
+import time
+import tracemalloc
+from typing import Awaitable, Callable, List, Optional, Tuple
+
+from app.missions import MissionStore
+from app.sessions import InMemorySessionBackend, SessionQuery
+
+from .stores import builtin_store
+
+PROBE_INTERVAL = 0.002
+HISTORY = ("ip addr", "ip route", "ping 10.0.0.1", "ip route add default via 10.0.0.1")
+
+
+async def fill(store: MissionStore, sessions: int) -> str:
+    for start in range(0, sessions, 10_000):
+        for session in await store.create_sessions("missing-route", min(10_000, sessions - start), "trainee"):
+            session.recent_commands = HISTORY
+    probe = await store.create_session("missing-route")
+    return probe.session_id
+
+
+async def stream(store: MissionStore) -> int:
+    exported = 0
+    async for chunk in store.export_transcripts(SessionQuery()):
+        exported += chunk.count(b"\n")
+    return exported
+
+
+async def one_body(store: MissionStore) -> int:
+    sessions, _ = store._sessions.scan(SessionQuery(), None, store.session_count())
+    body = json.dumps([store._transcript(session) for session in sessions], default=str).encode()
+    return len(sessions) if body else 0
+
+
+async def measure(
+    store: MissionStore,
+    probe_id: str,
+    export: Optional[Callable[[MissionStore], Awaitable[int]]],
+    idle_seconds: float,
+) -> Tuple[float, float, List[float]]:
+    latencies: List[float] = []
+    running = True
+
+    async def probe() -> None:
+        while running:
+            scheduled = time.perf_counter() + PROBE_INTERVAL
+            await asyncio.sleep(PROBE_INTERVAL)
+            await store.evaluate_command(probe_id, "ls")
+            # lateness of the wake-up plus the command itself
+            latencies.append(time.perf_counter() - scheduled)
+
+    task = asyncio.create_task(probe())
+    await asyncio.sleep(0.05)
+    started = time.perf_counter()
+    exported = await export(store) if export is not None else 0
+    if export is None:
+        await asyncio.sleep(idle_seconds)
+    elapsed = time.perf_counter() - started
+    running = False
+    await task
+
+    peak = 0
+    if export is not None:
+        # a second, traced run: tracemalloc slows allocations too much to time with it on
+        tracemalloc.start()
+        await export(store)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return exported / elapsed if exported else 0.0, peak / 2**20, latencies
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))] * 1000
+
+
+async def run(sessions: int, modes: List[str]) -> None:
+    store = builtin_store(InMemorySessionBackend(max_sessions=sessions + 1, history_limit=len(HISTORY)))
+    probe_id = await fill(store, sessions)
+    exports = {"idle": None, "stream": stream, "one body": one_body}
+    print(f"{'mode':<10}{'sessions/s':>12}{'peak MiB':>10}{'p50 ms':>9}{'p99 ms':>9}{'max ms':>9}")
+    for mode in modes:
+        rate, peak, latencies = await measure(store, probe_id, exports[mode], idle_seconds=2.0)
+        print(
+            f"{mode:<10}{rate:>12.0f}{peak:>10.1f}{statistics.median(latencies) * 1000:>9.2f}"
+            f"{percentile(latencies, 0.99):>9.2f}{max(latencies) * 1000:>9.2f}"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=200_000)
+    modes = ["idle", "stream", "one body"]
+    parser.add_argument("--modes", nargs="+", choices=modes, default=modes)
+    args = parser.parse_args()
+    asyncio.run(run(args.sessions, args.modes))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""Throughput of the offline transcript grader across worker counts.
+
+Writes ``--transcripts`` synthetic NDJSON transcripts over the built-in
+missions, then grades the file with each ``--workers`` count and reports
+transcripts per second and the speedup over one worker. Run from ``backend/``::
+
+    python -m benchmarks.bench_grade --transcripts 1000000 --workers 1 2 4 8
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+from pathlib import Path
+from typing import List
+
+from app.catalog import BUILTIN_MISSIONS_DIR
+from app.grade import grade_stream
+from app.missions import Mission
+
+from .stores import builtin_missions
+
+WRONG = ["whoami", "cd /tmp", "cat notes.txt", "ls -la /root", "top", "history"]
+
+
+def write_transcripts(path: Path, count: int, missions: List[Mission], seed: int) -> None:
+    rng = random.Random(seed)
+    with path.open("w", encoding="utf-8") as handle:
+        for index in range(count):
+            mission = rng.choice(missions)
+            commands: List[str] = []
+            # most players finish; some give up part way
+            solved = len(mission.steps) if rng.random() < 0.8 else rng.randrange(len(mission.steps))
+            for step in mission.steps[:solved]:
+                commands.extend(rng.choice(WRONG) for _ in range(rng.randrange(3)))
+                commands.append(rng.choice(step.expected_commands))
+            handle.write(json.dumps({"id": f"t{index}", "mission_id": mission.id, "commands": commands}) + "\n")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--transcripts", type=int, default=1_000_000)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, os.cpu_count() or 1])
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    missions = builtin_missions()
+    with tempfile.TemporaryDirectory(prefix="grade-bench-") as directory:
+        path = Path(directory) / "transcripts.ndjson"
+        started = time.perf_counter()
+        write_transcripts(path, args.transcripts, missions, args.seed)
+        size = path.stat().st_size
+        print(f"wrote {args.transcripts} transcripts ({size / 1e6:.0f} MB) in {time.perf_counter() - started:.1f}s")
+        print(f"cpu count {os.cpu_count()}")
+
+        print(f"{'workers':>8}{'seconds':>10}{'transcripts/s':>16}{'speedup':>10}")
+        baseline = None
+        for workers in args.workers:
+            with path.open("rb") as source, open(os.devnull, "w") as sink:
+                started = time.perf_counter()
+                graded = grade_stream(source, sink, str(BUILTIN_MISSIONS_DIR), None, workers, args.chunk_size)
+                elapsed = time.perf_counter() - started
+            rate = graded / elapsed
+            baseline = baseline or rate
+            print(f"{workers:>8}{elapsed:>10.1f}{rate:>16.0f}{rate / baseline:>9.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""Memory per session and cost per command of the simulated host.
+
+Builds a host image with ``--files`` files, then gives ``--sessions`` sessions
+each a handful of commands that change it (a new file, a route, a restarted
+unit). Reports the bytes each session holds with copy-on-write overlays
+against giving every session its own deep copy of the image, and the time to
+run a read-only and a mutating command. Run from ``backend/``::
+
+    python -m benchmarks.bench_host --sessions 10000 --files 500
+"""
+
+from __future__ import annotations
+
+import argparse
+import copy
+import time
+import tracemalloc
+from typing import Callable, List, Optional
+
+from app.host import HostImage, HostOverlay, HostUnit, HostView
+
+COMMANDS = ["touch /tmp/marker", "ip route add default via 10.0.0.1", "systemctl restart web-api", "cd /var/log"]
+
+
+def build_image(files: int) -> HostImage:
+    return HostImage.build(
+        hostname="bench",
+        user="root",
+        home="/root",
+        cwd="/root",
+        files={f"/srv/app{index % 20}/file{index}.conf": f"key{index} = value\n" * 8 for index in range(files)},
+        interfaces={"eth0": "10.0.0.42/24"},
+        routes=["10.0.0.0/24 dev eth0 proto kernel scope link src 10.0.0.42"],
+        units={"web-api": HostUnit(description="Web API", state="failed")},
+        logs={"web-api": [f"Oct 10 11:02:{second:02d} bench web-api[42]: crash" for second in range(60)]},
+    )
+
+
+def per_session_bytes(build: Callable[[], object], sessions: int) -> float:
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    kept = [build() for _ in range(sessions)]
+    after, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    assert len(kept) == sessions
+    return (after - before) / sessions
+
+
+def with_overlay(image: HostImage) -> Optional[HostOverlay]:
+    host = HostView(image)
+    for command in COMMANDS:
+        host.run(command)
+    return None if host.overlay.empty else host.overlay
+
+
+def per_command_us(image: HostImage, command: str, calls: int) -> float:
+    started = time.perf_counter()
+    for _ in range(calls):
+        # a fresh view per command, as the store does, on an untouched session
+        # so mutating commands repeat the same work every time
+        HostView(image).run(command)
+    return (time.perf_counter() - started) / calls * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=10_000)
+    parser.add_argument("--files", type=int, default=500, help="files in the host image")
+    parser.add_argument("--calls", type=int, default=20_000)
+    args = parser.parse_args()
+
+    image = build_image(args.files)
+    overlay_bytes = per_session_bytes(lambda: with_overlay(image), args.sessions)
+    # the deep copies are far larger; a tenth of the sessions gives the same per-session figure
+    copy_bytes = per_session_bytes(lambda: copy.deepcopy(image), max(1, args.sessions // 10))
+
+    print(f"{'per session':<34}{'bytes':>12}")
+    print(f"{'copy-on-write overlay':<34}{overlay_bytes:>12.0f}")
+    print(f"{'deep copy of the image':<34}{copy_bytes:>12.0f}   ({copy_bytes / overlay_bytes:.0f}x)")
+    print()
+    print(f"{'per command':<34}{'us':>12}")
+    rows: List[str] = ["ls /srv/app3", "cat /srv/app3/file3.conf", "systemctl status web-api", *COMMANDS[:3]]
+    for command in rows:
+        print(f"{command:<34}{per_command_us(image, command, args.calls):>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
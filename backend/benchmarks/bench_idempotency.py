@@ -0,0 +1,70 @@
+"""Cost of a retried command answered from the idempotency cache, and the cache's size.
+
+Times ``MissionStore.submit_command`` for fresh keys, which evaluates and
+serializes each command, against retries of a key it has already seen. It
+then fills a ``ReplyCache`` to its ``--sessions`` x ``--per-session`` bound with
+typical response bodies and reports the memory it holds. Run from ``backend/``::
+
+    python -m benchmarks.bench_idempotency --calls 20000 --sessions 10000
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import time
+import tracemalloc
+from typing import Tuple
+
+from app.idempotency import ReplyCache
+from app.missions import MissionStore
+
+from .stores import builtin_store
+
+
+async def per_call_us(store: MissionStore, calls: int) -> Tuple[float, float, bytes]:
+    session = await store.create_session("missing-route")
+    started = time.perf_counter()
+    for index in range(calls):
+        await store.submit_command(session.session_id, "ls /var/log", f"key-{index}")
+    fresh_us = (time.perf_counter() - started) / calls * 1e6
+    started = time.perf_counter()
+    for _ in range(calls):
+        body, replayed = await store.submit_command(session.session_id, "ls /var/log", f"key-{calls - 1}")
+        assert replayed
+    replay_us = (time.perf_counter() - started) / calls * 1e6
+    return fresh_us, replay_us, body
+
+
+def cache_bytes(body: bytes, sessions: int, per_session: int) -> int:
+    cache = ReplyCache(per_session=per_session, max_sessions=sessions)
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    for session in range(sessions):
+        for key in range(per_session):
+            # a distinct body per entry, as responses differ in practice
+            cache.put(f"session-{session:08d}", f"key-{key:04d}", "ls /var/log", bytes(bytearray(body)), 0)
+    after, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return after - before
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--calls", type=int, default=20_000)
+    parser.add_argument("--sessions", type=int, default=10_000, help="sessions tracked by the cache")
+    parser.add_argument("--per-session", type=int, default=4, help="replies kept per session")
+    args = parser.parse_args()
+
+    store = builtin_store(replies=ReplyCache(per_session=args.per_session, max_sessions=args.sessions))
+    fresh_us, replay_us, body = asyncio.run(per_call_us(store, args.calls))
+    print(f"{'evaluate and cache':<24}{fresh_us:>10.1f} us")
+    print(f"{'replay from cache':<24}{replay_us:>10.1f} us   ({fresh_us / replay_us:.0f}x)")
+
+    held = cache_bytes(body, args.sessions, args.per_session)
+    entries = args.sessions * args.per_session
+    print(f"cache at its bound: {entries} replies of {len(body)} bytes, {held / 2**20:.1f} MiB ({held / entries:.0f} B each)")
+
+
+if __name__ == "__main__":
+    main()
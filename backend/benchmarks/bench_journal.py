@@ -0,0 +1,139 @@
+"""Cost of the session journal and the time it takes to recover from it.
+
+Throughput: concurrent players drive ``MissionStore`` directly, first with no
+journal and then with the journal in each sync mode. In ``commit`` mode every
+command waits for its fsync, and group commit lets concurrent commands share
+one fsync.
+
+Recovery: writes ``--sessions`` sessions with a few commands each, then times
+two rebuilds of a fresh backend. The first replays the raw journal; the second
+loads the compacted snapshot. Run from ``backend/``::
+
+    python -m benchmarks.bench_journal --players 64 --sessions 100000
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import shutil
+import tempfile
+import time
+from pathlib import Path
+from typing import Optional
+
+from app.journal import SessionJournal
+from app.missions import MissionStore
+from app.sessions import InMemorySessionBackend
+
+from .stores import builtin_store
+
+COMMANDS = ["whoami", "ls /var/log", "pwd", "ls -la"]
+
+
+def build_store(max_sessions: int) -> MissionStore:
+    return builtin_store(InMemorySessionBackend(max_sessions=max_sessions, history_limit=8))
+
+
+def attach(store: MissionStore, directory: Path, sync: str) -> SessionJournal:
+    # like MissionStore.attach_journal, minus the startup snapshot
+    journal = SessionJournal(directory, sync=sync, fsync_interval_seconds=0.05)
+    journal.recover(store._sessions)  # type: ignore[arg-type]
+    journal.start()
+    store.journal = journal
+    return journal
+
+
+async def play(store: MissionStore, players: int, sessions_per_player: int) -> int:
+    async def player() -> int:
+        commands = 0
+        for _ in range(sessions_per_player):
+            session = await store.create_session("sandbox-check")
+            for command in COMMANDS:
+                await store.evaluate_command(session.session_id, command)
+                commands += 1
+        return commands
+
+    counts = await asyncio.gather(*(player() for _ in range(players)))
+    return sum(counts)
+
+
+def throughput(sync: Optional[str], players: int, sessions_per_player: int, directory: Path) -> float:
+    store = build_store(players * sessions_per_player + 1)
+    if sync is not None:
+        attach(store, directory, sync)
+    started = time.perf_counter()
+    commands = asyncio.run(play(store, players, sessions_per_player))
+    elapsed = time.perf_counter() - started
+    store.close()
+    return commands / elapsed
+
+
+def recovery(sessions: int, directory: Path) -> None:
+    store = build_store(sessions + 1)
+    journal = attach(store, directory, "off")
+
+    async def populate() -> None:
+        created = await store.create_sessions("missing-route", sessions)
+        for session in created:
+            await store.evaluate_command(session.session_id, "ip addr")
+            await store.evaluate_command(session.session_id, "ls")
+
+    started = time.perf_counter()
+    asyncio.run(populate())
+    written = time.perf_counter() - started
+    store.close()
+    size = sum(path.stat().st_size for path in directory.iterdir())
+    print(f"wrote {sessions} sessions in {written:.2f}s, journal {size / 1e6:.1f} MB")
+
+    backend = InMemorySessionBackend(max_sessions=sessions + 1)
+    started = time.perf_counter()
+    SessionJournal(directory).recover(backend)
+    print(f"replay journal      {time.perf_counter() - started:>7.2f}s  {backend.count()} sessions")
+
+    started = time.perf_counter()
+    journal = SessionJournal(directory)
+    journal.recover(backend)
+    journal.snapshot(backend)
+    journal.close()
+    snapshot_seconds = time.perf_counter() - started
+    size = sum(path.stat().st_size for path in directory.iterdir())
+    print(f"replay + snapshot   {snapshot_seconds:>7.2f}s  snapshot {size / 1e6:.1f} MB")
+
+    backend = InMemorySessionBackend(max_sessions=sessions + 1)
+    started = time.perf_counter()
+    SessionJournal(directory).recover(backend)
+    print(f"load snapshot       {time.perf_counter() - started:>7.2f}s  {backend.count()} sessions")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--players", type=int, default=64)
+    parser.add_argument("--sessions-per-player", type=int, default=20)
+    parser.add_argument("--sessions", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=3, help="best of this many throughput runs")
+    parser.add_argument("--dir", help="journal directory (defaults to a temporary one)")
+    args = parser.parse_args()
+
+    root = Path(args.dir or tempfile.mkdtemp(prefix="journal-bench-"))
+    try:
+        print(f"{'journal':>10}{'commands/s':>14}")
+        for sync in (None, "off", "interval", "commit"):
+            rates = []
+            for run in range(args.repeat):
+                directory = root / f"throughput-{sync}-{run}"
+                directory.mkdir(parents=True, exist_ok=True)
+                rates.append(throughput(sync, args.players, args.sessions_per_player, directory))
+            rate = max(rates)
+            print(f"{sync or 'disabled':>10}{rate:>14.0f}")
+        print()
+        directory = root / "recovery"
+        directory.mkdir(parents=True, exist_ok=True)
+        recovery(args.sessions, directory)
+    finally:
+        if not args.dir:
+            shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
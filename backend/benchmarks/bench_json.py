@@ -0,0 +1,146 @@
+"""Time ``FastJSONResponse`` against FastAPI's standard serialization path.
+
+Plays sessions through a fresh store to collect every response model the
+fast-path routes return, adds hand-built ones with awkward values (non-ASCII
+names, control characters, float edge cases, datetimes with and without
+microseconds), and reports the time to serialize the largest model of each
+kind both ways: validate against ``response_model``, ``jsonable_encoder`` and
+``JSONResponse``, or pydantic-core straight to bytes. ``tests/test_json_compat.py``
+checks the same models come out as identical bytes. Run from ``backend/``::
+
+    python -m benchmarks.bench_json
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, List
+
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+from pydantic import BaseModel
+from starlette.responses import JSONResponse
+
+from app.responses import FastJSONResponse
+from app.schemas import (
+    CommandBatchResponse,
+    LeaderboardEntry,
+    LeaderboardResponse,
+    MissionAnalyticsResponse,
+    MissionBulkStartResponse,
+    MissionStartResponse,
+    SolveTimeBucket,
+)
+
+from .stores import builtin_store
+
+AWKWARD_NAMES = [None, "", "Zoë", "管理员", "root 🚀", 'quote " and \\ slash', "tab\tnew\nline\x01", "</script>"]
+# durations have millisecond resolution; below 1e-4 pydantic-core writes "0.0000999"
+# where json writes "9.99e-05", the one known difference, and out of this API's range
+AWKWARD_FLOATS = [0.0, 0.001, 0.1, 1 / 3, 2.5, 59.999, 123456.789, 86399.999, 1e15, 2.0**53, 1e16, 1.5e17]
+
+
+async def played_models(rounds: int) -> List[BaseModel]:
+    store = builtin_store()
+    models: List[BaseModel] = []
+    for round_number in range(rounds):
+        started: List[MissionStartResponse] = []
+        for mission in store.list_missions():
+            name = AWKWARD_NAMES[round_number % len(AWKWARD_NAMES)]
+            session = await store.create_session(mission.id, name)
+            steps = store.get_mission(mission.id).steps
+            started.append(
+                MissionStartResponse(
+                    session_id=session.session_id,
+                    mission=mission,
+                    intro=store.get_mission(mission.id).intro,
+                    first_prompt=steps[0].prompt,
+                    step_index=session.step_index,
+                    total_steps=len(steps),
+                    time_limit_seconds=session.time_limit_seconds,
+                    started_at=session.started_at,
+                )
+            )
+            models.append(await store.status(session.session_id))
+            models.append(await store.hint(session.session_id))
+            models.append(await store.evaluate_command(session.session_id, "definitely-wrong ünïcode"))
+            results = await store.evaluate_commands(
+                session.session_id, [step.expected_commands[0] for step in steps]
+            )
+            models.append(CommandBatchResponse(results=results, evaluated=len(results), stopped_early=False))
+            models.append(await store.leaderboard(mission.id, 0, 20, session.session_id))
+            models.append(store.analytics_report(mission.id, 10))
+        models.extend(started)
+        models.append(MissionBulkStartResponse(sessions=started))
+    return models
+
+
+def awkward_models() -> List[BaseModel]:
+    base = datetime(2024, 2, 29, 23, 59, 59, tzinfo=timezone.utc)
+    entries = [
+        LeaderboardEntry(
+            rank=index + 1,
+            player_name=AWKWARD_NAMES[index % len(AWKWARD_NAMES)],
+            total_score=index * 50,
+            mistakes=index,
+            completion_seconds=seconds,
+            completed_at=base + timedelta(microseconds=index * 123457),
+        )
+        for index, seconds in enumerate(AWKWARD_FLOATS)
+    ]
+    naive = entries[0].model_copy(update={"completed_at": datetime(2024, 1, 1, 12, 0)})
+    return [
+        LeaderboardResponse(mission_id="m", total=len(entries), offset=0, limit=50, entries=entries, player=naive),
+        MissionAnalyticsResponse(
+            mission_id="m",
+            completions=len(AWKWARD_FLOATS),
+            mean_solve_seconds=sum(AWKWARD_FLOATS) / len(AWKWARD_FLOATS),
+            solve_time_buckets=[SolveTimeBucket(le_seconds=value, count=1) for value in AWKWARD_FLOATS]
+            + [SolveTimeBucket(count=0)],
+            steps=[],
+        ),
+    ]
+
+
+def per_call_us(func: Callable[[], object], calls: int) -> float:
+    started = time.perf_counter()
+    for _ in range(calls):
+        func()
+    return (time.perf_counter() - started) / calls * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rounds", type=int, default=len(AWKWARD_NAMES), help="sessions played per mission")
+    parser.add_argument("--calls", type=int, default=2000, help="serializations timed per model kind")
+    args = parser.parse_args()
+
+    models = asyncio.run(played_models(args.rounds)) + awkward_models()
+    # the largest example of each kind, serialized both ways
+    samples: Dict[type, BaseModel] = {}
+    for model in models:
+        kind = type(model)
+        if kind not in samples or len(FastJSONResponse(model).body) > len(FastJSONResponse(samples[kind]).body):
+            samples[kind] = model
+
+    loop = asyncio.new_event_loop()
+    print(f"{'model':<28}{'bytes':>8}{'standard':>12}{'fast':>10}{'speedup':>10}")
+    for kind, model in samples.items():
+        field = create_model_field(name=f"Response_{kind.__name__}", type_=kind, mode="serialization")
+
+        def standard() -> bytes:
+            content = loop.run_until_complete(serialize_response(field=field, response_content=model))
+            return JSONResponse(content).body
+
+        standard_us = per_call_us(standard, args.calls)
+        fast_us = per_call_us(lambda: FastJSONResponse(model).body, args.calls)
+        size = len(FastJSONResponse(model).body)
+        print(f"{kind.__name__:<28}{size:>8}{standard_us:>10.1f}us{fast_us:>8.1f}us{standard_us / fast_us:>9.1f}x")
+    loop.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""Cost of recording completed runs and reading a leaderboard back.
+
+Records ``--runs`` random runs for one mission into each leaderboard
+implementation, keeping the best ``--size`` of them, then times a top-20 page,
+a page halfway down the board and the rank of a single player. Compares the
+in-memory ``SortedList`` boards with the SQLite table. Run from ``backend/``::
+
+    python -m benchmarks.bench_leaderboard --runs 100000 --size 1000
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, List
+
+from app.leaderboard import InMemoryLeaderboards, Leaderboards, RankedRun, SQLiteLeaderboards
+from app.sessions import SQLiteSessionBackend
+
+
+def make_runs(count: int, seed: int) -> List[RankedRun]:
+    rng = random.Random(seed)
+    return [
+        RankedRun(
+            mission_id="missing-route",
+            session_id=f"s{index:08d}",
+            player_name=f"player-{index}",
+            total_score=rng.choice((100, 150, 200, 250, 300)),
+            mistakes=rng.randrange(10),
+            elapsed_ms=rng.randrange(30_000, 900_000),
+            completed_at=1_700_000_000 + index / 10,
+        )
+        for index in range(count)
+    ]
+
+
+def per_call_us(func: Callable[[], object], calls: int) -> float:
+    started = time.perf_counter()
+    for _ in range(calls):
+        func()
+    return (time.perf_counter() - started) / calls * 1e6
+
+
+def measure_reads(board: Leaderboards, mission_id: str, reads: int) -> Dict[str, float]:
+    total, _ = board.page(mission_id, 0, 1)
+    _, [(_, middle)] = board.page(mission_id, total // 2, 1)
+    return {
+        "top 20": per_call_us(lambda: board.page(mission_id, 0, 20), reads),
+        "page at 50%": per_call_us(lambda: board.page(mission_id, total // 2, 20), reads),
+        "rank": per_call_us(lambda: board.rank(mission_id, middle.session_id), reads),
+    }
+
+
+def measure(board: Leaderboards, runs: List[RankedRun], reads: int) -> Dict[str, float]:
+    started = time.perf_counter()
+    for run in runs:
+        board.record(run)
+    record_us = (time.perf_counter() - started) / len(runs) * 1e6
+    return {"record": record_us, **measure_reads(board, runs[0].mission_id, reads)}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=100_000)
+    parser.add_argument("--size", type=int, default=1000, help="runs kept per mission (LEADERBOARD_SIZE)")
+    parser.add_argument("--reads", type=int, default=2_000)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    runs = make_runs(args.runs, args.seed)
+    results: Dict[str, Dict[str, float]] = {}
+    results["SortedList"] = measure(InMemoryLeaderboards(max_entries=args.size), runs, args.reads)
+
+    with tempfile.TemporaryDirectory(prefix="leaderboard-bench-") as directory:
+        backend = SQLiteSessionBackend(str(Path(directory) / "sessions.db"))
+        board = SQLiteLeaderboards(backend, max_entries=args.size)
+        # the store records inside a session transaction; one transaction per run here too
+        started = time.perf_counter()
+        for run in runs:
+            with backend._write():
+                board.record(run)
+        record_us = (time.perf_counter() - started) / len(runs) * 1e6
+        results["sqlite"] = {"record": record_us, **measure_reads(board, runs[0].mission_id, args.reads)}
+        backend.close()
+
+    columns = list(next(iter(results.values())))
+    print(f"{'board':<12}" + "".join(f"{column + ' us':>16}" for column in columns))
+    for name, timings in results.items():
+        print(f"{name:<12}" + "".join(f"{timings[column]:>16.2f}" for column in columns))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""Compare the compiled command matcher with the legacy startswith scan.
+
+Run from ``backend/``::
+
+    python -m benchmarks.bench_matching --variants 1000 5000 20000
+"""
+
+from __future__ import annotations
+
+import argparse
+import timeit
+from typing import List, Sequence
+
+from app.matching import CommandMatcher
+
+
+def legacy_match(command: str, expected_commands: Sequence[str]) -> bool:
+    normalized = command.strip().lower()
+    return any(normalized.startswith(expected) for expected in expected_commands)
+
+
+def build_variants(count: int) -> List[str]:
+    variants = []
+    for index in range(count):
+        unit = f"svc-{index:05d}"
+        variants.append(f"systemctl restart {unit}")
+        variants.append(f"sudo systemctl --no-block restart {unit}")
+    return variants[:count]
+
+
+def run(count: int, number: int) -> None:
+    variants = build_variants(count)
+    matcher = CommandMatcher(variants)
+    last_unit = variants[-1].split()[-1]
+    probes = {
+        "hit (last variant)": f"sudo systemctl restart {last_unit}",
+        "miss": "systemctl restart unknown-unit",
+    }
+
+    print(f"\n{count} variants ({matcher.variant_count} compiled)")
+    print(f"{'probe':<22}{'legacy us':>12}{'compiled us':>14}{'speedup':>10}")
+    for label, probe in probes.items():
+        legacy = timeit.timeit(lambda: legacy_match(probe, variants), number=number)
+        compiled = timeit.timeit(lambda: matcher.matches(probe), number=number)
+        legacy_us = legacy / number * 1e6
+        compiled_us = compiled / number * 1e6
+        print(f"{label:<22}{legacy_us:>12.2f}{compiled_us:>14.2f}{legacy_us / compiled_us:>9.1f}x")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--variants", type=int, nargs="+", default=[10, 1000, 10000])
+    parser.add_argument("--number", type=int, default=2000)
+    args = parser.parse_args()
+    for count in args.variants:
+        run(count, args.number)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""Per-request cost of the Prometheus instrumentation.
+
+Times the metric primitives on their own, then times a trivial ASGI app with
+and without ``MetricsMiddleware`` in front of it. The difference between the
+two is what the middleware adds to each request. Run from ``backend/``::
+
+    python -m benchmarks.bench_metrics --requests 200000
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import time
+from typing import Any, Callable, Dict
+
+from app.metrics import Counter, Histogram, MetricsMiddleware, Registry, request_histogram
+
+
+class _Route:
+    path = "/api/missions/{session_id}/command"
+
+
+async def endpoint(scope: Dict[str, Any], receive: Any, send: Any) -> None:
+    # what the router leaves behind for the middleware to read
+    scope["route"] = _Route
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"{}"})
+
+
+async def per_request_us(app: Callable[..., Any], requests: int) -> float:
+    scope = {"type": "http", "method": "POST", "path": "/api/missions/abc/command"}
+
+    async def receive() -> Dict[str, Any]:
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message: Dict[str, Any]) -> None:
+        return None
+
+    started = time.perf_counter()
+    for _ in range(requests):
+        await app(dict(scope), receive, send)
+    return (time.perf_counter() - started) / requests * 1e6
+
+
+def per_call_us(func: Callable[[], None], calls: int) -> float:
+    started = time.perf_counter()
+    for _ in range(calls):
+        func()
+    return (time.perf_counter() - started) / calls * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200_000)
+    parser.add_argument("--repeat", type=int, default=5, help="best of this many runs")
+    args = parser.parse_args()
+
+    registry = Registry()
+    counter = registry.register(Counter("bench_total", "bench", ("mission", "step", "result")))
+    histogram = registry.register(Histogram("bench_seconds", "bench", ("route",)))
+    wrapped = MetricsMiddleware(endpoint, registry.register(request_histogram()))
+
+    timings = {
+        "Counter.inc": min(
+            per_call_us(lambda: counter.inc("missing-route", "inspect", "accepted"), args.requests)
+            for _ in range(args.repeat)
+        ),
+        "Histogram.observe": min(
+            per_call_us(lambda: histogram.observe(0.00042, "/api/missions"), args.requests)
+            for _ in range(args.repeat)
+        ),
+        "perf_counter pair": min(
+            per_call_us(lambda: time.perf_counter() - time.perf_counter(), args.requests)
+            for _ in range(args.repeat)
+        ),
+    }
+    bare = min(asyncio.run(per_request_us(endpoint, args.requests)) for _ in range(args.repeat))
+    instrumented = min(asyncio.run(per_request_us(wrapped, args.requests)) for _ in range(args.repeat))
+
+    for name, micros in timings.items():
+        print(f"{name:<26}{micros:>8.3f} us")
+    print(f"{'request, bare app':<26}{bare:>8.3f} us")
+    print(f"{'request, with middleware':<26}{instrumented:>8.3f} us")
+    print(f"{'middleware overhead':<26}{instrumented - bare:>8.3f} us")
+    # a command request also pays for one match timing, one observe and one inc in the store
+    store_cost = timings["perf_counter pair"] + timings["Histogram.observe"] + timings["Counter.inc"]
+    print(f"{'store cost per command':<26}{store_cost:>8.3f} us")
+
+
+if __name__ == "__main__":
+    main()
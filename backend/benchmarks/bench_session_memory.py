@@ -0,0 +1,103 @@
+"""Bytes per MissionSession for the legacy dataclass layout vs the slotted one.
+
+Each measurement runs in a fresh interpreter and counts the memory allocated
+while building N sessions that each received a few commands. Run from
+``backend/``::
+
+    python -m benchmarks.bench_session_memory --counts 10000 100000 1000000
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import subprocess
+import sys
+import tracemalloc
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import List, Optional
+
+from app.sessions import MissionSession
+
+COMMANDS = ["ls", "pwd", "ip addr", "ip route add default via 10.0.0.1", "ping 8.8.8.8"]
+
+
+@dataclass
+class LegacyMissionSession:
+    session_id: str
+    mission_id: str
+    step_index: int = 0
+    mistakes: int = 0
+    total_score: int = 0
+    started_at: datetime = field(default_factory=datetime.utcnow)
+    time_limit_seconds: int = 900
+    history: List[str] = field(default_factory=list)
+    last_hint_index: Optional[int] = None
+
+
+def build(layout: str, count: int, commands: int, history_limit: int) -> list:
+    sessions = []
+    for index in range(count):
+        # ids and commands arrive as fresh strings from request bodies
+        mission_id = "".join(["missing", "-route"])
+        submitted = [f"{COMMANDS[i % len(COMMANDS)]} " for i in range(commands)]
+        if layout == "legacy":
+            session = LegacyMissionSession(session_id=str(uuid.uuid4()), mission_id=mission_id)
+            session.history.extend(submitted)
+        else:
+            session = MissionSession(session_id=str(uuid.uuid4()), mission_id=mission_id)
+            for command in submitted:
+                session.record_command(command, history_limit)
+        session.step_index = index % 3
+        session.total_score = index % 500
+        sessions.append(session)
+    return sessions
+
+
+def measure(layout: str, count: int, commands: int, history_limit: int) -> float:
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    sessions = build(layout, count, commands, history_limit)
+    after, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    assert len(sessions) == count
+    return (after - before) / count
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--counts", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--commands", type=int, default=20, help="commands submitted per session")
+    parser.add_argument("--history-limit", type=int, default=8)
+    parser.add_argument("--worker", nargs=2, metavar=("LAYOUT", "COUNT"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        layout, count = args.worker
+        print(json.dumps(measure(layout, int(count), args.commands, args.history_limit)))
+        return
+
+    layouts = [("legacy", "legacy"), ("slotted", f"slotted (history {args.history_limit})")]
+    if args.history_limit:
+        layouts.append(("slotted-off", "slotted (history off)"))
+    print(f"{'sessions':>10}" + "".join(f"{label:>26}" for _, label in layouts))
+    for count in args.counts:
+        row = []
+        for layout, _ in layouts:
+            limit = 0 if layout == "slotted-off" else args.history_limit
+            output = subprocess.run(
+                [
+                    sys.executable, "-m", "benchmarks.bench_session_memory",
+                    "--commands", str(args.commands), "--history-limit", str(limit),
+                    "--worker", layout.split("-")[0], str(count),
+                ],
+                check=True, capture_output=True, text=True,
+            ).stdout
+            row.append(float(output))
+        print(f"{count:>10}" + "".join(f"{value:>24.0f} B" for value in row))
+
+
+if __name__ == "__main__":
+    main()
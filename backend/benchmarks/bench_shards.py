@@ -0,0 +1,89 @@
+"""Throughput of the shard router in front of 1..N in-memory shards.
+
+For every requested shard count, starts that many ``uvicorn app.main:app``
+processes, each with its own ``SHARD_ID`` and in-memory store, plus the router
+(``app.sharding:create_router``) in front of them. It then drives the router
+from several client processes with the same start, command and status mix as
+``bench_workers`` and reports requests per second. Scaling is only near-linear
+while there are cores to spare for the shards, the router workers and the
+clients. Run from ``backend/``::
+
+    python -m benchmarks.bench_shards --shards 1 2 4 --clients 16 --duration 10
+"""
+
+from __future__ import annotations
+
+import argparse
+import multiprocessing
+import os
+import subprocess
+import sys
+import time
+from typing import List, Tuple
+
+from benchmarks.bench_workers import client, wait_until_ready
+
+
+def uvicorn(app: str, port: int, env: dict, *options: str) -> subprocess.Popen:
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", app, "--port", str(port), "--log-level", "warning", *options],
+        env=env,
+    )
+
+
+def run(shards: int, router_workers: int, clients: int, duration: float, port: int) -> Tuple[float, int]:
+    env = dict(os.environ, MAX_SESSIONS="1000000", RATE_LIMIT_ENABLED="false", METRICS_ENABLED="false")
+    servers: List[subprocess.Popen] = []
+    backends = []
+    try:
+        for index in range(shards):
+            shard_port = port + 1 + index
+            servers.append(uvicorn("app.main:app", shard_port, dict(env, SHARD_ID=f"s{index}")))
+            backends.append(f"s{index}=http://127.0.0.1:{shard_port}")
+        for shard_port in range(port + 1, port + 1 + shards):
+            wait_until_ready(shard_port)
+        servers.append(
+            uvicorn(
+                "app.sharding:create_router",
+                port,
+                dict(env, SHARD_BACKENDS=",".join(backends)),
+                "--factory",
+                "--workers",
+                str(router_workers),
+            )
+        )
+        wait_until_ready(port)
+        with multiprocessing.Pool(clients) as pool:
+            started = time.perf_counter()
+            results: List[Tuple[int, int]] = pool.map(client, [(port, duration)] * clients)
+            elapsed = time.perf_counter() - started
+    finally:
+        for server in servers:
+            server.terminate()
+        for server in servers:
+            server.wait()
+    total = sum(requests for requests, _ in results)
+    errors = sum(failed for _, failed in results)
+    return total / elapsed, errors
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--shards", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--router-workers", type=int, default=0, help="0 runs one router worker per shard")
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    print(f"cores: {os.cpu_count()}")
+    baseline = None
+    print(f"{'shards':>8}{'req/s':>12}{'errors':>8}{'scale':>8}")
+    for shards in args.shards:
+        throughput, errors = run(shards, args.router_workers or shards, args.clients, args.duration, args.port)
+        baseline = baseline or throughput
+        print(f"{shards:>8}{throughput:>12.0f}{errors:>8}{throughput / baseline:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
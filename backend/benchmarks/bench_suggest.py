@@ -0,0 +1,92 @@
+"""Lookup cost of "did you mean" suggestions as the variant count grows.
+
+Indexes ``--variants`` accepted commands with ``CommandSuggester`` and looks up
+commands with one slip each (a swapped, dropped or extra character in an
+argument) plus unrelated commands. Reports microseconds per lookup and how
+often the slip led back to its own variant; with many similar variants a slip
+can land one edit from another one instead. A linear scan with
+``difflib.get_close_matches`` is timed for comparison up to
+``--baseline-limit`` variants. Run from ``backend/``::
+
+    python -m benchmarks.bench_suggest --variants 10 100 1000 10000 100000
+"""
+
+from __future__ import annotations
+
+import argparse
+import difflib
+import random
+import time
+from typing import Callable, List, Tuple
+
+from app.matching import CommandSuggester, parse_command
+
+VERBS = ["systemctl restart", "systemctl status", "journalctl -u", "ip route add", "tail -n 50", "cat"]
+UNRELATED = ["whoami", "uptime", "df -h", "history", "top -b", "nslookup example.com"]
+
+
+def build_variants(count: int) -> List[str]:
+    return [f"{VERBS[index % len(VERBS)]} svc-{index:06d}" for index in range(count)]
+
+
+def slip(command: str, rng: random.Random) -> str:
+    """``command`` with one character swapped, dropped or added in one of its arguments."""
+    tokens = command.split()
+    while True:
+        index = rng.choice([index for index, token in enumerate(tokens) if not token.startswith("-")])
+        token = tokens[index]
+        position = rng.randrange(len(token) - 1)
+        kind = rng.randrange(3)
+        if kind == 0:
+            changed = token[:position] + token[position + 1] + token[position] + token[position + 2 :]
+        elif kind == 1:
+            changed = token[:position] + token[position + 1 :]
+        else:
+            changed = token[:position] + rng.choice("aeiorstx") + token[position:]
+        if changed != token:
+            return " ".join([*tokens[:index], changed, *tokens[index + 1 :]])
+
+
+def per_lookup_us(lookup: Callable[[str], object], queries: List[str]) -> float:
+    started = time.perf_counter()
+    for query in queries:
+        lookup(query)
+    return (time.perf_counter() - started) / len(queries) * 1e6
+
+
+def run(count: int, queries: int, baseline_limit: int, rng: random.Random) -> Tuple[float, float, float, float]:
+    variants = build_variants(count)
+    suggester = CommandSuggester(variants)
+    sources = [rng.choice(variants) for _ in range(queries)]
+    slips = [slip(source, rng) for source in sources]
+    misses = [rng.choice(UNRELATED) for _ in range(queries)]
+
+    suggest = lambda query: suggester.suggest(parse_command(query))  # noqa: E731
+    slip_us = per_lookup_us(suggest, slips)
+    miss_us = per_lookup_us(suggest, misses)
+    found = sum(suggest(query) == source for query, source in zip(slips, sources)) / queries
+
+    scan_us = float("nan")
+    if count <= baseline_limit:
+        sample = slips[: max(1, min(queries, 200_000 // count))]
+        scan_us = per_lookup_us(lambda query: difflib.get_close_matches(query, variants, n=1), sample)
+    return slip_us, miss_us, found, scan_us
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--variants", type=int, nargs="+", default=[10, 100, 1000, 10_000, 100_000])
+    parser.add_argument("--queries", type=int, default=20_000)
+    parser.add_argument("--baseline-limit", type=int, default=10_000, help="largest size timed with difflib")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    print(f"{'variants':>10}{'slip us':>10}{'miss us':>10}{'found':>8}{'difflib us':>14}")
+    for count in args.variants:
+        slip_us, miss_us, found, scan_us = run(count, args.queries, args.baseline_limit, rng)
+        print(f"{count:>10}{slip_us:>10.2f}{miss_us:>10.2f}{found:>8.1%}{scan_us:>14.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""Throughput of uvicorn with 1 vs N workers sharing the SQLite session backend.
+
+Starts ``uvicorn app.main:app --workers N`` for every requested worker count,
+drives it from several client processes over keep-alive connections and reports
+requests per second. Run from ``backend/``::
+
+    python -m benchmarks.bench_workers --workers 1 4 --clients 16 --duration 10
+"""
+
+from __future__ import annotations
+
+import argparse
+import http.client
+import json
+import multiprocessing
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from typing import List, Tuple
+
+COMMANDS = ["whoami", "pwd", "ls", "ls -la"]
+
+
+def wait_until_ready(port: int, timeout: float = 20.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+            conn.request("GET", "/health")
+            if conn.getresponse().status == 200:
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError("server did not become ready")
+
+
+def client(args: Tuple[int, float]) -> Tuple[int, int]:
+    port, duration = args
+    conn = http.client.HTTPConnection("127.0.0.1", port)
+    headers = {"Content-Type": "application/json"}
+    requests = errors = 0
+    deadline = time.monotonic() + duration
+    while time.monotonic() < deadline:
+        conn.request("POST", "/api/missions/start", json.dumps({"mission_id": "sandbox-check"}), headers)
+        response = conn.getresponse()
+        body = response.read()
+        requests += 1
+        if response.status != 200:
+            errors += 1
+            continue
+        session_id = json.loads(body)["session_id"]
+        # every request may land on a different worker; the shared store must follow
+        for command in COMMANDS:
+            conn.request(
+                "POST",
+                f"/api/missions/{session_id}/command",
+                json.dumps({"command": command}),
+                headers,
+            )
+            response = conn.getresponse()
+            response.read()
+            requests += 1
+            errors += response.status != 200
+        conn.request("GET", f"/api/missions/{session_id}")
+        response = conn.getresponse()
+        response.read()
+        requests += 1
+        errors += response.status != 200
+    return requests, errors
+
+
+def run(workers: int, clients: int, duration: float, port: int) -> Tuple[float, int]:
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(
+            os.environ,
+            SESSION_BACKEND="sqlite",
+            SESSION_DB_PATH=os.path.join(tmp, "sessions.db"),
+            MAX_SESSIONS="1000000",
+            RATE_LIMIT_ENABLED="false",
+        )
+        server = subprocess.Popen(
+            [
+                sys.executable, "-m", "uvicorn", "app.main:app",
+                "--port", str(port), "--workers", str(workers), "--log-level", "warning",
+            ],
+            env=env,
+        )
+        try:
+            wait_until_ready(port)
+            with multiprocessing.Pool(clients) as pool:
+                started = time.perf_counter()
+                results: List[Tuple[int, int]] = pool.map(client, [(port, duration)] * clients)
+                elapsed = time.perf_counter() - started
+        finally:
+            server.terminate()
+            server.wait()
+    total = sum(requests for requests, _ in results)
+    errors = sum(failed for _, failed in results)
+    return total / elapsed, errors
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, os.cpu_count() or 2])
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    baseline = None
+    print(f"{'workers':>8}{'req/s':>12}{'errors':>8}{'scale':>8}")
+    for workers in args.workers:
+        throughput, errors = run(workers, args.clients, args.duration, args.port)
+        baseline = baseline or throughput
+        print(f"{workers:>8}{throughput:>12.0f}{errors:>8}{throughput / baseline:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
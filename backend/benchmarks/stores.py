@@ -0,0 +1,21 @@
+"""Stores serving the built-in missions, shared by the benchmarks."""
+
+from __future__ import annotations
+
+from functools import lru_cache
+from typing import Any, List
+
+from app.catalog import BUILTIN_MISSIONS_DIR, MissionCatalogLoader
+from app.missions import Mission, MissionStore
+
+
+@lru_cache(maxsize=None)
+def builtin_missions() -> List[Mission]:
+    return MissionCatalogLoader(BUILTIN_MISSIONS_DIR).load()
+
+
+def builtin_store(*args: Any, **kwargs: Any) -> MissionStore:
+    """A ``MissionStore`` built from these arguments, serving the built-in missions."""
+    store = MissionStore(*args, **kwargs)
+    store.replace_missions(builtin_missions())
+    return store
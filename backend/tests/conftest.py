@@ -0,0 +1,32 @@
+from typing import Callable, Iterator, List
+
+import pytest
+
+from app.catalog import BUILTIN_MISSIONS_DIR, MissionCatalogLoader
+from app.missions import Mission, MissionStore
+
+
+@pytest.fixture(scope="session")
+def builtin_missions() -> List[Mission]:
+    return MissionCatalogLoader(BUILTIN_MISSIONS_DIR).load()
+
+
+@pytest.fixture
+def make_store(builtin_missions: List[Mission]) -> Iterator[Callable[..., MissionStore]]:
+    """Build ``MissionStore``s serving the built-in missions; each is closed after the test."""
+    stores: List[MissionStore] = []
+
+    def make(*args, **kwargs) -> MissionStore:
+        store = MissionStore(*args, **kwargs)
+        store.replace_missions(builtin_missions)
+        stores.append(store)
+        return store
+
+    yield make
+    for store in stores:
+        store.close()
+
+
+@pytest.fixture
+def store(make_store: Callable[..., MissionStore]) -> MissionStore:
+    return make_store()
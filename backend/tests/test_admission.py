@@ -0,0 +1,87 @@
+import asyncio
+
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from app.admission import AdmissionMiddleware, TokenBuckets
+from app.main import app
+from app.schemas import MAX_BULK_SESSIONS
+from app.sessions import InMemorySessionBackend, SessionCapacityError
+
+
+def client_for(burst: int) -> TestClient:
+    app = FastAPI()
+
+    @app.post("/api/missions/start/bulk")
+    async def start(request: Request) -> dict:
+        # the route still sees the body the middleware read
+        return await request.json()
+
+    app.add_middleware(AdmissionMiddleware, prefix="/api", clients=TokenBuckets(rate=0.001, burst=burst))
+    return TestClient(app)
+
+
+def test_bulk_start_takes_a_token_per_session() -> None:
+    client = client_for(burst=60)
+    first = client.post("/api/missions/start/bulk", json={"mission_id": "m", "count": 50})
+    assert first.status_code == 200
+    assert first.json() == {"mission_id": "m", "count": 50}
+
+    throttled = client.post("/api/missions/start/bulk", json={"mission_id": "m", "count": 20})
+    assert throttled.status_code == 429
+    assert int(throttled.headers["retry-after"]) > 0
+    # the ten tokens left still cover a smaller request
+    assert client.post("/api/missions/start/bulk", json={"mission_id": "m", "count": 10}).status_code == 200
+
+
+def test_bulk_start_larger_than_the_burst_drains_the_bucket() -> None:
+    client = client_for(burst=60)
+    assert client.post("/api/missions/start/bulk", json={"mission_id": "m", "count": 61}).status_code == 200
+    throttled = client.post("/api/missions/start/bulk", json={"mission_id": "m", "count": 1})
+    assert throttled.status_code == 429
+    assert int(throttled.headers["retry-after"]) > 0
+
+
+def test_a_full_bucket_admits_exactly_its_burst() -> None:
+    buckets = TokenBuckets(rate=0.001, burst=60)
+    # times where now + 59 intervals - now rounds above 59 intervals
+    for index, now in enumerate([53052.811826289624, 10869.842783762573, 490938.1919792217]):
+        assert buckets.take(str(index), now, cost=60) == 0.0
+        assert buckets.take(str(index), now) > 0
+
+
+def test_largest_bulk_start_is_admitted_under_default_settings() -> None:
+    async def from_own_address(scope, receive, send) -> None:
+        # this empties the client's bucket; keep other tests' "testclient" bucket full
+        await app({**scope, "client": ("bulk-starter", 50000)}, receive, send)
+
+    with TestClient(from_own_address) as client:
+        body = {"mission_id": "missing-route", "count": MAX_BULK_SESSIONS}
+        response = client.post("/api/missions/start/bulk", json=body)
+    assert response.status_code == 200
+    assert len(response.json()["sessions"]) == MAX_BULK_SESSIONS
+
+
+def test_repeated_bulk_starts_are_throttled() -> None:
+    client = client_for(burst=60)
+    statuses = [
+        client.post("/api/missions/start/bulk", json={"mission_id": "m", "count": 50}).status_code
+        for _ in range(21)
+    ]
+    assert statuses == [200] + [429] * 20
+
+
+def test_bulk_start_does_not_evict_live_sessions(make_store) -> None:
+    store = make_store(InMemorySessionBackend(max_sessions=10))
+
+    async def run() -> None:
+        live = await store.create_sessions("missing-route", 8, evict=False)
+        with pytest.raises(SessionCapacityError):
+            await store.create_sessions("missing-route", 3, evict=False)
+        assert store.session_count() == 8
+        await store.get_session(live[0].session_id)
+        await store.create_sessions("missing-route", 2, evict=False)
+        assert store.session_count() == 10
+
+    asyncio.run(run())
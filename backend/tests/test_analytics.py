@@ -0,0 +1,95 @@
+import asyncio
+import io
+import random
+from collections import Counter
+
+import numpy as np
+from fastapi.testclient import TestClient
+
+from app.analytics import SOLVE_BUCKETS, TopCommands, normalize_command
+from app.main import app
+from app.missions import MissionStore
+
+
+def test_space_saving_keeps_counts_within_their_error() -> None:
+    rng = random.Random(7)
+    # a few heavy hitters over a long tail of rare commands
+    stream = [f"cmd{min(int(rng.paretovariate(1.2)), 400)}" for _ in range(20_000)]
+    top = TopCommands(capacity=50)
+    for item in stream:
+        top.add(item)
+    truth = Counter(stream)
+
+    kept = top.top()
+    assert len(kept) == 50
+    assert top.total == len(stream)
+    for item, count, error in kept:
+        assert count - error <= truth[item] <= count
+    # anything seen more than total / capacity times must survive
+    frequent = {item for item, seen in truth.items() if seen > len(stream) / 50}
+    assert frequent <= {item for item, _, _ in kept}
+    assert [count for _, count, _ in kept] == sorted((count for _, count, _ in kept), reverse=True)
+
+
+def test_space_saving_replaces_the_smallest_counter() -> None:
+    top = TopCommands(capacity=2)
+    for item in ["a", "a", "a", "b", "c"]:
+        top.add(item)
+    assert top.top() == [("a", 3, 0), ("c", 2, 1)]
+
+
+def test_rejections_are_normalized_like_the_matcher() -> None:
+    assert normalize_command("sudo LS -la /tmp") == normalize_command("ls -al /tmp")
+
+
+def test_report_counts_rejections_hints_and_solves(store: MissionStore) -> None:
+    async def run() -> None:
+        hinted = await store.create_session("sandbox-check")
+        await store.evaluate_command(hinted.session_id, "ls -la")
+        await store.evaluate_command(hinted.session_id, "sudo LS -al")
+        await store.request_hint(hinted.session_id)
+        await store.evaluate_command(hinted.session_id, "pwd")
+        await store.evaluate_command(hinted.session_id, "ls")
+
+        plain = await store.create_session("sandbox-check")
+        await store.evaluate_commands(plain.session_id, ["whoami", "pwd", "ls"])
+
+    asyncio.run(run())
+    report = store.analytics_report("sandbox-check", 10)
+    pwd, ls = report.steps
+    assert (pwd.step_id, pwd.rejections, pwd.hints, pwd.solves, pwd.solves_after_hint) == ("pwd", 3, 1, 2, 1)
+    assert [(entry.command, entry.count) for entry in pwd.top_rejected] == [
+        (normalize_command("ls -la"), 2),
+        ("whoami", 1),
+    ]
+    assert (ls.rejections, ls.hints, ls.solves, ls.solves_after_hint) == (0, 0, 2, 0)
+    assert report.completions == 2
+    assert sum(bucket.count for bucket in report.solve_time_buckets) == 2
+    assert report.solve_time_buckets[-1].le_seconds is None
+
+
+def test_npz_export_holds_the_same_aggregates(store: MissionStore) -> None:
+    async def run() -> None:
+        session = await store.create_session("sandbox-check")
+        await store.evaluate_commands(session.session_id, ["whoami", "whoami", "pwd", "ls"])
+
+    asyncio.run(run())
+    with np.load(io.BytesIO(store.analytics_export("sandbox-check"))) as arrays:
+        assert list(arrays["step_ids"]) == ["pwd", "ls"]
+        assert list(arrays["rejections"]) == [2, 0]
+        assert list(arrays["solves"]) == [1, 1]
+        assert list(arrays["rejected_step"]) == [0]
+        assert list(arrays["rejected_command"]) == ["whoami"]
+        assert list(arrays["rejected_count"]) == [2]
+        assert list(arrays["solve_time_bounds"]) == [*SOLVE_BUCKETS, np.inf]
+        assert arrays["solve_time_counts"].sum() == 1
+
+
+def test_export_route_serves_an_npz_file() -> None:
+    with TestClient(app) as client:
+        response = client.get("/api/missions/sandbox-check/analytics/export")
+        assert response.status_code == 200
+        assert "sandbox-check-analytics.npz" in response.headers["content-disposition"]
+        with np.load(io.BytesIO(response.content)) as arrays:
+            assert list(arrays["step_ids"]) == ["pwd", "ls"]
+        assert client.get("/api/missions/nope/analytics/export").status_code == 404
@@ -0,0 +1,78 @@
+import asyncio
+import uuid
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.missions import MissionStore
+from app.schemas import MAX_BATCH_COMMANDS
+
+
+def start(client: TestClient, **fields) -> str:
+    return client.post("/api/missions/start", json={"mission_id": "sandbox-check", **fields}).json()["session_id"]
+
+
+def test_batch_stops_once_the_mission_is_complete() -> None:
+    with TestClient(app) as client:
+        url = f"/api/missions/{start(client)}/commands"
+        partial = client.post(url, json={"commands": ["whoami", "pwd"]}).json()
+        assert (partial["evaluated"], partial["stopped_early"]) == (2, False)
+        assert [result["accepted"] for result in partial["results"]] == [False, True]
+
+        finished = client.post(url, json={"commands": ["ls", "whoami", "pwd"]}).json()
+        assert (finished["evaluated"], finished["stopped_early"]) == (1, True)
+        assert finished["results"][0]["mission_complete"]
+        # the commands after completion were never evaluated, so they are no mistakes
+        assert client.get(url.removesuffix("/commands")).json()["mistakes"] == 1
+
+
+def test_batch_stops_once_the_clock_runs_out(store: MissionStore) -> None:
+    async def run() -> list:
+        session = await store.create_session("sandbox-check")
+        # out of time, but still within the retention window
+        session.started_ms -= session.time_limit_seconds * 1000 + 1
+        return await store.evaluate_commands(session.session_id, ["pwd", "ls"])
+
+    (result,) = asyncio.run(run())
+    assert not result.accepted
+
+
+def test_batch_size_is_validated() -> None:
+    with TestClient(app) as client:
+        url = f"/api/missions/{start(client)}/commands"
+        assert client.post(url, json={"commands": []}).status_code == 422
+        assert client.post(url, json={"commands": [""]}).status_code == 422
+        assert client.post(url, json={"commands": ["pwd"] * (MAX_BATCH_COMMANDS + 1)}).status_code == 422
+        assert client.post("/api/missions/missing/commands", json={"commands": ["pwd"]}).status_code == 404
+
+
+def test_bulk_start_places_every_session_in_the_cohort() -> None:
+    cohort_id = f"class-{uuid.uuid4().hex[:8]}.a_1"
+    with TestClient(app) as client:
+        body = {"mission_id": "sandbox-check", "count": 3, "cohort_id": cohort_id}
+        response = client.post("/api/missions/start/bulk", json=body)
+        assert response.status_code == 200
+        bulk = [started["session_id"] for started in response.json()["sessions"]]
+        assert len(set(bulk)) == 3
+        single = start(client, cohort_id=cohort_id, player_name="ada")
+        client.post(f"/api/missions/{single}/command", json={"command": "pwd"})
+
+        progress = client.get(f"/api/cohorts/{cohort_id}").json()
+        assert progress["cohort_id"] == cohort_id
+        assert progress["sessions"] == 4
+        assert sorted(member["session_id"] for member in progress["members"]) == sorted([*bulk, single])
+        assert {(step["step_id"], step["sessions"]) for step in progress["steps"]} == {("pwd", 3), ("ls", 1)}
+        assert client.get(f"/api/cohorts/{cohort_id}-other").status_code == 404
+        assert client.post("/api/missions/start/bulk", json={"mission_id": "missing", "count": 1}).status_code == 404
+
+
+def test_cohort_ids_are_validated() -> None:
+    with TestClient(app) as client:
+        for cohort_id in ("", "has space", "semi;colon", "x" * 65):
+            single = client.post("/api/missions/start", json={"mission_id": "sandbox-check", "cohort_id": cohort_id})
+            bulk = client.post(
+                "/api/missions/start/bulk", json={"mission_id": "sandbox-check", "count": 1, "cohort_id": cohort_id}
+            )
+            assert (single.status_code, bulk.status_code) == (422, 422)
+        empty = client.post("/api/missions/start/bulk", json={"mission_id": "sandbox-check", "count": 0})
+        assert empty.status_code == 422
@@ -0,0 +1,70 @@
+import asyncio
+import shutil
+from pathlib import Path
+
+import pytest
+
+from app.catalog import (
+    BUILTIN_MISSIONS_DIR,
+    CatalogError,
+    MissionCatalogLoader,
+    cache_version,
+    load_into,
+    parse_missions,
+    watch_catalog,
+)
+from app.config import Settings
+from app.missions import MissionStore
+
+yaml = pytest.importorskip("yaml")
+
+BROKEN_YAML = b"id: extra\nsteps: [unclosed\n"
+
+
+def test_yaml_syntax_error_is_a_catalog_error() -> None:
+    with pytest.raises(CatalogError, match="broken.yaml"):
+        parse_missions("broken.yaml", BROKEN_YAML)
+
+
+def test_watcher_survives_a_malformed_file(tmp_path: Path) -> None:
+    shutil.copy(BUILTIN_MISSIONS_DIR / "010-missing-route.json", tmp_path)
+    loader = MissionCatalogLoader(tmp_path)
+    store = MissionStore()
+    load_into(store, loader)
+    broken = tmp_path / "020-extra.yaml"
+
+    async def run() -> None:
+        watcher = asyncio.create_task(watch_catalog(store, loader, 0.01))
+        try:
+            broken.write_bytes(BROKEN_YAML)
+            await asyncio.sleep(0.2)
+            assert not watcher.done()
+            assert [summary.id for summary in store.list_missions()] == ["missing-route"]
+
+            document = yaml.safe_load((BUILTIN_MISSIONS_DIR / "020-log-chaos.json").read_text())
+            broken.write_text(yaml.safe_dump(document))
+            for _ in range(100):
+                await asyncio.sleep(0.02)
+                if len(store.list_missions()) == 2:
+                    break
+            assert not watcher.done()
+            assert sorted(summary.id for summary in store.list_missions()) == ["log-chaos", "missing-route"]
+        finally:
+            watcher.cancel()
+
+    asyncio.run(run())
+
+
+def test_cache_is_keyed_by_the_compiling_code(tmp_path: Path) -> None:
+    assert Settings().mission_cache_dir is None
+    cache = tmp_path / "cache"
+    missions = MissionCatalogLoader(BUILTIN_MISSIONS_DIR, cache_dir=cache).load()
+    entries = sorted(path.name for path in cache.iterdir())
+    assert entries and all(name.endswith(f".{cache_version()}.pickle") for name in entries)
+
+    # an entry from another version of the code is never read
+    for path in cache.iterdir():
+        path.rename(path.with_name(path.name.replace(cache_version(), "stale")))
+    cached = MissionCatalogLoader(BUILTIN_MISSIONS_DIR, cache_dir=cache).load()
+    assert [mission.id for mission in cached] == [mission.id for mission in missions]
+    assert len(list(cache.iterdir())) == 2 * len(entries)
@@ -0,0 +1,28 @@
+import asyncio
+import dataclasses
+
+import pytest
+
+from app.sessions import InMemorySessionBackend, SQLiteSessionBackend
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, make_store, tmp_path):
+    if request.param == "memory":
+        return make_store(InMemorySessionBackend())
+    return make_store(SQLiteSessionBackend(str(tmp_path / "sessions.db")))
+
+
+def test_steps_are_named_from_each_sessions_pinned_mission(store) -> None:
+    async def run():
+        old = store.get_mission("sandbox-check")
+        first = await store.create_session("sandbox-check", cohort_id="c1")
+        await store.evaluate_commands(first.session_id, ["pwd"])
+        # a reload that reorders the steps must not rename the step running sessions are on
+        store.replace_missions([dataclasses.replace(old, steps=old.steps[::-1], version="")])
+        await store.create_session("sandbox-check", cohort_id="c1")
+        return old, await store.cohort_progress("c1")
+
+    old, progress = asyncio.run(run())
+    steps = {(step.step_index, step.step_id): step.sessions for step in progress.steps}
+    assert steps == {(1, old.steps[1].id): 1, (0, old.steps[1].id): 1}
@@ -0,0 +1,58 @@
+import gzip
+
+from fastapi import FastAPI, Response
+from fastapi.testclient import TestClient
+
+from app import responses
+from app.main import app
+from app.responses import CompressionMiddleware
+
+GZIP = {"accept-encoding": "gzip"}
+
+
+def test_compressed_catalog_round_trip() -> None:
+    with TestClient(app) as client:
+        identity = client.get("/api/missions", headers={"accept-encoding": "identity"})
+        compressed = client.get("/api/missions", headers=GZIP)
+        assert compressed.status_code == 200
+        assert compressed.headers["content-encoding"] == "gzip"
+        assert compressed.content == identity.content
+        etag = compressed.headers["etag"]
+        assert etag == "W/" + identity.headers["etag"]
+
+        revalidated = client.get("/api/missions", headers={**GZIP, "if-none-match": etag})
+        assert revalidated.status_code == 304
+        assert revalidated.content == b""
+        assert revalidated.headers["etag"] == etag
+        assert "accept-encoding" in revalidated.headers["vary"].lower()
+        assert client.get("/api/missions", headers={"if-none-match": identity.headers["etag"]}).status_code == 304
+
+
+def test_bodies_with_a_strong_etag_are_compressed_once(monkeypatch) -> None:
+    calls = []
+    compress = gzip.compress
+    monkeypatch.setattr(responses.gzip, "compress", lambda body, **kwargs: calls.append(body) or compress(body))
+    state = {"etag": '"v1"', "body": b"x" * 2048}
+
+    demo = FastAPI()
+
+    @demo.get("/tagged")
+    async def tagged() -> Response:
+        return Response(content=state["body"], headers={"ETag": state["etag"]})
+
+    @demo.get("/untagged")
+    async def untagged() -> Response:
+        return Response(content=state["body"])
+
+    demo.add_middleware(CompressionMiddleware, minimum_size=1024)
+    client = TestClient(demo)
+
+    for _ in range(3):
+        assert client.get("/tagged", headers=GZIP).content == state["body"]
+    assert len(calls) == 1
+    state.update(etag='"v2"', body=b"y" * 2048)
+    assert client.get("/tagged", headers=GZIP).content == b"y" * 2048
+    assert len(calls) == 2
+    for _ in range(2):
+        client.get("/untagged", headers=GZIP)
+    assert len(calls) == 4
@@ -0,0 +1,94 @@
+import asyncio
+import json
+from datetime import datetime, timedelta
+
+from fastapi.testclient import TestClient
+
+from app.events import HEARTBEAT_EVENT, TIMEOUT_EVENT, SessionEvents
+from app.main import app, format_sse, lifespan
+from app.missions import store
+
+
+def parse_sse(chunk: bytes) -> dict:
+    fields = dict(line.split(": ", 1) for line in chunk.decode().splitlines() if line)
+    return {"event": fields["event"], **json.loads(fields["data"])}
+
+
+def test_stream_sends_status_changes_until_the_session_is_gone() -> None:
+    async def run() -> None:
+        async with lifespan(app):
+            session = await store.create_session("sandbox-check")
+            sent: asyncio.Queue = asyncio.Queue()
+            disconnected = asyncio.Event()
+
+            async def receive() -> dict:
+                await disconnected.wait()
+                return {"type": "http.disconnect"}
+
+            scope = {
+                "type": "http",
+                "method": "GET",
+                "path": f"/api/missions/{session.session_id}/events",
+                "raw_path": b"",
+                "query_string": b"",
+                "headers": [],
+                "http_version": "1.1",
+                "scheme": "http",
+                "server": ("testserver", 80),
+                "client": ("testclient", 1),
+                "root_path": "",
+            }
+            stream = asyncio.create_task(app(scope, receive, sent.put))
+
+            async def next_body() -> bytes:
+                return (await asyncio.wait_for(sent.get(), 5))["body"]
+
+            start = await asyncio.wait_for(sent.get(), 5)
+            assert start["status"] == 200
+            assert (b"content-type", b"text/event-stream; charset=utf-8") in start["headers"]
+            assert await next_body() == b"retry: 5000\n\n"
+            snapshot = parse_sse(await next_body())
+            assert (snapshot["event"], snapshot["reason"], snapshot["data"]["step_index"]) == ("status", "snapshot", 0)
+            assert store.events.subscriber_count() == 1
+
+            await store.evaluate_command(session.session_id, "whoami")
+            mistake = parse_sse(await next_body())
+            assert (mistake["reason"], mistake["data"]["mistakes"]) == ("mistake", 1)
+            await store.hint(session.session_id)
+            assert parse_sse(await next_body())["reason"] == "hint"
+            await store.evaluate_command(session.session_id, "pwd")
+            step = parse_sse(await next_body())
+            assert (step["reason"], step["data"]["step_index"]) == ("step", 1)
+
+            await store.reap_expired(datetime.utcnow() + timedelta(days=1))
+            assert parse_sse(await next_body()) == {"event": "gone", "type": "gone", "detail": "Session expired"}
+            # the stream ends after the session is gone, and drops its subscription
+            while (await asyncio.wait_for(sent.get(), 5)).get("more_body", False):
+                pass
+            await asyncio.wait_for(stream, 5)
+            assert store.events.subscriber_count() == 0
+
+    asyncio.run(run())
+
+
+def test_stream_is_refused_for_unknown_sessions() -> None:
+    with TestClient(app) as client:
+        assert client.get("/api/missions/missing/events").status_code == 404
+
+
+def test_heartbeats_are_comments_and_timeouts_reach_subscribers() -> None:
+    assert format_sse(HEARTBEAT_EVENT) == b": heartbeat\n\n"
+
+    async def run() -> None:
+        events = SessionEvents()
+        deadline = datetime.utcnow() + timedelta(seconds=30)
+        due = events.subscribe("due", expires_at=deadline)
+        finished = events.subscribe("finished", expires_at=deadline)
+        events.cancel_deadline("finished")
+        assert events.publish_due_deadlines(deadline - timedelta(seconds=1)) == 0
+        assert events.publish_due_deadlines(deadline) == 1
+        await asyncio.sleep(0)
+        assert due.queue.get_nowait() == TIMEOUT_EVENT
+        assert finished.queue.empty()
+
+    asyncio.run(run())
@@ -0,0 +1,40 @@
+import io
+import json
+
+import pytest
+
+from app.catalog import BUILTIN_MISSIONS_DIR
+from app.grade import _load_catalog, grade_chunk, grade_stream
+
+
+@pytest.fixture(scope="module", autouse=True)
+def catalog() -> None:
+    _load_catalog(str(BUILTIN_MISSIONS_DIR), None)
+
+
+def test_a_malformed_record_does_not_abort_its_chunk() -> None:
+    lines = [
+        {"id": "a", "mission_id": ["sandbox-check"], "commands": ["pwd"]},
+        {"id": "b", "mission_id": {"id": "sandbox-check"}, "commands": ["pwd"]},
+        {"id": "c", "mission_id": "sandbox-check", "commands": "pwd"},
+        {"id": "d", "mission_id": "sandbox-check", "commands": ["pwd", "ls"]},
+    ]
+    chunk = [(number, json.dumps(line).encode()) for number, line in enumerate(lines, start=1)]
+    results = [json.loads(line) for line in grade_chunk(chunk).splitlines()]
+    assert [result.get("line") for result in results[:3]] == [1, 2, 3]
+    assert all(result["error"].startswith("invalid transcript") for result in results[:3])
+    assert results[3]["id"] == "d" and results[3]["completed"]
+
+
+def test_unknown_and_truncated_transcripts_get_an_error() -> None:
+    source = io.BytesIO(
+        b'{"id": "x", "mission_id": "nope", "commands": []}\n'
+        b'{"session_id": "y", "mission_id": "sandbox-check", "commands": ["ls"], "truncated": true}\n'
+        b"not json\n"
+    )
+    sink = io.StringIO()
+    assert grade_stream(source, sink, str(BUILTIN_MISSIONS_DIR)) == 3
+    unknown, truncated, garbage = (json.loads(line) for line in sink.getvalue().splitlines())
+    assert unknown["error"] == "unknown mission"
+    assert truncated["id"] == "y" and truncated["error"].startswith("truncated transcript")
+    assert garbage["line"] == 3
@@ -0,0 +1,120 @@
+from app.host import OVERLAY_LOG_LINES, HostExpectation, HostImage, HostLimits, HostOverlay, HostUnit, HostView
+
+IMAGE = HostImage.build(
+    hostname="web01",
+    user="ops",
+    home="/home/ops",
+    cwd="/home/ops",
+    files={"/etc/app.conf": "port=80\n", "/var/log/app.log": "started\n", "/srv/old/": ""},
+    interfaces={"eth0": "10.0.0.5/24"},
+    routes=["10.0.0.0/24 dev eth0"],
+    units={"nginx": HostUnit(description="nginx", state="failed")},
+    logs={"nginx": ["boot"]},
+)
+
+
+def run(host: HostView, *commands: str) -> list:
+    output = []
+    for command in commands:
+        output.extend(host.run(command).output)
+    return output
+
+
+def test_reads_fall_through_to_the_image() -> None:
+    host = HostView(IMAGE)
+    assert run(host, "cat /etc/app.conf") == ["port=80"]
+    assert run(host, "ls /srv") == ["old"]
+    assert host.overlay.empty
+    assert not host.changed
+
+
+def test_changes_stay_in_the_overlay() -> None:
+    host = HostView(IMAGE)
+    run(
+        host,
+        "echo port=8080 > /etc/app.conf",
+        "rm /var/log/app.log",
+        "mkdir -p /srv/new/a",
+        "rm -r /srv/old",
+        "ip route add default via 10.0.0.1",
+        "systemctl restart nginx",
+    )
+    assert host.changed
+    assert host.read("/etc/app.conf") == "port=8080\n"
+    assert not host.exists("/var/log/app.log")
+    assert run(host, "ls /srv") == ["new"]
+    assert host.routes[0] == "default via 10.0.0.1 dev eth0"
+    assert host.unit_state("nginx") == "active"
+
+    fresh = HostView(IMAGE)
+    assert fresh.read("/etc/app.conf") == "port=80\n"
+    assert fresh.exists("/var/log/app.log")
+    assert run(fresh, "ls /srv") == ["old"]
+    assert fresh.routes == ("10.0.0.0/24 dev eth0",)
+    assert fresh.unit_state("nginx") == "failed"
+
+
+def test_undoing_a_change_empties_the_overlay() -> None:
+    host = HostView(IMAGE)
+    run(host, "ip route add default via 10.0.0.1", "ip route del default", "touch /tmp/x", "rm /tmp/x", "cd /")
+    run(host, "cd ~")
+    assert host.overlay.empty
+
+
+def test_overlay_round_trips_through_a_dict() -> None:
+    host = HostView(IMAGE)
+    run(host, "cd /tmp", "touch notes", "rm -r /srv/old", "ip route add default via 10.0.0.1", "systemctl stop nginx")
+    restored = HostView(IMAGE, HostOverlay.from_dict(host.overlay.to_dict()))
+    assert restored.overlay == host.overlay
+    assert run(restored, "pwd", "ls") == ["/tmp", "notes"]
+
+
+def test_expectations_read_the_overlaid_host() -> None:
+    expect = HostExpectation(
+        routes=("default",),
+        units={"nginx": "active"},
+        files={"/etc/app.conf": "8080"},
+        absent=("/var/log/app.log",),
+    )
+    host = HostView(IMAGE)
+    assert not expect.met_by(host)
+    run(host, "ip route add default via 10.0.0.1", "systemctl start nginx", "echo port=8080 > /etc/app.conf")
+    assert not expect.met_by(host)
+    run(host, "rm /var/log/app.log")
+    assert expect.met_by(host)
+
+
+def test_appending_past_the_byte_limit_fails_without_changing_the_file() -> None:
+    host = HostView(IMAGE, limits=HostLimits(max_bytes=32))
+    assert run(host, *["echo 0123456789 >> /tmp/big"] * 2) == []
+    host.changed = False
+    assert run(host, "echo 0123456789 >> /tmp/big") == ["bash: /tmp/big: No space left on device"]
+    assert host.read("/tmp/big") == "0123456789\n" * 2
+    assert not host.changed
+    # overwriting with less still works
+    assert run(host, "echo small > /tmp/big") == []
+
+
+def test_new_entries_past_the_entry_limit_are_refused() -> None:
+    host = HostView(IMAGE, limits=HostLimits(max_entries=2))
+    assert run(host, "touch /tmp/a", "mkdir /tmp/b") == []
+    assert run(host, "touch /tmp/c", "mkdir /tmp/d", "echo x > /tmp/e") == [
+        "touch: cannot touch '/tmp/c': No space left on device",
+        "mkdir: cannot create directory '/tmp/d': No space left on device",
+        "bash: /tmp/e: No space left on device",
+    ]
+    # existing entries can still be rewritten and removed
+    assert run(host, "echo x > /tmp/a", "rm /tmp/a", "touch /tmp/c") == []
+
+
+def test_routes_are_capped() -> None:
+    host = HostView(IMAGE, limits=HostLimits(max_entries=2))
+    assert run(host, "ip route add default via 10.0.0.1") == []
+    assert run(host, "ip route add 10.1.0.0/16 via 10.0.0.1") == ["RTNETLINK answers: No buffer space available"]
+
+
+def test_the_overlay_journal_keeps_its_latest_lines() -> None:
+    host = HostView(IMAGE)
+    run(host, *["systemctl restart nginx"] * (OVERLAY_LOG_LINES + 5))
+    assert len(host.overlay.logs["nginx"]) == OVERLAY_LOG_LINES
+    assert host.journal("nginx")[0] == "boot"
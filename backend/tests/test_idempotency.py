@@ -0,0 +1,116 @@
+import asyncio
+import json
+import sys
+import threading
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.idempotency import IdempotencyConflict, ReplyCache
+from app.main import app
+from app.missions import MissionStore
+
+
+def test_retry_replays_the_first_reply_without_evaluating_again(store: MissionStore) -> None:
+
+    async def run() -> None:
+        session = await store.create_session("missing-route")
+        first, replayed = await store.submit_command(session.session_id, "not a command", "k1")
+        assert not replayed
+        again, replayed = await store.submit_command(session.session_id, "not a command", "k1")
+        assert replayed
+        assert again == first
+        assert json.loads(first)["mistakes"] == 1
+        assert (await store.get_session(session.session_id)).mistakes == 1
+        # a new key is a new command
+        _, replayed = await store.submit_command(session.session_id, "not a command", "k2")
+        assert not replayed
+        assert (await store.get_session(session.session_id)).mistakes == 2
+
+    asyncio.run(run())
+
+
+def test_concurrent_retries_are_evaluated_once(store: MissionStore) -> None:
+
+    async def run() -> None:
+        session = await store.create_session("missing-route")
+        replies = await asyncio.gather(
+            *(store.submit_command(session.session_id, "ip addr", "k1") for _ in range(5))
+        )
+        assert sorted(replayed for _, replayed in replies) == [False, True, True, True, True]
+        assert len({body for body, _ in replies}) == 1
+        assert (await store.get_session(session.session_id)).step_index == 1
+
+    asyncio.run(run())
+
+
+def test_key_reused_for_another_command_conflicts(store: MissionStore) -> None:
+
+    async def run() -> None:
+        session = await store.create_session("missing-route")
+        await store.submit_command(session.session_id, "ip addr", "k1")
+        with pytest.raises(IdempotencyConflict):
+            await store.submit_command(session.session_id, "ip route", "k1")
+        assert (await store.get_session(session.session_id)).step_index == 1
+
+    asyncio.run(run())
+
+
+def test_reply_cache_bounds() -> None:
+    cache = ReplyCache(per_session=2, ttl_seconds=1.0, max_sessions=2)
+    for key in ("a", "b", "c"):
+        cache.put("s1", key, "ls", key.encode(), now_ms=0)
+    # only the two most recent replies of a session are kept
+    assert cache.get("s1", "a", 0) is None
+    assert cache.get("s1", "c", 0).body == b"c"
+    cache.put("s2", "a", "ls", b"", now_ms=0)
+    cache.put("s3", "a", "ls", b"", now_ms=0)
+    # and only the two sessions that stored a reply most recently
+    assert cache.get("s1", "c", 0) is None
+    assert len(cache) == 2
+    # replies expire after the ttl, and are swept as later ones arrive
+    assert cache.get("s3", "a", 1000) is None
+    cache.put("s4", "a", "ls", b"", now_ms=1000)
+    assert len(cache) == 1
+
+
+def test_reply_count_can_be_read_from_another_thread() -> None:
+    # the metrics gauge counts replies on the thread rendering /metrics
+    cache = ReplyCache(per_session=4, ttl_seconds=1.0, max_sessions=500)
+    errors = []
+    done = threading.Event()
+
+    def count() -> None:
+        while not done.is_set():
+            try:
+                len(cache)
+            except RuntimeError as exc:
+                errors.append(exc)
+                return
+
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    reader = threading.Thread(target=count)
+    reader.start()
+    try:
+        for now_ms in range(50_000):
+            cache.put(f"s{now_ms % 700}", f"k{now_ms}", "ls", b"", now_ms)
+    finally:
+        done.set()
+        reader.join()
+        sys.setswitchinterval(interval)
+    assert errors == []
+
+
+def test_route_marks_replays_and_answers_conflicts_with_422() -> None:
+    with TestClient(app) as client:
+        session_id = client.post("/api/missions/start", json={"mission_id": "missing-route"}).json()["session_id"]
+        url = f"/api/missions/{session_id}/command"
+        first = client.post(url, json={"command": "ip addr"}, headers={"Idempotency-Key": "k1"})
+        again = client.post(url, json={"command": "ip addr"}, headers={"Idempotency-Key": "k1"})
+        conflict = client.post(url, json={"command": "ip route"}, headers={"Idempotency-Key": "k1"})
+    assert first.status_code == again.status_code == 200
+    assert "idempotent-replayed" not in first.headers
+    assert again.headers["idempotent-replayed"] == "true"
+    assert again.content == first.content
+    assert conflict.status_code == 422
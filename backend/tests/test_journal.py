@@ -0,0 +1,66 @@
+import asyncio
+import os
+import threading
+import time
+
+import pytest
+
+from app import journal as journal_module
+from app.journal import SessionJournal
+from app.sessions import InMemorySessionBackend, MissionSession
+
+
+def test_a_failed_fsync_fails_its_waiters_and_is_retried(tmp_path, monkeypatch) -> None:
+    journal = SessionJournal(tmp_path, sync="commit")
+    journal.start()
+    fsync = os.fsync
+    failures = []
+
+    def broken_fsync(descriptor: int) -> None:
+        failures.append(descriptor)
+        raise OSError(28, "No space left on device")
+
+    async def scenario() -> None:
+        monkeypatch.setattr(journal_module.os, "fsync", broken_fsync)
+        journal.record_session(MissionSession(session_id="a", mission_id="m"))
+        with pytest.raises(OSError, match="No space left"):
+            await asyncio.wait_for(journal.flushed(), 5)
+        # the flusher survived and writes both records once the disk recovers
+        monkeypatch.setattr(journal_module.os, "fsync", fsync)
+        journal.record_session(MissionSession(session_id="b", mission_id="m"))
+        await asyncio.wait_for(journal.flushed(), 5)
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        journal.close()
+    assert failures
+
+    backend = InMemorySessionBackend()
+    assert SessionJournal(tmp_path).recover(backend) == 2
+    assert backend.get("a") is not None and backend.get("b") is not None
+
+
+def test_commands_are_served_while_a_snapshot_runs(store, tmp_path, monkeypatch) -> None:
+    store.attach_journal(SessionJournal(tmp_path, sync="interval"))
+    released = threading.Event()
+
+    async def scenario() -> float:
+        sessions = await store.create_sessions("sandbox-check", 1000)
+        # every fsync the snapshot makes now blocks until the command below is done
+        monkeypatch.setattr(journal_module.os, "fsync", lambda descriptor: released.wait(5))
+        snapshot = asyncio.get_running_loop().run_in_executor(None, store.snapshot_journal)
+        await asyncio.sleep(0.1)
+        started = time.monotonic()
+        response = await store.evaluate_command(sessions[0].session_id, "pwd")
+        elapsed = time.monotonic() - started
+        assert response.accepted
+        assert not snapshot.done()
+        released.set()
+        assert await snapshot == 1000
+        return elapsed
+
+    try:
+        assert asyncio.run(scenario()) < 1
+    finally:
+        released.set()
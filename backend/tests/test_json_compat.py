@@ -0,0 +1,36 @@
+import asyncio
+from typing import Any, List
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from pydantic import BaseModel
+from starlette.responses import JSONResponse
+
+from app.responses import FastJSONResponse
+from benchmarks.bench_json import AWKWARD_FLOATS, AWKWARD_NAMES, awkward_models, played_models
+
+MODELS: List[BaseModel] = asyncio.run(played_models(len(AWKWARD_NAMES))) + awkward_models()
+PLAIN: List[Any] = [{"detail": name or "-"} for name in AWKWARD_NAMES] + [{"values": AWKWARD_FLOATS, "none": None}]
+
+
+@pytest.fixture(scope="module")
+def standard_bodies() -> List[bytes]:
+    # each model returned the standard way: validated against response_model, jsonable_encoder, JSONResponse
+    app = FastAPI()
+    for index, model in enumerate(MODELS):
+        app.add_api_route(f"/{index}", lambda model=model: model, response_model=type(model))
+    with TestClient(app) as client:
+        return [client.get(f"/{index}").content for index in range(len(MODELS))]
+
+
+@pytest.mark.parametrize(
+    "index", range(len(MODELS)), ids=[f"{type(model).__name__}-{index}" for index, model in enumerate(MODELS)]
+)
+def test_models_serialize_to_the_standard_bytes(index: int, standard_bodies: List[bytes]) -> None:
+    assert FastJSONResponse(MODELS[index]).body == standard_bodies[index]
+
+
+@pytest.mark.parametrize("content", PLAIN)
+def test_plain_content_serializes_to_the_standard_bytes(content: Any) -> None:
+    assert FastJSONResponse(content).body == JSONResponse(content).body
@@ -0,0 +1,105 @@
+from typing import Callable, Iterator
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.leaderboard import InMemoryLeaderboards, Leaderboards, RankedRun, SQLiteLeaderboards
+from app.main import app
+from app.schemas import MAX_LEADERBOARD_PAGE
+from app.sessions import SQLiteSessionBackend
+
+
+def run(session_id: str, score: int, mistakes: int = 0, elapsed_ms: int = 60_000, at: float = 1.0) -> RankedRun:
+    return RankedRun("m", session_id, f"player-{session_id}", score, mistakes, elapsed_ms, 1_700_000_000 + at)
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def boards(request, tmp_path) -> Iterator[Callable[[int], Leaderboards]]:
+    backends = []
+
+    def make(max_entries: int = 1000) -> Leaderboards:
+        if request.param == "memory":
+            return InMemoryLeaderboards(max_entries)
+        backend = SQLiteSessionBackend(str(tmp_path / f"sessions-{len(backends)}.db"))
+        backends.append(backend)
+        return SQLiteLeaderboards(backend, max_entries)
+
+    yield make
+    for backend in backends:
+        backend.close()
+
+
+def record(board: Leaderboards, *runs: RankedRun) -> None:
+    for ranked in runs:
+        if isinstance(board, SQLiteLeaderboards):
+            # the store records inside the session's write transaction
+            with board.backend._write():
+                board.record(ranked)
+        else:
+            board.record(ranked)
+
+
+def ids(board: Leaderboards, offset: int = 0, limit: int = 100) -> list:
+    return [(rank, ranked.session_id) for rank, ranked in board.page("m", offset, limit)[1]]
+
+
+def test_runs_are_ranked_by_score_then_mistakes_then_time(boards) -> None:
+    board = boards()
+    record(
+        board,
+        run("slow", 300, elapsed_ms=90_000),
+        run("low", 100),
+        run("sloppy", 300, mistakes=2),
+        run("best", 300),
+        run("late", 300, elapsed_ms=90_000, at=5),
+    )
+    assert ids(board) == [(1, "best"), (2, "slow"), (3, "late"), (4, "sloppy"), (5, "low")]
+    assert board.rank("m", "sloppy")[0] == 4
+    assert board.rank("m", "missing") is None
+    assert board.page("other", 0, 10) == (0, [])
+
+
+def test_full_ties_are_broken_by_session_id(boards) -> None:
+    board = boards()
+    record(board, run("b", 200), run("a", 200), run("c", 200))
+    assert ids(board) == [(1, "a"), (2, "b"), (3, "c")]
+    assert board.rank("m", "c") == (3, run("c", 200))
+
+
+def test_pages_keep_absolute_ranks(boards) -> None:
+    board = boards()
+    record(board, *(run(f"s{score:03d}", score) for score in range(10)))
+    total, page = board.page("m", 3, 4)
+    assert total == 10
+    assert [(rank, ranked.total_score) for rank, ranked in page] == [(4, 6), (5, 5), (6, 4), (7, 3)]
+    assert board.page("m", 8, 4)[1][-1][0] == 10
+    assert board.page("m", 10, 4) == (10, [])
+
+
+def test_only_the_best_runs_are_kept(boards) -> None:
+    board = boards(max_entries=3)
+    record(board, *(run(f"s{score}", score) for score in (50, 10, 40, 30, 20)))
+    assert ids(board) == [(1, "s50"), (2, "s40"), (3, "s30")]
+    assert board.rank("m", "s10") is None
+    # a run recorded again replaces its earlier entry
+    record(board, run("s30", 60))
+    assert ids(board) == [(1, "s30"), (2, "s50"), (3, "s40")]
+
+
+def test_sqlite_board_is_shared_by_every_connection(tmp_path) -> None:
+    path = str(tmp_path / "sessions.db")
+    writer = SQLiteSessionBackend(path)
+    record(SQLiteLeaderboards(writer), run("a", 100), run("b", 200))
+    reader = SQLiteSessionBackend(path)
+    assert ids(SQLiteLeaderboards(reader)) == [(1, "b"), (2, "a")]
+    writer.close()
+    reader.close()
+
+
+def test_route_validates_the_page() -> None:
+    with TestClient(app) as client:
+        url = "/api/missions/sandbox-check/leaderboard"
+        assert client.get(url, params={"limit": MAX_LEADERBOARD_PAGE}).status_code == 200
+        assert client.get(url, params={"limit": MAX_LEADERBOARD_PAGE + 1}).status_code == 422
+        assert client.get(url, params={"offset": -1}).status_code == 422
+        assert client.get("/api/missions/nope/leaderboard").status_code == 404
@@ -0,0 +1,72 @@
+import pytest
+
+from app.matching import MAX_SUBSET_FLAGS, CommandMatcher, parse_command
+
+STEP = CommandMatcher(
+    [
+        "ip route add default via 10.0.0.1",
+        "ls -la",
+        "journalctl -u web-api --since -5m",
+        "tar --create --gzip --file backup.tgz /etc",
+    ]
+)
+
+
+def test_parse_command_normalizes_case_sudo_and_flags() -> None:
+    shape = parse_command("  SUDO sudo LS -al --Color -- -x ")
+    assert shape.argv == ("ls", "-x")
+    assert shape.flags == frozenset({"-a", "-l", "--color"})
+    # negative numbers are values, not options
+    assert parse_command("journalctl --since -5m").argv == ("journalctl", "-5m")
+    assert parse_command("grep 'two words' file").argv == ("grep", "two words", "file")
+
+
+@pytest.mark.parametrize(
+    "command",
+    [
+        "ip route add default via 10.0.0.1",
+        "sudo ip route add default via 10.0.0.1",
+        "IP Route Add Default Via 10.0.0.1",
+        "ip route add default via 10.0.0.1 dev eth0",
+        "ls -la",
+        "ls -al",
+        "ls -l -a",
+        "ls -a -l -h /var/log",
+        "ls /var/log -la",
+        "journalctl -u web-api --since -5m --no-pager",
+        "tar --file backup.tgz --gzip --create /etc",
+        "tar -v --create --gzip --file backup.tgz /etc",
+    ],
+)
+def test_accepted_variants(command: str) -> None:
+    assert STEP.matches(command)
+
+
+@pytest.mark.parametrize(
+    "command",
+    [
+        "",
+        "sudo",
+        "ip route",
+        "ip route add default via 10.0.0.2",
+        "ls",
+        "ls -l",
+        "journalctl -u web-api",
+        # option values are positional, so they keep their order
+        "journalctl --since -5m -u web-api",
+        "tar --create --file backup.tgz /etc",
+        "route ip add default via 10.0.0.1",
+    ],
+)
+def test_rejected_variants(command: str) -> None:
+    assert not STEP.matches(command)
+
+
+def test_many_flags_fall_back_to_scanning_the_node() -> None:
+    flags = " ".join(f"--flag{index}" for index in range(MAX_SUBSET_FLAGS + 4))
+    assert STEP.matches(f"ls -la {flags}")
+    assert not STEP.matches(f"ls -l {flags}")
+
+
+def test_variants_are_counted() -> None:
+    assert STEP.variant_count == 4
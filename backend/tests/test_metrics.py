@@ -0,0 +1,69 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.metrics import CONTENT_TYPE, Counter, Gauge, Histogram, Registry
+
+
+def samples(text: str) -> dict:
+    lines = [line.rsplit(" ", 1) for line in text.splitlines() if line and not line.startswith("#")]
+    return {name: float(value) for name, value in lines}
+
+
+def test_registry_renders_the_text_exposition_format() -> None:
+    registry = Registry()
+    counter = registry.register(Counter("jobs_total", "Jobs run.", ("queue",)))
+    registry.register(Gauge("queue_depth", "Jobs waiting.", lambda: 3))
+    histogram = registry.register(Histogram("job_seconds", "Job time.", ("queue",), buckets=(0.1, 1.0)))
+    counter.inc('say "hi"\n')
+    counter.inc("b", amount=2)
+    for value in (0.05, 0.1, 0.5, 5.0):
+        histogram.observe(value, "b")
+
+    assert registry.render().decode().splitlines() == [
+        "# HELP jobs_total Jobs run.",
+        "# TYPE jobs_total counter",
+        'jobs_total{queue="b"} 2',
+        'jobs_total{queue="say \\"hi\\"\\n"} 1',
+        "# HELP queue_depth Jobs waiting.",
+        "# TYPE queue_depth gauge",
+        "queue_depth 3",
+        "# HELP job_seconds Job time.",
+        "# TYPE job_seconds histogram",
+        'job_seconds_bucket{queue="b",le="0.1"} 2',
+        'job_seconds_bucket{queue="b",le="1"} 3',
+        'job_seconds_bucket{queue="b",le="+Inf"} 4',
+        'job_seconds_sum{queue="b"} 5.65',
+        'job_seconds_count{queue="b"} 4',
+    ]
+    with pytest.raises(ValueError):
+        registry.register(Counter("jobs_total", "Again."))
+
+
+def test_metrics_route_counts_requests_by_route_template() -> None:
+    command_route = 'method="POST",route="/api/missions/{session_id}/command",status="200"'
+    with TestClient(app) as client:
+        before = samples(client.get("/metrics").text)
+        session_id = client.post("/api/missions/start", json={"mission_id": "sandbox-check"}).json()["session_id"]
+        client.post(f"/api/missions/{session_id}/command", json={"command": "whoami"})
+        client.post(f"/api/missions/{session_id}/command", json={"command": "pwd"})
+        client.post(f"/api/missions/{session_id}/hint")
+        client.get("/nothing")
+        response = client.get("/metrics")
+
+    assert response.headers["content-type"] == CONTENT_TYPE
+    # session ids never become label values
+    assert session_id not in response.text
+    after = samples(response.text)
+
+    def grew(name: str) -> float:
+        return after[name] - before.get(name, 0)
+
+    assert grew(f"http_request_duration_seconds_count{{{command_route}}}") == 2
+    assert grew('http_request_duration_seconds_count{method="GET",route="unmatched",status="404"}') == 1
+    assert grew('mission_commands_total{mission="sandbox-check",step="pwd",result="rejected"}') == 1
+    assert grew('mission_commands_total{mission="sandbox-check",step="pwd",result="accepted"}') == 1
+    assert grew('mission_hints_total{mission="sandbox-check",step="ls"}') == 1
+    assert grew('mission_sessions_started_total{mission="sandbox-check"}') == 1
+    assert grew("mission_command_match_seconds_count") == 2
+    assert after["mission_sessions_live"] >= 1
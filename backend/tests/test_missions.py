@@ -0,0 +1,46 @@
+import json
+
+from fastapi.testclient import TestClient
+
+from app.main import app, etag_matches
+from app.missions import MissionStore
+
+IDENTITY = {"accept-encoding": "identity"}
+
+
+def test_catalog_tag_follows_the_content(store: MissionStore, builtin_missions) -> None:
+    catalog = store.catalog()
+    assert json.loads(catalog.body) == [summary.model_dump(mode="json") for summary in store.list_missions()]
+    # a reload of the same files keeps the tag, so clients keep their copy
+    store.replace_missions(builtin_missions)
+    assert store.catalog() is not catalog
+    assert store.catalog().etag == catalog.etag
+    store.replace_missions(builtin_missions[:1])
+    assert store.catalog().etag != catalog.etag
+
+
+def test_if_none_match_uses_weak_comparison() -> None:
+    assert etag_matches('"a"', '"a"')
+    assert etag_matches('W/"a"', '"a"')
+    assert etag_matches('"b", W/"a"', '"a"')
+    assert etag_matches("*", '"a"')
+    assert not etag_matches('"b"', '"a"')
+    assert not etag_matches(None, '"a"')
+
+
+def test_catalog_route_answers_304_for_a_current_tag() -> None:
+    with TestClient(app) as client:
+        first = client.get("/api/missions", headers=IDENTITY)
+        assert first.status_code == 200
+        assert first.headers["cache-control"] == "no-cache"
+        etag = first.headers["etag"]
+
+        for if_none_match in (etag, f'"stale", {etag}', "*"):
+            revalidated = client.get("/api/missions", headers={**IDENTITY, "if-none-match": if_none_match})
+            assert revalidated.status_code == 304
+            assert revalidated.content == b""
+            assert revalidated.headers["etag"] == etag
+
+        stale = client.get("/api/missions", headers={**IDENTITY, "if-none-match": '"stale"'})
+        assert stale.status_code == 200
+        assert stale.content == first.content
@@ -0,0 +1,121 @@
+import asyncio
+import json
+import random
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.config import get_settings
+from app.main import app
+from app.missions import store as app_store
+from app.sessions import InMemorySessionBackend, MissionSession, SessionGone, SQLiteSessionBackend
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, make_store, tmp_path):
+    if request.param == "memory":
+        return make_store(InMemorySessionBackend())
+    return make_store(SQLiteSessionBackend(str(tmp_path / "sessions.db")))
+
+
+def test_concurrent_commands_on_one_session_award_each_step_once(store) -> None:
+    mission = store.get_mission("missing-route")
+    # every step's answer many times over, plus wrong commands, in a fixed random order
+    commands = [step.expected_commands[0] for step in mission.steps] * 30 + ["whoami"] * 30
+    random.Random(0).shuffle(commands)
+
+    async def run():
+        session = await store.create_session("missing-route")
+        bodies = await asyncio.gather(
+            *(
+                store.submit_command(session.session_id, command, f"key-{number}")
+                for number, command in enumerate(commands)
+            )
+        )
+        return [json.loads(body) for body, _ in bodies], await store.get_session(session.session_id)
+
+    results, session = asyncio.run(run())
+    accepted = [result for result in results if result["accepted"]]
+    assert sorted(result["step_index"] for result in accepted) == list(range(1, len(mission.steps) + 1))
+    assert sum(result["score_awarded"] for result in accepted) == session.total_score
+    assert session.total_score == sum(step.score for step in mission.steps)
+    assert session.step_index == len(mission.steps)
+
+    # rejections after the last step are not mistakes; every earlier one counts once
+    mistakes = [result["mistakes"] for result in results if not result["accepted"] and not result["mission_complete"]]
+    assert sorted(mistakes) == list(range(1, len(mistakes) + 1))
+    assert session.mistakes == len(mistakes)
+    assert len(store._locks) == 0
+
+
+def test_reaped_sessions_are_gone_not_missing(store) -> None:
+    async def run() -> None:
+        session = await store.create_session("sandbox-check")
+        assert await store.reap_expired(datetime.utcnow() + timedelta(days=1)) == 1
+        assert store.session_count() == 0
+        for call in (
+            store.evaluate_command(session.session_id, "pwd"),
+            store.evaluate_commands(session.session_id, ["pwd"]),
+            store.status(session.session_id),
+            store.hint(session.session_id),
+        ):
+            with pytest.raises(SessionGone) as gone:
+                await call
+            assert gone.value.reason == "expired"
+        with pytest.raises(KeyError):
+            await store.status("missing")
+
+    asyncio.run(run())
+
+
+def test_routes_answer_410_for_an_expired_session() -> None:
+    with TestClient(app) as client:
+        session_id = client.post("/api/missions/start", json={"mission_id": "sandbox-check"}).json()["session_id"]
+        session = asyncio.run(app_store.get_session(session_id))
+        # idle for longer than the timeout; the next request finds it expired
+        session.last_active_ms -= get_settings().session_timeout_seconds * 1000 + 1
+
+        command = client.post(f"/api/missions/{session_id}/command", json={"command": "pwd"})
+        assert (command.status_code, command.json()["detail"]) == (410, "Session expired")
+        assert client.get(f"/api/missions/{session_id}").status_code == 410
+        assert client.post(f"/api/missions/{session_id}/hint").status_code == 410
+        assert client.post(f"/api/missions/{session_id}/commands", json={"commands": ["pwd"]}).status_code == 410
+        assert client.get("/api/missions/missing").status_code == 404
+
+
+def test_sqlite_read_modify_writes_from_every_worker_are_serialized(tmp_path) -> None:
+    path = str(tmp_path / "sessions.db")
+    # two backends on one file, like two uvicorn workers, each used from several threads
+    workers = [SQLiteSessionBackend(path), SQLiteSessionBackend(path)]
+    workers[0].add(MissionSession("s", "m"))
+    start = threading.Barrier(8)
+
+    def bump(backend: SQLiteSessionBackend) -> None:
+        start.wait()
+        for _ in range(50):
+            with backend.transaction("s") as session:
+                session.mistakes += 1
+
+    threads = [threading.Thread(target=bump, args=(workers[number % 2],)) for number in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert workers[1].get("s").mistakes == 8 * 50
+    for backend in workers:
+        backend.close()
+
+
+def test_sqlite_transaction_rolls_back_on_error(tmp_path) -> None:
+    backend = SQLiteSessionBackend(str(tmp_path / "sessions.db"))
+    backend.add(MissionSession("s", "m"))
+    with pytest.raises(RuntimeError):
+        with backend.transaction("s") as session:
+            session.mistakes = 5
+            session.total_score = 100
+            raise RuntimeError("evaluation failed")
+    session = backend.get("s")
+    assert (session.mistakes, session.total_score) == (0, 0)
+    backend.close()
@@ -0,0 +1,136 @@
+import asyncio
+import json
+import random
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlsplit
+
+import httpx
+from fastapi.testclient import TestClient
+
+from app.sharding import BackendPool, BackendUnavailable, ShardRouter
+
+
+async def fake_shard(respond: Callable[[str], Optional[bytes]]) -> Tuple[asyncio.AbstractServer, int]:
+    """A keep-alive HTTP server answering ``respond(target)`` with a 200, or closing unanswered on None."""
+
+    async def serve(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        while True:
+            try:
+                head = await reader.readuntil(b"\r\n\r\n")
+            except asyncio.IncompleteReadError:
+                break
+            lines = head.split(b"\r\n")
+            length = next(int(line.split(b":", 1)[1]) for line in lines if line.startswith(b"content-length"))
+            await reader.readexactly(length)
+            body = respond(lines[0].split(b" ", 2)[1].decode())
+            if body is None:
+                break
+            writer.write(b"HTTP/1.1 200 OK\r\ncontent-length: %d\r\n\r\n%s" % (len(body), body))
+            await writer.drain()
+        writer.close()
+
+    server = await asyncio.start_server(serve, "127.0.0.1", 0)
+    return server, server.sockets[0].getsockname()[1]
+
+
+async def send_twice(headers: List[Tuple[bytes, bytes]]) -> Tuple[List[str], bool]:
+    received: List[str] = []
+
+    def respond(target: str) -> Optional[bytes]:
+        received.append(target)
+        # the second request is read, then the connection drops unanswered
+        return None if len(received) == 2 else b"ok"
+
+    server, port = await fake_shard(respond)
+    pool = BackendPool("s0", f"http://127.0.0.1:{port}")
+    try:
+        for _ in range(2):
+            _, _, content = await pool.request("POST", "/api/missions/s0.x/command", headers, b"{}")
+            async for _ in content:
+                pass
+        delivered = True
+    except BackendUnavailable:
+        delivered = False
+    finally:
+        pool.close()
+        server.close()
+    return received, delivered
+
+
+def test_command_on_a_stale_connection_is_not_resent() -> None:
+    received, delivered = asyncio.run(send_twice([]))
+    # the shard read the second command before the connection failed; resending would apply it twice
+    assert not delivered
+    assert len(received) == 2
+
+
+def test_command_with_an_idempotency_key_is_resent() -> None:
+    received, delivered = asyncio.run(send_twice([(b"idempotency-key", b"k1")]))
+    assert delivered
+    assert len(received) == 3
+
+
+def test_per_shard_reports_are_refused_behind_several_shards() -> None:
+    router = ShardRouter({"s0": "http://127.0.0.1:9", "s1": "http://127.0.0.1:9"})
+    with TestClient(router) as client:
+        for path in ("leaderboard", "analytics", "analytics/export"):
+            response = client.get(f"/api/missions/missing-route/{path}")
+            assert response.status_code == 501
+    assert not router.per_shard_report("/api/missions/s0.abc/hint")
+    # a single shard holds every session, so its reports are complete
+    assert not ShardRouter({"s0": "http://127.0.0.1:9"}).per_shard_report("/api/missions/missing-route/leaderboard")
+
+
+def transcript_shard(entries: List[Dict[str, Any]]) -> Callable[[str], Optional[bytes]]:
+    """Serves ``entries`` as /api/transcripts pages of at most three, like a scan cut short by its budget."""
+
+    def respond(target: str) -> Optional[bytes]:
+        query = dict(parse_qsl(urlsplit(target).query))
+        start = int(query.get("cursor", 0))
+        end = min(start + int(query["limit"]), start + 3, len(entries))
+        page = {"transcripts": entries[start:end], "next_cursor": str(end) if end < len(entries) else None}
+        return json.dumps(page).encode()
+
+    return respond
+
+
+def test_transcript_pages_merge_every_shard_in_start_order() -> None:
+    shuffled = random.Random(7)
+    started = datetime(2026, 1, 1)
+    shards: Dict[str, List[Dict[str, Any]]] = {"s0": [], "s1": [], "s2": []}
+    for index in range(40):
+        started += timedelta(milliseconds=shuffled.choice([0, 1, 250]))
+        name = shuffled.choice(sorted(shards))
+        shards[name].append({"session_id": f"{name}.{index:03d}", "started_at": started.isoformat()})
+    expected = sorted(
+        (entry for entries in shards.values() for entry in entries),
+        key=lambda entry: (entry["started_at"], entry["session_id"]),
+    )
+
+    async def walk(limit: int) -> List[str]:
+        servers = [await fake_shard(transcript_shard(entries)) for entries in shards.values()]
+        router = ShardRouter({name: f"http://127.0.0.1:{port}" for name, (_, port) in zip(shards, servers)})
+        seen: List[str] = []
+        try:
+            async with httpx.AsyncClient(transport=httpx.ASGITransport(app=router), base_url="http://router") as client:
+                params: Dict[str, Any] = {"limit": limit}
+                while True:
+                    response = await client.get("/api/transcripts", params=params)
+                    assert response.status_code == 200
+                    page = response.json()
+                    assert len(page["transcripts"]) <= limit
+                    seen.extend(entry["session_id"] for entry in page["transcripts"])
+                    if page["next_cursor"] is None:
+                        break
+                    params["cursor"] = page["next_cursor"]
+                assert (await client.get("/api/transcripts", params={"cursor": "not-a-cursor"})).status_code == 400
+        finally:
+            for server, _ in servers:
+                server.close()
+            for pool in router.pools.values():
+                pool.close()
+        return seen
+
+    for limit in (1, 2, 5, 100):
+        assert asyncio.run(walk(limit)) == [entry["session_id"] for entry in expected]
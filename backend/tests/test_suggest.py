@@ -0,0 +1,41 @@
+from typing import Iterator
+
+import pytest
+
+from app.catalog import BUILTIN_MISSIONS_DIR, MissionCatalogLoader
+from app.matching import parse_command
+
+MISSIONS = MissionCatalogLoader(BUILTIN_MISSIONS_DIR).load()
+STEPS = [(mission, step) for mission in MISSIONS for step in mission.steps]
+
+
+def slips(command: str) -> Iterator[str]:
+    """Commands one typo or one missing argument away from ``command``."""
+    tokens = command.split()
+    for position, token in enumerate(tokens):
+        for index in range(len(token)):
+            yield " ".join([*tokens[:position], token[:index] + token[index + 1 :], *tokens[position + 1 :]])
+            if index + 1 < len(token):
+                swapped = token[:index] + token[index + 1] + token[index] + token[index + 2 :]
+                yield " ".join([*tokens[:position], swapped, *tokens[position + 1 :]])
+    if len(tokens) > 1:
+        yield " ".join(tokens[:-1])
+
+
+@pytest.mark.parametrize("mission, step", STEPS, ids=[f"{mission.id}-{step.id}" for mission, step in STEPS])
+def test_every_suggestion_is_accepted_by_its_step(mission, step) -> None:
+    near = (*step.expected_commands, *mission.recommended_commands)
+    commands = {slip for command in near for slip in slips(command)}
+    suggested = 0
+    for command in commands:
+        suggestion = step.suggest(parse_command(command))
+        if suggestion is not None:
+            suggested += 1
+            assert step.accepts(suggestion), (command, suggestion)
+    assert suggested
+
+
+def test_recommended_commands_the_step_rejects_are_not_suggested() -> None:
+    step = next(step for mission, step in STEPS if mission.id == "missing-route" and step.id == "inspect")
+    assert not step.accepts("ip route")
+    assert step.suggest(parse_command("ip rout")) != "ip route"
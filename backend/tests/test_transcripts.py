@@ -0,0 +1,52 @@
+import asyncio
+import json
+from pathlib import Path
+from typing import List
+
+from app import grade
+from app.catalog import BUILTIN_MISSIONS_DIR
+from app.missions import MissionStore
+from app.sessions import InMemorySessionBackend, SessionQuery, SQLiteSessionBackend
+
+COMMANDS = ["ls", "pwd", "ip addr", "whoami", "ip route"]
+
+
+def export(store: MissionStore, commands: List[str]) -> List[dict]:
+    async def run() -> bytes:
+        session = await store.create_session("missing-route")
+        await store.evaluate_commands(session.session_id, commands)
+        return b"".join([chunk async for chunk in store.export_transcripts(SessionQuery())])
+
+    return [json.loads(line) for line in asyncio.run(run()).splitlines()]
+
+
+def test_transcript_says_when_commands_were_dropped(make_store) -> None:
+    (complete,) = export(make_store(InMemorySessionBackend(history_limit=5)), COMMANDS)
+    assert complete["commands"] == COMMANDS
+    assert complete["truncated"] is False
+
+    (partial,) = export(make_store(InMemorySessionBackend(history_limit=3)), COMMANDS)
+    assert partial["commands"] == COMMANDS[-3:]
+    assert partial["truncated"] is True
+
+
+def test_grader_refuses_truncated_transcripts(make_store) -> None:
+    grade._load_catalog(str(BUILTIN_MISSIONS_DIR), None)
+    (complete,) = export(make_store(InMemorySessionBackend(history_limit=5)), COMMANDS)
+    (partial,) = export(make_store(InMemorySessionBackend(history_limit=3)), COMMANDS)
+    assert "error" not in json.loads(grade.grade_line(1, json.dumps(complete).encode()))
+    result = json.loads(grade.grade_line(2, json.dumps(partial).encode()))
+    assert result["id"] == partial["session_id"]
+    assert "truncated" in result["error"]
+
+
+def test_sqlite_keeps_the_dropped_count(make_store, tmp_path: Path) -> None:
+    path = str(tmp_path / "sessions.db")
+    (partial,) = export(make_store(SQLiteSessionBackend(path, history_limit=3)), COMMANDS)
+    assert partial["truncated"] is True
+    # reopening with a smaller limit drops more of the stored history
+    backend = SQLiteSessionBackend(path, history_limit=2)
+    (session,) = backend.scan(SessionQuery(), None, 10)[0]
+    assert session.recent_commands == tuple(COMMANDS[-2:])
+    assert session.commands_dropped == 3
+    backend.close()
@@ -0,0 +1,69 @@
+import asyncio
+
+import pytest
+from fastapi import WebSocketDisconnect
+from fastapi.testclient import TestClient
+
+from app.config import get_settings
+from app.main import WS_SESSION_GONE, WS_SESSION_NOT_FOUND, app
+from app.missions import store
+
+
+def start(client: TestClient) -> str:
+    return client.post("/api/missions/start", json={"mission_id": "sandbox-check"}).json()["session_id"]
+
+
+def test_socket_answers_status_commands_and_hints() -> None:
+    with TestClient(app) as client, client.websocket_connect(f"/api/missions/{start(client)}/ws") as socket:
+        socket.send_json({"type": "status", "id": 1})
+        status = socket.receive_json()
+        assert (status["type"], status["id"], status["data"]["step_index"]) == ("status", 1, 0)
+
+        socket.send_json({"type": "command", "command": "whoami", "id": 2})
+        rejected = socket.receive_json()
+        assert (rejected["type"], rejected["id"], rejected["data"]["accepted"]) == ("command", 2, False)
+
+        socket.send_json({"type": "hint"})
+        assert socket.receive_json()["type"] == "hint"
+
+        socket.send_json({"type": "command", "command": "pwd"})
+        assert socket.receive_json()["data"]["accepted"]
+        socket.send_json({"type": "command", "command": "ls", "id": "last"})
+        accepted, complete = socket.receive_json(), socket.receive_json()
+        assert accepted["data"]["mission_complete"]
+        assert (complete["type"], complete["id"], complete["data"]["mistakes"]) == ("complete", "last", 1)
+
+
+def test_socket_reports_bad_messages_and_stays_open() -> None:
+    with TestClient(app) as client, client.websocket_connect(f"/api/missions/{start(client)}/ws") as socket:
+        socket.send_text("not json")
+        assert socket.receive_json() == {"type": "error", "detail": "Messages must be JSON"}
+        socket.send_json(["status"])
+        assert socket.receive_json() == {"type": "error", "detail": "Messages must be JSON objects"}
+        socket.send_bytes(b'{"type": "status"}')
+        assert socket.receive_json() == {"type": "error", "detail": "Messages must be text frames"}
+        socket.send_json({"type": "dance"})
+        assert socket.receive_json() == {"type": "error", "detail": "Unknown message type: 'dance'"}
+        socket.send_json({"type": "command", "command": ""})
+        assert socket.receive_json()["detail"] == "command must be a non-empty string"
+
+        socket.send_json({"type": "status"})
+        assert socket.receive_json()["type"] == "status"
+
+
+def test_socket_closes_for_unknown_and_expired_sessions() -> None:
+    with TestClient(app) as client:
+        with client.websocket_connect("/api/missions/missing/ws") as socket:
+            assert socket.receive_json() == {"type": "error", "detail": "Session not found"}
+            with pytest.raises(WebSocketDisconnect) as closed:
+                socket.receive_json()
+            assert closed.value.code == WS_SESSION_NOT_FOUND
+
+        session_id = start(client)
+        session = asyncio.run(store.get_session(session_id))
+        session.last_active_ms -= get_settings().session_timeout_seconds * 1000 + 1
+        with client.websocket_connect(f"/api/missions/{session_id}/ws") as socket:
+            assert socket.receive_json() == {"type": "gone", "detail": "Session expired"}
+            with pytest.raises(WebSocketDisconnect) as closed:
+                socket.receive_json()
+            assert closed.value.code == WS_SESSION_GONE
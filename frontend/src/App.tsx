@@ -1,6 +1,7 @@
-import { useEffect, useMemo, useState } from 'react';
+import { useEffect, useMemo, useRef, useState } from 'react';
 import './App.css';
 import { api } from './api/client';
+import { SessionSocket } from './api/socket';
 import { MissionList } from './components/MissionList';
 import { SessionHud } from './components/SessionHud';
 import { TerminalView } from './components/TerminalView';
@@ -9,6 +10,7 @@ import type {
   CommandResponse,
   MissionStartResponse,
   MissionSummary,
+  SessionSocketEvent,
 } from './types/api';
 
 function App() {
@@ -23,6 +25,7 @@ function App() {
   const [isLoading, setIsLoading] = useState(false);
   const [isMissionComplete, setMissionComplete] = useState(false);
   const { secondsRemaining, start, stop, setSecondsRemaining } = useCountdown(0);
+  const socketRef = useRef<SessionSocket | null>(null);
 
   useEffect(() => {
     api
@@ -31,6 +34,7 @@ function App() {
       .catch((error) => {
         setFeedback(`Failed to load missions: ${error.message}`);
       });
+    return () => socketRef.current?.close();
   }, []);
 
   const missionTitle = session?.mission.title ?? selectedMission?.title ?? 'SysAdmin Simulator';
@@ -61,6 +65,8 @@ function App() {
       ];
       setTerminalLines(introLines);
       start(response.time_limit_seconds);
+      socketRef.current?.close();
+      socketRef.current = new SessionSocket(response.session_id, handleSocketEvent);
     } catch (error) {
       const message = error instanceof Error ? error.message : 'Unknown error';
       setFeedback(`Unable to start mission: ${message}`);
@@ -73,6 +79,20 @@ function App() {
     setTerminalLines((prev) => prev.concat(lines));
   };
 
+  const handleSocketEvent = (event: SessionSocketEvent) => {
+    if (event.type === 'timeout') {
+      setSecondsRemaining(0);
+      stop();
+      appendTerminalOutput(['', event.detail]);
+      setFeedback(event.detail);
+    } else if (event.type === 'gone') {
+      stop();
+      setFeedback(`${event.detail}. Select a mission to deploy again.`);
+      socketRef.current?.close();
+      socketRef.current = null;
+    }
+  };
+
   const handleCommand = async (command: string) => {
     if (!command || !session || isMissionComplete) {
       return;
@@ -81,7 +101,10 @@ function App() {
     appendTerminalOutput(`$ ${command}`);
 
     try {
-      const result = await api.submitCommand(session.session_id, { command });
+      const socket = socketRef.current;
+      const result = socket?.isOpen
+        ? await socket.command(command)
+        : await api.submitCommand(session.session_id, { command });
       processCommandResponse(result);
     } catch (error) {
       const message = error instanceof Error ? error.message : 'Unknown error';
@@ -114,7 +137,10 @@ function App() {
       return;
     }
     try {
-      const response = await api.requestHint(session.session_id);
+      const socket = socketRef.current;
+      const response = socket?.isOpen
+        ? await socket.hint()
+        : await api.requestHint(session.session_id);
       appendTerminalOutput([`Hint: ${response.hint}`]);
       setFeedback(`Hint used. ${response.remaining_hints} hints remain.`);
     } catch (error) {
@@ -124,6 +150,8 @@ function App() {
   };
 
   const handleAbort = () => {
+    socketRef.current?.close();
+    socketRef.current = null;
     setSession(null);
     setTerminalLines([]);
     setMistakes(0);
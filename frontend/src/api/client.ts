@@ -8,17 +8,17 @@ import type {
   SessionStatusResponse,
 } from '../types/api';
 
-const API_URL = (
+export const API_URL = (
   (import.meta.env.VITE_API_URL as string | undefined) ?? 'http://localhost:8000/api'
 ).replace(/\/$/, '');
 
 async function request<T>(path: string, init?: RequestInit): Promise<T> {
   const resp = await fetch(`${API_URL}${path}`, {
+    ...init,
     headers: {
       'Content-Type': 'application/json',
       ...(init?.headers ?? {}),
     },
-    ...init,
   });
 
   if (!resp.ok) {
@@ -29,6 +29,34 @@ async function request<T>(path: string, init?: RequestInit): Promise<T> {
   return (await resp.json()) as T;
 }
 
+const COMMAND_RETRIES = 2;
+
+// crypto.randomUUID only exists in secure contexts; classroom servers are often plain http
+const newIdempotencyKey = () =>
+  typeof crypto !== 'undefined' && 'randomUUID' in crypto
+    ? crypto.randomUUID()
+    : `${Date.now().toString(36)}-${Math.random().toString(36).slice(2)}`;
+
+// Retries after network failures only (fetch rejects with a TypeError). Every
+// attempt carries the same Idempotency-Key, so the server evaluates the command once.
+async function submitCommand(sessionId: string, payload: CommandRequest): Promise<CommandResponse> {
+  const init: RequestInit = {
+    method: 'POST',
+    body: JSON.stringify(payload),
+    headers: { 'Idempotency-Key': newIdempotencyKey() },
+  };
+  for (let attempt = 0; ; attempt += 1) {
+    try {
+      return await request<CommandResponse>(`/missions/${sessionId}/command`, init);
+    } catch (error) {
+      if (!(error instanceof TypeError) || attempt >= COMMAND_RETRIES) {
+        throw error;
+      }
+      await new Promise((resolve) => setTimeout(resolve, 250 * 2 ** attempt));
+    }
+  }
+}
+
 export const api = {
   listMissions: () => request<MissionSummary[]>('/missions'),
   startMission: (payload: MissionStartRequest) =>
@@ -36,11 +64,7 @@ export const api = {
       method: 'POST',
       body: JSON.stringify(payload),
     }),
-  submitCommand: (sessionId: string, payload: CommandRequest) =>
-    request<CommandResponse>(`/missions/${sessionId}/command`, {
-      method: 'POST',
-      body: JSON.stringify(payload),
-    }),
+  submitCommand,
   requestHint: (sessionId: string) =>
     request<HintResponse>(`/missions/${sessionId}/hint`, {
       method: 'POST',
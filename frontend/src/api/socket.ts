@@ -0,0 +1,79 @@
+import type {
+  CommandResponse,
+  HintResponse,
+  SessionSocketEvent,
+  SessionStatusResponse,
+} from '../types/api';
+import { API_URL } from './client';
+
+type Pending = {
+  resolve: (event: SessionSocketEvent) => void;
+  reject: (error: Error) => void;
+};
+
+const SOCKET_URL = API_URL.replace(/^http/, 'ws');
+
+// One WebSocket per mission session carrying commands, hints and status, plus
+// events the server pushes on its own (completion, timeout, expiry).
+export class SessionSocket {
+  private readonly socket: WebSocket;
+  private readonly pending = new Map<number, Pending>();
+  private readonly onEvent: (event: SessionSocketEvent) => void;
+  private nextId = 1;
+
+  constructor(sessionId: string, onEvent: (event: SessionSocketEvent) => void) {
+    this.onEvent = onEvent;
+    this.socket = new WebSocket(`${SOCKET_URL}/missions/${sessionId}/ws`);
+    this.socket.onmessage = (message) => this.dispatch(JSON.parse(message.data) as SessionSocketEvent);
+    this.socket.onclose = () => {
+      this.pending.forEach(({ reject }) => reject(new Error('Connection closed')));
+      this.pending.clear();
+    };
+  }
+
+  get isOpen(): boolean {
+    return this.socket.readyState === WebSocket.OPEN;
+  }
+
+  async command(command: string): Promise<CommandResponse> {
+    const event = await this.send({ type: 'command', command });
+    return (event as { data: CommandResponse }).data;
+  }
+
+  async hint(): Promise<HintResponse> {
+    const event = await this.send({ type: 'hint' });
+    return (event as { data: HintResponse }).data;
+  }
+
+  async status(): Promise<SessionStatusResponse> {
+    const event = await this.send({ type: 'status' });
+    return (event as { data: SessionStatusResponse }).data;
+  }
+
+  close() {
+    this.socket.close();
+  }
+
+  private send(message: Record<string, unknown>): Promise<SessionSocketEvent> {
+    const id = this.nextId++;
+    return new Promise((resolve, reject) => {
+      this.pending.set(id, { resolve, reject });
+      this.socket.send(JSON.stringify({ ...message, id }));
+    });
+  }
+
+  private dispatch(event: SessionSocketEvent) {
+    const pending = event.id !== undefined ? this.pending.get(event.id) : undefined;
+    if (!pending || event.type === 'complete') {
+      this.onEvent(event);
+      return;
+    }
+    this.pending.delete(event.id!);
+    if (event.type === 'error' || event.type === 'gone') {
+      pending.reject(new Error(event.detail));
+      this.onEvent(event);
+    } else {
+      pending.resolve(event);
+    }
+  }
+}
@@ -11,6 +11,7 @@ export interface MissionSummary {
 export interface MissionStartRequest {
   mission_id: string;
   player_name?: string;
+  cohort_id?: string;
 }
 
 export interface MissionStartResponse {
@@ -40,6 +41,7 @@ export interface CommandResponse {
   score_awarded: number;
   total_score: number;
   time_remaining_seconds: number;
+  suggestion?: string | null;
 }
 
 export interface HintResponse {
@@ -57,3 +59,9 @@ export interface SessionStatusResponse {
   time_remaining_seconds: number;
   completed: boolean;
 }
+
+export type SessionSocketEvent =
+  | { type: 'command'; id?: number; data: CommandResponse }
+  | { type: 'hint'; id?: number; data: HintResponse }
+  | { type: 'status' | 'complete'; id?: number; data: SessionStatusResponse }
+  | { type: 'timeout' | 'gone' | 'error'; id?: number; detail: string };